@@ -0,0 +1,177 @@
+"""Module for analytic NPV statistics of a summary
+
+NPV is linear in the sampled cash flows, and the values of different items
+and years are sampled independently, so its mean and variance are sums of
+the discounted means and variances of the Random Types over their active
+years. Items in another currency share its FX rates, so their cash flows
+are summed per currency and year before being converted by the moments of
+the rates. When every Random Type is Gaussian or Constant, and every FX
+rate used is Constant, NPV is exactly Gaussian and its quantiles and
+probabilities follow as well. Linear stages of the pipeline, e.g.
+inflation, scale the discount factors; a tax stage leaves NPV to Monte
+Carlo.
+
+`get_NPV_statistics` uses this analytic path whenever the requested
+statistics allow it, and falls back to Monte Carlo otherwise.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from typing import Dict, Iterable, Optional, Tuple
+import math
+import statistics
+
+import numpy as np
+
+import pipeline
+import random_type
+from cash_flow import Summary
+from simulation import get_NPV, sample_net_cash_flow
+
+STATISTICS = ("mean", "std", "variance", "p5", "p50", "p95", "probability_positive")
+
+_MOMENT_STATISTICS = ("mean", "std", "variance")
+_GAUSSIAN_TYPES = (random_type.Gaussian, random_type.Constant)
+
+
+# ----- Analytic NPV ----- #
+class AnalyticNPV():
+    """
+    Analytic distribution of NPV of a summary
+
+    Attributes:
+        mean: Mean of NPV, infinite if a Random Type has no finite mean, NaN if the pipeline is not linear
+        variance: Variance of NPV, infinite if a Random Type has no finite variance, NaN if the pipeline is not linear
+        gaussian: Whether NPV is exactly Gaussian, i.e. all Random Types are Gaussian or Constant
+            and all FX rates used are Constant
+    """
+    mean: float
+    variance: float
+    gaussian: bool
+
+    def __init__(self, mean: float, variance: float, gaussian: bool) -> None:
+        """
+        Default initialization method for AnalyticNPV class
+
+        Args:
+            mean: Mean of NPV
+            variance: Variance of NPV
+            gaussian: Whether NPV is exactly Gaussian
+        """
+        self.mean = mean
+        self.variance = variance
+        self.gaussian = gaussian
+
+    @classmethod
+    def create_from_summary(cls, summary: Summary) -> "AnalyticNPV":
+        """Initialize from the parameters of a summary"""
+        factors = pipeline.get_factors(summary.pipeline, summary.years)
+        if factors is None:
+            return cls(math.nan, math.nan, False)
+
+        # Means and variances of the yearly cash flows of the items, by the FX rate converting them
+        moments = {}
+        gaussian = True
+        for group in summary.cash_flow_sheet.groups:
+            for item in group.items:
+                fx_rate = summary.get_fx_rate(item.currency)
+                (item_means, item_variances) = item.get_moments(summary.years)
+                (means, variances) = moments.get(fx_rate, (0.0, 0.0))
+                moments[fx_rate] = (means + item_means, variances + item_variances)
+                gaussian &= isinstance(item.upfront_cost, _GAUSSIAN_TYPES) \
+                    and isinstance(item.recurring_cost, _GAUSSIAN_TYPES)
+
+        discount = factors * (1 + summary.interest_rate) ** -np.arange(summary.years + 1, dtype=float)
+        (mean, variance) = (0.0, 0.0)
+        for (fx_rate, (means, variances)) in moments.items():
+            if fx_rate is not None:
+                (means, variances) = fx_rate.convert_moments(means, variances)
+                gaussian &= fx_rate.is_constant()
+            mean += float(means @ discount)
+            variance += float(variances @ discount**2)
+        return cls(mean, variance, gaussian)
+
+    # --- Methods --- #
+    def has(self, statistic: str) -> bool:
+        """Whether the statistic is known exactly, see `STATISTICS`"""
+        if statistic in _MOMENT_STATISTICS:
+            return math.isfinite(self.mean if statistic == "mean" else self.variance)
+        return self.gaussian and statistic in STATISTICS
+
+    def get(self, statistic: str) -> float:
+        """
+        Exact value of the statistic
+
+        Args:
+            statistic: One of `STATISTICS`
+
+        Raises:
+            ValueError: If the statistic is not known exactly, see `has`
+        """
+        if not self.has(statistic):
+            raise ValueError(f"'{statistic}' of NPV is not known analytically")
+        if statistic == "mean":
+            return self.mean
+        elif statistic == "variance":
+            return self.variance
+        elif statistic == "std":
+            return math.sqrt(self.variance)
+        elif self.variance == 0:
+            # Degenerate distribution, a single value
+            return float(self.mean > 0) if statistic == "probability_positive" else self.mean
+        distribution = statistics.NormalDist(self.mean, math.sqrt(self.variance))
+        if statistic == "probability_positive":
+            return 1 - distribution.cdf(0.0)
+        return distribution.inv_cdf(float(statistic[1:]) / 100)
+
+    # --- String Representation --- #
+    def __repr__(self) -> str:
+        """String representation of the instance"""
+        return "".join([f"{self.__class__.__name__}(mean={self.mean!r}, ",
+                        f"variance={self.variance!r}, ",
+                        f"gaussian={self.gaussian})"])
+
+
+# ----- Module Methods ----- #
+def _get_sampled_statistic(NPV: np.ndarray, statistic: str) -> float:
+    if statistic == "mean":
+        return float(np.mean(NPV))
+    elif statistic == "std":
+        return float(np.std(NPV))
+    elif statistic == "variance":
+        return float(np.var(NPV))
+    elif statistic == "probability_positive":
+        return float(np.mean(NPV > 0))
+    return float(np.quantile(NPV, float(statistic[1:]) / 100))
+
+def get_NPV_statistics(summary: Summary,
+                       requested: Iterable[str] = ("mean", "std"),
+                       iterations: Optional[int] = None,
+                       rng: Optional[np.random.Generator] = None,
+                       NPV: Optional[np.ndarray] = None) -> Tuple[Dict[str, float], str]:
+    """
+    Statistics of NPV, analytic when all of them are known exactly and Monte Carlo otherwise
+
+    Args:
+        summary: Summary to be evaluated
+        requested: Statistics, any of `STATISTICS`
+        iterations: Number of iterations for Monte Carlo, iterations of the summary if None
+        rng: Random number generator for Monte Carlo, the one of the summary if not given
+        NPV: Values of NPV of a run already done, used for Monte Carlo instead of sampling new ones
+
+    Returns:
+        Statistics by name, and the method used, "analytic" or "monte_carlo"
+    """
+    requested = list(requested)
+    unknown = set(requested).difference(STATISTICS)
+    if unknown:
+        raise ValueError(f"Unknown statistics {sorted(unknown)}, expected any of {', '.join(STATISTICS)}")
+    analytic = AnalyticNPV.create_from_summary(summary)
+    if all(analytic.has(statistic) for statistic in requested):
+        return ({statistic: analytic.get(statistic) for statistic in requested}, "analytic")
+
+    if NPV is None:
+        iterations = summary.iterations if iterations is None else iterations
+        NPV = get_NPV(sample_net_cash_flow(summary, iterations, rng), summary.interest_rate)
+    return ({statistic: _get_sampled_statistic(NPV, statistic) for statistic in requested}, "monte_carlo")
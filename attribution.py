@@ -0,0 +1,153 @@
+"""Module for attributing NPV to the groups and items of a cash flow sheet
+
+The FX rates and items are sampled in the same order, and from the same
+random number generator, as `Summary.sample_net_cash_flow`, so the contributions
+of a run add up exactly to the NPV of the same run. Group contributions
+are sums over the contiguous items of each group, done with a single
+`np.add.reduceat` over the item axis of the groups which have items.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from cash_flow import Summary
+
+QUANTILES = (0.05, 0.5, 0.95)
+
+
+# ----- Attribution ----- #
+class Attribution():
+    """
+    NPV contributions of every item of a sheet
+
+    Attributes:
+        group_names: Names of the groups
+        item_names: Pairs of group name and item name, in order of the items
+        group_starts: (n_groups, ) array of the position of the first item of every group
+        item_NPV: (iterations, n_items) array of NPV contributions of the items
+    """
+    group_names: List[str]
+    item_names: List[Tuple[str, str]]
+    group_starts: np.ndarray
+    item_NPV: np.ndarray
+
+    def __init__(self,
+                 group_names: List[str],
+                 item_names: List[Tuple[str, str]],
+                 group_starts: np.ndarray,
+                 item_NPV: np.ndarray) -> None:
+        """
+        Default initialization method for Attribution class
+
+        Args:
+            group_names: Names of the groups
+            item_names: Pairs of group name and item name, in order of the items
+            group_starts: (n_groups, ) array of the position of the first item of every group
+            item_NPV: (iterations, n_items) array of NPV contributions of the items
+        """
+        self.group_names = group_names
+        self.item_names = item_names
+        self.group_starts = group_starts
+        self.item_NPV = item_NPV
+
+    # --- Methods --- #
+    def get_NPV(self) -> np.ndarray:
+        """(iterations, ) array of NPV of the sheet"""
+        return np.sum(self.item_NPV, axis=1)
+
+    def get_group_NPV(self) -> np.ndarray:
+        """(iterations, n_groups) array of NPV contributions of the groups, zero for a group without items"""
+        group_sizes = np.diff(np.append(self.group_starts, self.item_NPV.shape[1]))
+        group_NPV = np.zeros((self.item_NPV.shape[0], len(group_sizes)))
+        # reduceat gives the next item for an empty group, and fails for an empty last group
+        has_items = group_sizes > 0
+        if np.any(has_items):
+            group_NPV[:, has_items] = np.add.reduceat(self.item_NPV, self.group_starts[has_items], axis=1)
+        return group_NPV
+
+    def summarize(self, level: str = "group") -> List[Dict[str, float]]:
+        """
+        Distribution of the contributions as a list of plain dictionaries
+
+        Contribution to variance is the covariance of a contribution with
+        the NPV over the variance of the NPV, so it adds up to one over all
+        the groups or items, and is negative for a hedging one.
+
+        Args:
+            level: "group" or "item"
+
+        Returns:
+            Name, mean, std. deviation, quantiles and contribution to variance of every contribution
+        """
+        if level == "group":
+            (names, contributions) = ([(name, ) for name in self.group_names], self.get_group_NPV())
+        elif level == "item":
+            (names, contributions) = (self.item_names, self.item_NPV)
+        else:
+            raise ValueError("level must be 'group' or 'item'")
+        mean = np.mean(contributions, axis=0)
+        std = np.std(contributions, axis=0)
+        quantiles = np.quantile(contributions, QUANTILES, axis=0)
+        contribution_to_variance = _get_contribution_to_variance(contributions)
+        keys = ("group", "item")[:len(names[0])] if names else ()
+        return [{**dict(zip(keys, name)),
+                 "mean": float(mean[position]),
+                 "std": float(std[position]),
+                 **{f"p{quantile * 100:g}": float(quantiles[quantile_no, position])
+                    for (quantile_no, quantile) in enumerate(QUANTILES)},
+                 "contribution_to_variance": float(contribution_to_variance[position])}
+                for (position, name) in enumerate(names)]
+
+    # --- String Representation --- #
+    def __repr__(self) -> str:
+        """String representation of the instance"""
+        return "".join([f"{self.__class__.__name__}(groups={len(self.group_names)}, ",
+                        f"items={len(self.item_names)}, ",
+                        f"iterations={self.item_NPV.shape[0]})"])
+
+
+# ----- Internal Functions ----- #
+def _get_contribution_to_variance(contributions: np.ndarray) -> np.ndarray:
+    """Covariance of every contribution with their sum over the variance of the sum"""
+    total = np.sum(contributions, axis=1)
+    deviation = total - np.mean(total)
+    variance = np.dot(deviation, deviation)
+    if variance == 0:
+        return np.zeros(contributions.shape[1])
+    return deviation @ (contributions - np.mean(contributions, axis=0)) / variance
+
+
+# ----- Module Methods ----- #
+def attribute(summary: Summary,
+              iterations: Optional[int] = None,
+              rng: Optional[np.random.Generator] = None) -> Attribution:
+    """
+    Sample NPV contributions of all the items of the summary
+
+    Args:
+        summary: Summary to be simulated
+        iterations: Number of iterations, iterations of the summary if None
+        rng: Random number generator, the one of the summary if not given
+
+    Returns:
+        NPV contributions of the items
+    """
+    iterations = summary.iterations if iterations is None else iterations
+    if rng is None:
+        rng = summary.get_generator()
+    groups = summary.cash_flow_sheet.groups
+    item_names = [(group.name, item.name) for group in groups for item in group.items]
+    group_starts = np.cumsum([0] + [len(group.items) for group in groups[:-1]])
+    item_NPV = np.empty((iterations, len(item_names)))
+    discount = (1 + summary.interest_rate) ** -np.arange(summary.years + 1, dtype=float)
+    fx_rates = summary.sample_fx_rates(iterations, rng)
+    item_no = 0
+    for group in groups:
+        for item in group.items:
+            item_NPV[:, item_no] = item.sample_cash_flow(summary.years, iterations, rng, fx_rates) @ discount
+            item_no += 1
+    return Attribution([group.name for group in groups], item_names, group_starts, item_NPV)
@@ -0,0 +1,177 @@
+"""Module for benchmarks of the RoI calculator
+
+Run as a script, e.g. `python benchmark.py import`. The analytic benchmark
+also checks the analytic NPV statistics against Monte Carlo, exiting with
+an error if they disagree.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from typing import List, Tuple
+import argparse
+import math
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("numpy", "lxml", "PySimpleGUI", "numba")
+
+_IMPORT_CODE = """\
+import sys, time
+start = time.perf_counter()
+{import_statement}
+print(time.perf_counter() - start)
+print(" ".join(name for name in {heavy_modules!r} if name in sys.modules))
+"""
+
+
+# ----- Import Time ----- #
+def time_import(module: str, repeats: int = 10) -> Tuple[float, List[str]]:
+    """
+    Time the import of a module in fresh interpreters
+
+    Args:
+        module: Name of the module, None for the bare interpreter
+        repeats: Number of fresh interpreters to time
+
+    Returns:
+        Median import time in seconds and the heavy modules it pulled in
+    """
+    import_statement = "pass" if module is None else f"import {module}"
+    code = _IMPORT_CODE.format(import_statement=import_statement, heavy_modules=HEAVY_MODULES)
+    times = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.splitlines()
+        times.append(float(output[0]))
+    heavy_modules = output[1].split() if len(output) > 1 else []
+    return (statistics.median(times), heavy_modules)
+
+def benchmark_import(repeats: int = 10) -> None:
+    """Print import times of the core, service and GUI modules"""
+    modules = ["numpy", "lxml.etree", "random_type", "cash_flow", "kernels", "simulation", "scheduler",
+               "job_service", "window_summary"]
+    print(f"{'Module':20} {'Import [ms]':>12}  Heavy modules loaded")
+    for module in modules:
+        try:
+            (seconds, heavy_modules) = time_import(module, repeats)
+        except subprocess.CalledProcessError:
+            print(f"{module:20} {'n/a':>12}  (not importable here)")
+            continue
+        print(f"{module:20} {seconds * 1000:12.2f}  {', '.join(heavy_modules)}")
+
+
+# ----- Metric Kernels ----- #
+def benchmark_kernels(repeats: int = 10, iterations: int = 1000000, years: int = 10) -> None:
+    """Print run times of the NumPy and Numba metric kernels, and the largest difference between them"""
+    import numpy as np
+
+    import kernels
+
+    rng = np.random.default_rng(0)
+    net_cash_flow = rng.normal(100, 50, (iterations, years + 1))
+    net_cash_flow[:, 0] = rng.normal(-500, 100, iterations)
+    metrics = {"NPV": lambda: kernels.get_NPV(net_cash_flow, 0.1),
+               "IRR": lambda: kernels.get_IRR(net_cash_flow),
+               "payback_period": lambda: kernels.get_payback_period(net_cash_flow)}
+    backends = [backend for backend in kernels.BACKENDS if backend != "numba" or kernels.NUMBA_AVAILABLE]
+    print(f"{iterations} cash flows of {years} years, Numba {'' if kernels.NUMBA_AVAILABLE else 'not '}installed")
+    print(f"{'Metric':16} {'Backend':8} {'Time [ms]':>10} {'Max. difference':>16}")
+    for (metric, function) in metrics.items():
+        reference = None
+        for backend in backends:
+            kernels.set_backend(backend)
+            values = function()    # First call compiles the Numba kernels
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                function()
+                times.append(time.perf_counter() - start)
+            reference = values if reference is None else reference
+            difference = np.nanmax(np.abs(values - reference)) if np.isnan(values).sum() < len(values) else 0.0
+            print(f"{metric:16} {backend:8} {statistics.median(times) * 1000:10.2f} {difference:16.3g}")
+    kernels.set_backend(backends[0])
+
+
+# ----- Analytic Statistics ----- #
+def benchmark_analytic(repeats: int = 10, file: str = "test.xml", iterations: int = 1000000,
+                       tolerance: float = 4.0) -> None:
+    """
+    Print run times of the analytic and Monte Carlo NPV statistics of a scenario, and check that they agree
+
+    Every statistic of a seeded Monte Carlo run must be within `tolerance`
+    standard errors of the analytic one.
+
+    Args:
+        repeats: Number of repetitions of the analytic statistics
+        file: Scenario XML
+        iterations: Number of Monte Carlo iterations
+        tolerance: Largest allowed difference, in standard errors of the Monte Carlo statistic
+
+    Raises:
+        SystemExit: If a statistic is not within tolerance
+    """
+    import numpy as np
+
+    from analytic import AnalyticNPV
+    from cash_flow import read_XML_file
+    from simulation import simulate
+
+    summary = read_XML_file(file)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        analytic = AnalyticNPV.create_from_summary(summary)
+        times.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    NPV = simulate(summary, iterations, seed=0, metrics=("NPV", )).values["NPV"]
+    monte_carlo_seconds = time.perf_counter() - start
+
+    # Monte Carlo statistic and its standard error, for every statistic known analytically
+    deviation = NPV - np.mean(NPV)
+    sampled = {"mean": (np.mean(NPV), np.std(NPV) / math.sqrt(iterations)),
+               "variance": (np.var(NPV), np.std(deviation**2) / math.sqrt(iterations))}
+    if analytic.gaussian and analytic.variance > 0:
+        density = statistics.NormalDist(analytic.mean, math.sqrt(analytic.variance)).pdf
+        for quantile in (0.05, 0.5, 0.95):
+            statistic = f"p{quantile * 100:g}"
+            standard_error = math.sqrt(quantile * (1 - quantile) / iterations) / density(analytic.get(statistic))
+            sampled[statistic] = (np.quantile(NPV, quantile), standard_error)
+        probability = np.mean(NPV > 0)
+        sampled["probability_positive"] = (probability, math.sqrt(probability * (1 - probability) / iterations))
+
+    print(f"{file}: analytic {statistics.median(times) * 1000:.3f} ms, "
+          f"Monte Carlo of {iterations} iterations {monte_carlo_seconds * 1000:.1f} ms")
+    print(f"{'Statistic':22} {'Analytic':>14} {'Monte Carlo':>14} {'Std. errors':>12}")
+    failed = []
+    for (statistic, (value, standard_error)) in sampled.items():
+        if not analytic.has(statistic):
+            continue
+        exact = analytic.get(statistic)
+        if standard_error > 0:
+            errors = abs(value - exact) / standard_error
+        else:
+            errors = 0.0 if value == exact else math.inf
+        print(f"{statistic:22} {exact:14.6g} {value:14.6g} {errors:12.2f}")
+        if not errors <= tolerance:
+            failed.append(statistic)
+    if failed:
+        sys.exit(f"Analytic {', '.join(failed)} of NPV not within {tolerance:g} std. errors of Monte Carlo")
+
+
+# ----- Command Line Interface ----- #
+BENCHMARKS = {"import": benchmark_import, "kernels": benchmark_kernels, "analytic": benchmark_analytic}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks of the RoI calculator")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS), help="Benchmark to run")
+    parser.add_argument("--repeats", type=int, default=10, help="Number of repetitions")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](repeats=args.repeats)
+
+
+if __name__ == "__main__":
+    main()
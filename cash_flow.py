@@ -3,16 +3,22 @@
 __version__ = "0.1"
 __author__ = "Vaibhav Gupta"
 
-from typing import List, Tuple
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple, Union
 from collections.abc import Iterable
+import contextlib
+import itertools
 import textwrap
 import math
 
 import numpy as np
-import lxml.etree as etree
 
+import kernels
+import pipeline
 import random_type
 
+if TYPE_CHECKING:
+    import lxml.etree as etree
+
 # ----- Currency Symbols ----- #
 USD_SIGN = "\u0024"    # United States dollar
 INR_SIGN = "\u20B9"    # Indian rupee
@@ -22,6 +28,35 @@ KRW_SIGN = "\u20A9"    # South Korean won
 EUR_SIGN = "\u20AC"    # Euro
 BITCOIN_SIGN = "\u20BF"
 
+# Currency symbols by currency code
+CURRENCY_SIGNS = {"USD": USD_SIGN, "INR": INR_SIGN, "GBP": GBP_SIGN, "JPY": JPY_SIGN, "KRW": KRW_SIGN,
+                  "EUR": EUR_SIGN, "XBT": BITCOIN_SIGN}
+DEFAULT_CURRENCY = "INR"
+
+
+# ----- Internal Functions ----- #
+def _index_names(entries: list, kind: str, index: Dict[str, int] = None) -> Dict[str, int]:
+    """
+    Extend the name to position index with the entries appended after it
+
+    Raises:
+        ValueError: If a name is already in the index or repeated in the entries
+    """
+    index = {} if index is None else index
+    new_index = {}
+    for (position, entry) in enumerate(entries, start=len(index)):
+        if entry.name in index or entry.name in new_index:
+            raise ValueError(f"{kind} named '{entry.name}' already exists")
+        new_index[entry.name] = position
+    index.update(new_index)
+    return index
+
+def _get_positions(index: Dict[str, int], names: Union[str, List[str]]) -> List[int]:
+    """Sorted positions of the named entries, ignoring unknown names"""
+    if isinstance(names, str):
+        names = [names]
+    return sorted({index[name] for name in names if name in index})
+
 
 # ----- Cash Flow Item ----- #
 class CashFlowItem():
@@ -31,9 +66,12 @@ class CashFlowItem():
     Attributes:
         name: Name of the item.
         desc: Description of the item.
+        currency: Code of the currency of the costs, the reporting currency of the summary if None.
     """
+    __slots__ = ("name", "desc", "currency", "_upfront_cost", "_recurring_cost")
     name: str
     desc: str
+    currency: Optional[str]
 
     # --- Properties --- #
     @property
@@ -59,7 +97,8 @@ class CashFlowItem():
                  name: str = "",
                  desc: str = "",
                  upfront_cost: random_type.RandomType = random_type.Constant(),
-                 recurring_cost: random_type.RandomType = random_type.Constant()) -> None:
+                 recurring_cost: random_type.RandomType = random_type.Constant(),
+                 currency: Optional[str] = None) -> None:
         """
         Default initialization method for CashFlowItem class
 
@@ -68,46 +107,168 @@ class CashFlowItem():
             desc: Description of the item
             upfront_cost: Upfront Cost of the item
             recurring_cost: Recurring Cost of the item
+            currency: Code of the currency of the costs, the reporting currency of the summary if None
         """
         self.name = name
         self.desc = desc
         self.upfront_cost = upfront_cost
         self.recurring_cost = recurring_cost
+        self.currency = currency
 
     @classmethod
-    def create_from_etree_element(cls, etree_element: etree.Element) -> None:
+    def create_from_etree_element(cls, etree_element: "etree.Element") -> None:
         """Initialize from an etree element"""
         name = etree_element.find('name').text
         desc = etree_element.find('desc').text
         desc = "" if desc is None else desc
+        currency_element = etree_element.find('currency')
         for random_type_element in etree_element.find('upfrontCost'):
             upfront_cost = random_type.create_from_etree_element(random_type_element)
         for random_type_element in etree_element.find('recurringCost'):
             recurring_cost = random_type.create_from_etree_element(random_type_element)
-        return cls(name=name, desc=desc, upfront_cost=upfront_cost, recurring_cost=recurring_cost)
+        return cls(name=name, desc=desc, upfront_cost=upfront_cost, recurring_cost=recurring_cost,
+                   currency=None if currency_element is None else currency_element.text)
+
+    @classmethod
+    def create_from_dict(cls, data: dict) -> "CashFlowItem":
+        """Initialize from a dictionary"""
+        return cls(name=data["name"], desc=data.get("desc", ""),
+                   upfront_cost=random_type.create_from_dict(data["upfrontCost"]),
+                   recurring_cost=random_type.create_from_dict(data["recurringCost"]),
+                   currency=data.get("currency"))
 
     # --- Methods --- #
-    def get_upfront_cost(self) -> float:
-        """Gives upfront cost of the item."""
-        return self.upfront_cost.sample_value(year=0)
+    def freeze(self) -> "FrozenCashFlowItem":
+        """Immutable and hashable form of the instance"""
+        return FrozenCashFlowItem(self.name, self.desc, self.upfront_cost.freeze(), self.recurring_cost.freeze(),
+                                  self.currency)
+
+    def get_upfront_cost(self,
+                         rng: Optional[np.random.Generator] = None,
+                         fx_rates: Optional[Dict[str, np.ndarray]] = None) -> float:
+        """
+        Gives upfront cost of the item.
+
+        Args:
+            rng: Random number generator, a fresh one if not given
+            fx_rates: (years+1, ) array of FX rates by currency code, to convert the cost by if given
+        """
+        return self._convert(self.upfront_cost.sample_value(year=0, rng=rng), 0, fx_rates)
 
-    def get_recurring_cost(self, year: int = 1) -> float:
+    def get_recurring_cost(self,
+                           year: int = 1,
+                           rng: Optional[np.random.Generator] = None,
+                           fx_rates: Optional[Dict[str, np.ndarray]] = None) -> float:
         """
         Sample recurring cost for the year
 
         Args:
             year: Year of sampling
+            rng: Random number generator, a fresh one if not given
+            fx_rates: (years+1, ) array of FX rates by currency code, to convert the cost by if given
 
         Returns:
             sampled recurring cost if year in active interval, 0 otherwise
         """
-        return self.recurring_cost.sample_value(year)
+        return self._convert(self.recurring_cost.sample_value(year, rng), year, fx_rates)
+
+    def sample_cash_flow(self,
+                         years: int,
+                         size: int,
+                         rng: np.random.Generator,
+                         fx_rates: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+        """
+        Sample cash flow of the item for a batch of iterations
+
+        Args:
+            years: Number of years for which cash flow is to be sampled
+            size: Number of iterations
+            rng: Random number generator
+            fx_rates: (size, years+1) array of FX rates by currency code, see `Summary.sample_fx_rates`,
+                the cash flow is converted by the rates of the currency of the item if given
+
+        Returns:
+            (size, years+1) array with upfront cost in the first column
+        """
+        cash_flow = np.empty((size, years + 1))
+        cash_flow[:, :1] = self.upfront_cost.sample_values(np.arange(1), size, rng)
+        cash_flow[:, 1:] = self.recurring_cost.sample_values(np.arange(1, years + 1), size, rng)
+        if fx_rates is not None and self.currency in fx_rates:
+            cash_flow *= fx_rates[self.currency]
+        return cash_flow
+
+    def sample_NPV(self,
+                   years: int,
+                   interest_rate: float,
+                   size: int,
+                   rng: np.random.Generator,
+                   fx_rates: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+        """
+        Sample contribution of the item to the net present value
+
+        Args:
+            years: Number of years for which cash flow is to be sampled
+            interest_rate: Annual rate of interest
+            size: Number of iterations
+            rng: Random number generator
+            fx_rates: (size, years+1) array of FX rates by currency code, see `sample_cash_flow`
+
+        Returns:
+            (size, ) array of discounted cash flow of the item
+        """
+        discount = (1 + interest_rate) ** -np.arange(years + 1, dtype=float)
+        return self.sample_cash_flow(years, size, rng, fx_rates) @ discount
+
+    def get_moments(self, years: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Analytic means and variances of the cash flow of the item, in the currency of the item
+
+        Args:
+            years: Number of years for which cash flow is to be sampled
+
+        Returns:
+            (years+1, ) arrays of means and variances, infinite if a distribution has no finite moment
+        """
+        (upfront_year, recurring_years) = (np.arange(1), np.arange(1, years + 1))
+        means = np.concatenate([self.upfront_cost.get_means(upfront_year),
+                                self.recurring_cost.get_means(recurring_years)])
+        variances = np.concatenate([self.upfront_cost.get_variances(upfront_year),
+                                    self.recurring_cost.get_variances(recurring_years)])
+        return (means, variances)
+
+    def get_NPV_moments(self,
+                        years: int,
+                        interest_rate: float,
+                        fx_rate: Optional["FXRate"] = None) -> Tuple[float, float]:
+        """
+        Analytic mean and variance of the contribution of the item to the net present value
+
+        Values of different years are sampled independently, so the variance
+        is the sum of the variances of the years times squared discount.
+
+        Args:
+            years: Number of years for which cash flow is to be sampled
+            interest_rate: Annual rate of interest
+            fx_rate: FX rate of the currency of the item, see `Summary.get_fx_rate`
+
+        Returns:
+            Mean and variance, infinite if a distribution has no finite moment
+        """
+        discount = (1 + interest_rate) ** -np.arange(years + 1, dtype=float)
+        (means, variances) = self.get_moments(years)
+        if fx_rate is not None:
+            (means, variances) = fx_rate.convert_moments(means, variances)
+        return (float(means @ discount), float(variances @ discount**2))
 
-    def generate_etree_element(self) -> etree.Element:
+    def generate_etree_element(self) -> "etree.Element":
         """Generate etree element of the instance"""
+        import lxml.etree as etree
+
         item_element = etree.Element("CashFlowItem")
         etree.SubElement(item_element, "name").text = self.name
         etree.SubElement(item_element, "desc").text = self.desc
+        if self.currency is not None:
+            etree.SubElement(item_element, "currency").text = self.currency
 
         upfront_cost_element = etree.SubElement(item_element, "upfrontCost")
         upfront_cost_element.append(self.upfront_cost.generate_etree_element())
@@ -117,13 +278,23 @@ class CashFlowItem():
 
         return item_element
 
+    def generate_dict(self) -> dict:
+        """Generate dictionary of the instance"""
+        data = {"name": self.name, "desc": self.desc}
+        if self.currency is not None:
+            data["currency"] = self.currency
+        data["upfrontCost"] = self.upfront_cost.generate_dict()
+        data["recurringCost"] = self.recurring_cost.generate_dict()
+        return data
+
     # --- String Representation --- #
     def __repr__(self) -> str:
         """String representation of the instance"""
         return "".join([f"{self.__class__.__name__}(name='{self.name}', ",
                         f"desc='{self.desc}', ",
                         f"upfront_cost={self.upfront_cost!r}, ",
-                        f"recurring_cost={self.recurring_cost!r})"])
+                        f"recurring_cost={self.recurring_cost!r}, ",
+                        f"currency={self.currency!r})"])
 
     def __str__(self) -> str:
         """Readable string representation of the instance"""
@@ -134,6 +305,12 @@ class CashFlowItem():
                         f"{prop_names[3]:14} -> {self.recurring_cost}"])
 
     # --- Internal Functions --- #
+    def _convert(self, cost: float, year: int, fx_rates: Optional[Dict[str, np.ndarray]]) -> float:
+        """Convert a sampled cost of the year by the FX rate of the currency of the item, if given"""
+        if fx_rates is not None and self.currency in fx_rates:
+            return cost * fx_rates[self.currency][year]
+        return cost
+
     def _checkCost(self, cost) -> random_type.RandomType:
         """Ensures that the data type of 'cost' is a RandomType."""
         if isinstance(cost, random_type.RandomType):
@@ -153,6 +330,7 @@ class CashFlowGroup():
         name: Name of the item
         desc: Description of the item
     """
+    __slots__ = ("name", "desc", "_items", "_item_index")
     name: str
     desc: str
 
@@ -165,6 +343,7 @@ class CashFlowGroup():
     @items.setter
     def items(self, items: List[CashFlowItem]) -> None:
         self._items = []
+        self._item_index = {}
         self.add_items(items)
 
     # --- Constructors --- #
@@ -185,68 +364,150 @@ class CashFlowGroup():
         self.items = items
 
     @classmethod
-    def create_from_etree_element(cls, etree_element: etree.Element) -> None:
+    def create_from_etree_element(cls, etree_element: "etree.Element") -> None:
         """Initialize from an etree element"""
         name = etree_element.find('name').text
         desc = etree_element.find('desc').text
         desc = "" if desc is None else desc
         items = [CashFlowItem.create_from_etree_element(item_element)
                  for item_element in etree_element.findall("CashFlowItem")]
-        return cls(name=name, desc=desc, items=items)
+        return cls._create_unchecked(name, desc, items)
+
+    @classmethod
+    def create_from_dict(cls, data: dict) -> "CashFlowGroup":
+        """Initialize from a dictionary"""
+        return cls._create_unchecked(data["name"], data.get("desc", ""),
+                                     [CashFlowItem.create_from_dict(item_data) for item_data in data["items"]])
+
+    @classmethod
+    def _create_unchecked(cls, name: str, desc: str, items: List[CashFlowItem]) -> "CashFlowGroup":
+        """Initialize from a list of items known to be CashFlowItem, skipping the type checks"""
+        group = cls.__new__(cls)
+        group.name = name
+        group.desc = desc
+        group._items = items
+        group._item_index = _index_names(items, "Item")
+        return group
 
     # --- Methods --- #
+    def freeze(self) -> "FrozenCashFlowGroup":
+        """Immutable and hashable form of the instance"""
+        return FrozenCashFlowGroup(self.name, self.desc, tuple(item.freeze() for item in self.items))
+
     def add_items(self, items: List[CashFlowItem]) -> None:
         """
         Appends items to the list of CashFlowGroup instance
 
         Args:
             items: List of items in the CashFlowGroup
+
+        Raises:
+            ValueError: If an item with the same name is already in the group
         """
         items = self._check_items(items)
+        _index_names(items, "Item", self._item_index)
         self.items.extend(items)
 
-    def get_items(self, item_names: List[str]) -> CashFlowItem:
+    def get_items(self, item_names: Union[str, List[str]]) -> List[CashFlowItem]:
         """
         Get specific items from the list of CashFlowGroup instance
 
         Args:
-            item_names: Names of items to remove from the CashFlowGroup
+            item_names: Names of items to get from the CashFlowGroup
         """
-        return [item for item in self.items if item.name in item_names]
+        return [self.items[position] for position in _get_positions(self._item_index, item_names)]
 
-    def remove_items(self, item_names: List[str]) -> None:
+    def remove_items(self, item_names: Union[str, List[str]]) -> None:
         """
         Remove specific items from the list of CashFlowGroup instance
 
         Args:
             item_names: Names of items to remove from the CashFlowGroup
         """
-        self.items = [item for item in self.items if item.name not in item_names]
+        positions = _get_positions(self._item_index, item_names)
+        if not positions:
+            return
+        removed = set(positions)
+        self.items[:] = [entry for (position, entry) in enumerate(self.items) if position not in removed]
+        self._item_index = _index_names(self.items, "Item")
+
+    def replace_item(self, item_name: str, item: CashFlowItem) -> None:
+        """
+        Replace an item of the CashFlowGroup instance, keeping its position
+
+        Args:
+            item_name: Name of the item to replace
+            item: New item
+
+        Raises:
+            KeyError: If there is no item with the name
+            ValueError: If the new name is taken by another item of the group
+        """
+        item = self._check_items(item)[0]
+        position = self._item_index[item_name]
+        if item.name != item_name and item.name in self._item_index:
+            raise ValueError(f"Item named '{item.name}' already exists")
+        del self._item_index[item_name]
+        self._item_index[item.name] = position
+        self.items[position] = item
+
+    def has_item(self, item_name: str) -> bool:
+        """Whether the CashFlowGroup has an item with the name"""
+        return item_name in self._item_index
 
     def get_names(self) -> List[str]:
         """Returns a list of cashflow items' name"""
         return [x.name for x in self.items]
 
-    def get_upfront_cost(self) -> List[float]:
+    def get_upfront_cost(self,
+                         rng: Optional[np.random.Generator] = None,
+                         fx_rates: Optional[Dict[str, np.ndarray]] = None) -> List[float]:
         """
         Gives list of upfront costs for all the items in the group.
 
         Returns:
             Upfront cost of the item
         """
-        return [x.get_upfront_cost() for x in self.items]
+        return [x.get_upfront_cost(rng, fx_rates) for x in self.items]
 
-    def get_recurring_cost(self, year: int) -> List[float]:
+    def get_recurring_cost(self,
+                           year: int,
+                           rng: Optional[np.random.Generator] = None,
+                           fx_rates: Optional[Dict[str, np.ndarray]] = None) -> List[float]:
         """
         Gives list of recurring costs for all the items in the group.
 
         Returns:
             Recurring cost of the item
         """
-        return [x.get_recurring_cost(year) for x in self.items]
+        return [x.get_recurring_cost(year, rng, fx_rates) for x in self.items]
+
+    def sample_net_cash_flow(self,
+                             years: int,
+                             size: int,
+                             rng: np.random.Generator,
+                             fx_rates: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+        """
+        Sample net cash flow of the group for a batch of iterations
+
+        Args:
+            years: Number of years for which cash flow is to be sampled
+            size: Number of iterations
+            rng: Random number generator
+            fx_rates: (size, years+1) array of FX rates by currency code, see `CashFlowItem.sample_cash_flow`
+
+        Returns:
+            (size, years+1) array of net cash flow
+        """
+        net_cash_flow = np.zeros((size, years + 1))
+        for item in self.items:
+            net_cash_flow += item.sample_cash_flow(years, size, rng, fx_rates)
+        return net_cash_flow
 
-    def generate_etree_element(self) -> etree.Element:
+    def generate_etree_element(self) -> "etree.Element":
         """Generate etree element of the instance"""
+        import lxml.etree as etree
+
         element = etree.Element("CashFlowGroup")
         etree.SubElement(element, "name").text = self.name
         etree.SubElement(element, "desc").text = self.desc
@@ -254,6 +515,12 @@ class CashFlowGroup():
             element.append(item.generate_etree_element())
         return element
 
+    def generate_dict(self) -> dict:
+        """Generate dictionary of the instance"""
+        return {"name": self.name,
+                "desc": self.desc,
+                "items": [item.generate_dict() for item in self.items]}
+
     # --- String Representation --- #
     def __repr__(self) -> str:
         """String representation of the instance"""
@@ -292,6 +559,7 @@ class CashFlowGroup():
 # ----- Cash Flow Sheet ----- #
 class CashFlowSheet():
     """Data class for the CashFlow sheet"""
+    __slots__ = ("_groups", "_group_index")
 
     # --- Properties --- #
     @property
@@ -302,6 +570,7 @@ class CashFlowSheet():
     @groups.setter
     def groups(self, groups: List[CashFlowGroup]) -> None:
         self._groups = []
+        self._group_index = {}
         self.add_groups(groups)
 
     # --- Constructors --- #
@@ -316,70 +585,172 @@ class CashFlowSheet():
         self.groups = groups
 
     @classmethod
-    def create_from_etree_element(cls, etree_element: etree.Element) -> None:
+    def create_from_etree_element(cls, etree_element: "etree.Element") -> None:
         """Initialize from an etree element"""
-        return cls(groups=[CashFlowGroup.create_from_etree_element(group_element)
-                           for group_element in etree_element.findall("CashFlowGroup")])
+        return cls._create_unchecked([CashFlowGroup.create_from_etree_element(group_element)
+                                      for group_element in etree_element.findall("CashFlowGroup")])
+
+    @classmethod
+    def create_from_dict(cls, data: dict) -> "CashFlowSheet":
+        """Initialize from a dictionary"""
+        return cls._create_unchecked([CashFlowGroup.create_from_dict(group_data) for group_data in data["groups"]])
+
+    @classmethod
+    def _create_unchecked(cls, groups: List[CashFlowGroup]) -> "CashFlowSheet":
+        """Initialize from a list of groups known to be CashFlowGroup, skipping the type checks"""
+        sheet = cls.__new__(cls)
+        sheet._groups = groups
+        sheet._group_index = _index_names(groups, "Group")
+        return sheet
 
     # --- Methods --- #
+    def freeze(self) -> Tuple["FrozenCashFlowGroup", ...]:
+        """Immutable and hashable form of the instance"""
+        return tuple(group.freeze() for group in self.groups)
+
     def add_groups(self, groups: List[CashFlowGroup]) -> None:
         """
         Appends groups to the list of CashFlowSheet instance
 
         Args:
             groups: List of groups in the CashFlowSheet
+
+        Raises:
+            ValueError: If a group with the same name is already in the sheet
         """
         groups = self._check_groups(groups)
+        _index_names(groups, "Group", self._group_index)
         self.groups.extend(groups)
 
-    def get_groups(self, group_names: List[str]) -> None:
+    def get_groups(self, group_names: Union[str, List[str]]) -> List[CashFlowGroup]:
         """
-        Get specific groups from the list of CashFlowGroup instance
+        Get specific groups from the list of CashFlowSheet instance
 
         Args:
-            group_names: Names of groups to remove from the CashFlowGroup
+            group_names: Names of groups to get from the CashFlowSheet
+        """
+        return [self.groups[position] for position in _get_positions(self._group_index, group_names)]
+
+    def remove_groups(self, group_names: Union[str, List[str]]) -> None:
         """
-        return [group for group in self.groups if group.name in group_names]
+        Remove specific groups from the list of CashFlowSheet instance
 
-    def remove_groups(self, group_names: List[str]) -> None:
+        Args:
+            group_names: Names of groups to remove from the CashFlowSheet
+        """
+        positions = _get_positions(self._group_index, group_names)
+        if not positions:
+            return
+        removed = set(positions)
+        self.groups[:] = [entry for (position, entry) in enumerate(self.groups) if position not in removed]
+        self._group_index = _index_names(self.groups, "Group")
+
+    def replace_group(self, group_name: str, group: CashFlowGroup) -> None:
         """
-        Remove specific groups from the list of CashFlowGroup instance
+        Replace a group of the CashFlowSheet instance, keeping its position
 
         Args:
-            group_names: Names of groups to remove from the CashFlowGroup
+            group_name: Name of the group to replace
+            group: New group
+
+        Raises:
+            KeyError: If there is no group with the name
+            ValueError: If the new name is taken by another group of the sheet
         """
-        self.groups = [group for group in self.groups if group.name not in group_names]
+        group = self._check_groups(group)[0]
+        position = self._group_index[group_name]
+        if group.name != group_name and group.name in self._group_index:
+            raise ValueError(f"Group named '{group.name}' already exists")
+        del self._group_index[group_name]
+        self._group_index[group.name] = position
+        self.groups[position] = group
+
+    def has_group(self, group_name: str) -> bool:
+        """Whether the CashFlowSheet has a group with the name"""
+        return group_name in self._group_index
 
     def get_names(self) -> List[Tuple[str, List[str]]]:
         """Gives cashflow groups' name and  cashflow items' name"""
         return [(grps.name, grps.get_names()) for grps in self.groups]
 
-    def get_cash_flow(self, years: int = 10) -> Tuple[List[List[float]], List[float]]:
+    def get_cash_flow(self,
+                      years: int = 10,
+                      rng: Optional[np.random.Generator] = None,
+                      fx_rates: Optional[Dict[str, np.ndarray]] = None) -> Tuple[List[List[float]], List[float]]:
         """
         Generate cashflow sheet for given number of years
 
+        Every item is sampled over all the years at once, as a single
+        iteration of `CashFlowItem.sample_cash_flow`, so Random Types whose
+        years depend on each other, e.g. a one-off event, behave as in a run.
+
         Args:
             years: Number of years for which sheet is to be generated
+            rng: Random number generator, a fresh one if not given
+            fx_rates: (years+1, ) array of FX rates by currency code, to convert the costs by if given
         """
-        total_cash_flow = [self.get_upfront_cost()] + ([self.get_recurring_cost(year) for year in range(1, years+1)])
+        if rng is None:
+            rng = np.random.default_rng()
+        item_cash_flows = [[item.sample_cash_flow(years, 1, rng, fx_rates)[0] for item in group.items]
+                           for group in self.groups]
+        total_cash_flow = [[[float(cash_flow[year]) for cash_flow in group_cash_flows]
+                            for group_cash_flows in item_cash_flows]
+                           for year in range(years + 1)]
         net_cash_flow = [sum([sum(grps) for grps in year]) for year in total_cash_flow]
         return (total_cash_flow, net_cash_flow)
 
-    def get_upfront_cost(self) -> List[float]:
+    def get_upfront_cost(self,
+                         rng: Optional[np.random.Generator] = None,
+                         fx_rates: Optional[Dict[str, np.ndarray]] = None) -> List[float]:
         """Gives list of upfront costs for all the items in the sheet"""
-        return [group.get_upfront_cost() for group in self.groups]
+        return [group.get_upfront_cost(rng, fx_rates) for group in self.groups]
 
-    def get_recurring_cost(self, year: int) -> List[float]:
+    def get_recurring_cost(self,
+                           year: int,
+                           rng: Optional[np.random.Generator] = None,
+                           fx_rates: Optional[Dict[str, np.ndarray]] = None) -> List[float]:
         """Gives list of recurring costs for all the items in the sheet"""
-        return [x.get_recurring_cost(year) for x in self.groups]
+        return [x.get_recurring_cost(year, rng, fx_rates) for x in self.groups]
+
+    def get_currencies(self) -> List[str]:
+        """Codes of the currencies of the items in the sheet, leaving out the reporting one (None)"""
+        return sorted({item.currency for group in self.groups for item in group.items if item.currency is not None})
+
+    def sample_net_cash_flow(self,
+                             years: int,
+                             size: int,
+                             rng: np.random.Generator,
+                             fx_rates: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+        """
+        Sample net cash flow of the sheet for a batch of iterations
 
-    def generate_etree_element(self) -> etree.Element:
+        Args:
+            years: Number of years for which cash flow is to be sampled
+            size: Number of iterations
+            rng: Random number generator
+            fx_rates: (size, years+1) array of FX rates by currency code, see `CashFlowItem.sample_cash_flow`
+
+        Returns:
+            (size, years+1) array of net cash flow
+        """
+        net_cash_flow = np.zeros((size, years + 1))
+        for group in self.groups:
+            net_cash_flow += group.sample_net_cash_flow(years, size, rng, fx_rates)
+        return net_cash_flow
+
+    def generate_etree_element(self) -> "etree.Element":
         """Generate etree element of the instance"""
+        import lxml.etree as etree
+
         element = etree.Element("CashFlowSheet")
         for group in self.groups:
             element.append(group.generate_etree_element())
         return element
 
+    def generate_dict(self) -> dict:
+        """Generate dictionary of the instance"""
+        return {"groups": [group.generate_dict() for group in self.groups]}
+
     # --- String Representation --- #
     def __repr__(self) -> str:
         """String representation of the instance"""
@@ -411,15 +782,137 @@ class CashFlowSheet():
             raise TypeError("Groups must be a list of CashFlowGroup")
 
 
+# ----- FX Rate ----- #
+class FXRate():
+    """
+    Class for the exchange rate of a currency to the reporting currency of a summary.
+
+    The rate of a year is the sum of the rates active in it, so a schedule
+    is given by rates with consecutive active intervals, e.g. Constant ones.
+
+    Attributes:
+        currency: Code of the currency converted from, e.g. "USD".
+        rates: Random Types of the units of reporting currency per unit of the currency.
+    """
+    __slots__ = ("currency", "rates")
+    currency: str
+    rates: List[random_type.RandomType]
+
+    # --- Constructors --- #
+    def __init__(self,
+                 currency: str,
+                 rates: Union[random_type.RandomType, List[random_type.RandomType]]) -> None:
+        """
+        Default initialization method for FXRate class
+
+        Args:
+            currency: Code of the currency converted from
+            rates: Random Type, or Random Types with active intervals, of the rate
+        """
+        self.currency = currency
+        self.rates = [rates] if isinstance(rates, random_type.RandomType) else list(rates)
+
+    @classmethod
+    def create_from_etree_element(cls, etree_element: "etree.Element") -> "FXRate":
+        """Initialize from an etree element"""
+        return cls(etree_element.find("currency").text,
+                   [random_type.create_from_etree_element(rate_element[0])
+                    for rate_element in etree_element.findall("rate")])
+
+    @classmethod
+    def create_from_dict(cls, data: dict) -> "FXRate":
+        """Initialize from a dictionary"""
+        return cls(data["currency"], [random_type.create_from_dict(rate_data) for rate_data in data["rates"]])
+
+    # --- Methods --- #
+    def freeze(self) -> "FrozenFXRate":
+        """Immutable and hashable form of the instance"""
+        return FrozenFXRate(self.currency, tuple(rate.freeze() for rate in self.rates))
+
+    def is_constant(self) -> bool:
+        """Whether the rate of every year is known in advance"""
+        return all(isinstance(rate, random_type.Constant) for rate in self.rates)
+
+    def sample_values(self, years: int, size: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Sample rates for a batch of iterations
+
+        Args:
+            years: Number of years for which rates are to be sampled
+            size: Number of iterations
+            rng: Random number generator
+
+        Returns:
+            (size, years+1) array of rates, (1, years+1) if constant, to be broadcast over the iterations
+        """
+        if self.is_constant():
+            return self.get_means(years)[np.newaxis]
+        values = np.zeros((size, years + 1))
+        for rate in self.rates:
+            values += rate.sample_values(np.arange(years + 1), size, rng)
+        return values
+
+    def get_means(self, years: int) -> np.ndarray:
+        """(years+1, ) array of means of the rates"""
+        return sum(rate.get_means(np.arange(years + 1)) for rate in self.rates)
+
+    def get_variances(self, years: int) -> np.ndarray:
+        """(years+1, ) array of variances of the rates"""
+        return sum(rate.get_variances(np.arange(years + 1)) for rate in self.rates)
+
+    def convert_moments(self, means: np.ndarray, variances: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Means and variances of yearly cash flows once converted by the rates
+
+        The rates are sampled independently of the cash flows, so a converted
+        value has mean `m_X m_R` and variance `(v_X + m_X^2)(v_R + m_R^2) - m_X^2 m_R^2`.
+
+        Args:
+            means: (years+1, ) array of means of the cash flows
+            variances: (years+1, ) array of variances of the cash flows
+
+        Returns:
+            (years+1, ) arrays of means and variances of the converted cash flows
+        """
+        years = len(means) - 1
+        (rate_means, rate_variances) = (self.get_means(years), self.get_variances(years))
+        return (means * rate_means,
+                (variances + means**2) * (rate_variances + rate_means**2) - (means * rate_means)**2)
+
+    def generate_etree_element(self) -> "etree.Element":
+        """Generate etree element of the instance"""
+        import lxml.etree as etree
+
+        element = etree.Element("FXRate")
+        etree.SubElement(element, "currency").text = self.currency
+        for rate in self.rates:
+            etree.SubElement(element, "rate").append(rate.generate_etree_element())
+        return element
+
+    def generate_dict(self) -> dict:
+        """Generate dictionary of the instance"""
+        return {"currency": self.currency, "rates": [rate.generate_dict() for rate in self.rates]}
+
+    # --- String Representation --- #
+    def __repr__(self) -> str:
+        """String representation of the instance"""
+        return f"{self.__class__.__name__}(currency='{self.currency}', rates={self.rates!r})"
+
+
 # ----- Summary ----- #
 class Summary():
     """Frontend class for the CashFlow sheet"""
+    __slots__ = ("cash_flow_sheet", "interest_rate", "years", "iterations", "seed", "_rng_algorithm", "sampled",
+                 "currency", "fx_rates", "pipeline", "_total_cash_flow", "_net_cash_flow", "_generator")
     cash_flow_sheet: CashFlowSheet
     interest_rate: float
     years: int
     iterations: int
+    seed: Optional[int]
     sampled: bool
-    currency: str = INR_SIGN
+    currency: str
+    fx_rates: List[FXRate]
+    pipeline: Tuple[pipeline.Stage, ...]
 
     # --- Properties --- #
     @property
@@ -444,12 +937,28 @@ class Summary():
     def net_cash_flow(self, input) -> None:
         raise RuntimeError("Net cash flow cannot be set externally")
 
+    @property
+    def rng_algorithm(self) -> str:
+        """Name of the bit generator of the random numbers"""
+        return self._rng_algorithm
+
+    @rng_algorithm.setter
+    def rng_algorithm(self, rng_algorithm: str) -> None:
+        if rng_algorithm not in random_type.RNG_ALGORITHMS:
+            raise ValueError(f"Unknown RNG algorithm '{rng_algorithm}'")
+        self._rng_algorithm = rng_algorithm
+
     # --- Constructors --- #
     def __init__(self,
                  cash_flow_sheet: CashFlowSheet,
                  interest_rate: float = 0.10,
                  years: int = 10,
-                 iterations: int = 10000) -> None:
+                 iterations: int = 10000,
+                 seed: Optional[int] = None,
+                 rng_algorithm: str = random_type.DEFAULT_RNG_ALGORITHM,
+                 currency: str = DEFAULT_CURRENCY,
+                 fx_rates: List[FXRate] = [],
+                 pipeline: Tuple[pipeline.Stage, ...] = ()) -> None:
         """
         Default initialization method for Summary class
 
@@ -457,62 +966,260 @@ class Summary():
             cash_flow_sheet: Instance of CashFlowSheet class
             interest_rate: Annual rate of interest
             years: Number of years for which cash flow has to be calculated
+            iterations: Number of Monte Carlo iterations
+            seed: Seed of the random numbers, a fresh one is drawn and kept on first sampling if None
+            rng_algorithm: Name of the bit generator, one of `random_type.RNG_ALGORITHMS`
+            currency: Code of the reporting currency, which all the results are in
+            fx_rates: FX rates to the reporting currency of the other currencies of the items
+            pipeline: Stages of post-processing of the net cash flow, see `pipeline`
         """
         self.cash_flow_sheet = cash_flow_sheet
         self.interest_rate = interest_rate
         self.years = years
         self.iterations = iterations
+        self.seed = seed
+        self.rng_algorithm = rng_algorithm
         self.sampled = False
+        self.currency = currency
+        self._generator = None
+        self.fx_rates = list(fx_rates)
+        self.pipeline = tuple(pipeline)
 
     @classmethod
-    def create_from_etree_element(cls, etree_element: etree.Element) -> None:
+    def create_from_etree_element(cls, etree_element: "etree.Element") -> None:
         """Initialize from an etree element"""
+        seed_element = etree_element.find("Seed")
+        rng_algorithm_element = etree_element.find("RNGAlgorithm")
+        currency_element = etree_element.find("Currency")
         return cls(cash_flow_sheet=CashFlowSheet.create_from_etree_element(etree_element.find("CashFlowSheet")),
                    interest_rate=float(etree_element.find("InterestRate").text),
-                   years=math.floor(float(etree_element.find("Years").text)))
+                   years=math.floor(float(etree_element.find("Years").text)),
+                   iterations=int(etree_element.find("Iterations").text),
+                   seed=None if seed_element is None else int(seed_element.text),
+                   rng_algorithm=(random_type.DEFAULT_RNG_ALGORITHM if rng_algorithm_element is None
+                                  else rng_algorithm_element.text),
+                   currency=DEFAULT_CURRENCY if currency_element is None else currency_element.text,
+                   fx_rates=[FXRate.create_from_etree_element(fx_rate_element)
+                             for fx_rate_element in etree_element.iterfind("FXRates/FXRate")],
+                   pipeline=[pipeline.create_from_etree_element(stage_element)
+                             for stage_element in etree_element.iterfind("Pipeline/*")])
+
+    @classmethod
+    def create_from_dict(cls, data: dict) -> "Summary":
+        """Initialize from a dictionary"""
+        return cls(cash_flow_sheet=CashFlowSheet.create_from_dict(data["cashFlowSheet"]),
+                   interest_rate=data["interestRate"],
+                   years=data["years"],
+                   iterations=data["iterations"],
+                   seed=data.get("seed"),
+                   rng_algorithm=data.get("rngAlgorithm", random_type.DEFAULT_RNG_ALGORITHM),
+                   currency=data.get("currency", DEFAULT_CURRENCY),
+                   fx_rates=[FXRate.create_from_dict(fx_rate_data) for fx_rate_data in data.get("fxRates", [])],
+                   pipeline=[pipeline.create_from_dict(stage_data) for stage_data in data.get("pipeline", [])])
 
     # --- Methods --- #
-    def generate_etree_element(self) -> etree.Element:
+    def freeze(self) -> "FrozenSummary":
+        """Immutable and hashable form of the instance"""
+        return FrozenSummary(self.interest_rate, self.years, self.iterations, self.cash_flow_sheet.freeze(),
+                             self.seed, self.rng_algorithm, self.currency,
+                             tuple(fx_rate.freeze() for fx_rate in self.fx_rates), self.pipeline)
+
+    def get_seed(self) -> int:
+        """Seed of the random numbers, drawing a fresh one and keeping it if there is none"""
+        if self.seed is None:
+            self.seed = random_type.create_seed()
+        return self.seed
+
+    def get_generator(self, chunk_no: Optional[int] = None) -> np.random.Generator:
+        """
+        Random number generator seeded by the seed of the summary
+
+        Args:
+            chunk_no: Number of the chunk of a run split in chunks, each chunk getting an independent
+                stream which does not depend on the order in which the chunks are run
+
+        Returns:
+            Random number generator
+        """
+        spawn_key = () if chunk_no is None else (chunk_no, )
+        return random_type.create_generator(self.get_seed(), self.rng_algorithm, spawn_key)
+
+    def get_currency_sign(self) -> str:
+        """Symbol of the reporting currency, its code if it has none"""
+        return CURRENCY_SIGNS.get(self.currency, self.currency)
+
+    def get_fx_rate(self, currency: Optional[str]) -> Optional[FXRate]:
+        """
+        FX rate of a currency to the reporting currency
+
+        Args:
+            currency: Code of the currency, e.g. of an item
+
+        Returns:
+            FX rate, None if the currency is the reporting one or None
+
+        Raises:
+            ValueError: If the summary has no FX rate for the currency
+        """
+        if currency is None or currency == self.currency:
+            return None
+        for fx_rate in self.fx_rates:
+            if fx_rate.currency == currency:
+                return fx_rate
+        raise ValueError(f"No FX rate from {currency} to the reporting currency {self.currency}")
+
+    def sample_fx_rates(self,
+                        size: int,
+                        rng: np.random.Generator,
+                        years: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Sample FX rates of the currencies of the items for a batch of iterations
+
+        The rates of a currency are shared by all its items in an iteration.
+        Nothing is drawn from the generator when no item needs converting.
+
+        Args:
+            size: Number of iterations
+            rng: Random number generator
+            years: Number of years for which rates are to be sampled, years of the summary if None
+
+        Returns:
+            (size, years+1) array of rates by currency code, see `FXRate.sample_values`
+
+        Raises:
+            ValueError: If an item is in a currency with no FX rate
+        """
+        years = self.years if years is None else years
+        fx_rates = {}
+        for currency in self.cash_flow_sheet.get_currencies():
+            fx_rate = self.get_fx_rate(currency)
+            if fx_rate is not None:
+                fx_rates[currency] = fx_rate.sample_values(years, size, rng)
+        return fx_rates
+
+    def sample_net_cash_flow(self,
+                             size: int,
+                             rng: np.random.Generator,
+                             years: Optional[int] = None) -> np.ndarray:
+        """
+        Sample net cash flow in the reporting currency for a batch of iterations, post-processed by the pipeline
+
+        Args:
+            size: Number of iterations
+            rng: Random number generator
+            years: Number of years for which cash flow is to be sampled, years of the summary if None
+
+        Returns:
+            (size, years+1) array of net cash flow
+        """
+        years = self.years if years is None else years
+        fx_rates = self.sample_fx_rates(size, rng, years)
+        return pipeline.apply(self.pipeline, self.cash_flow_sheet.sample_net_cash_flow(years, size, rng, fx_rates))
+
+    def _generate_currency_elements(self) -> List["etree.Element"]:
+        """Generate etree elements of the reporting currency, if not the default one, and of the FX rates"""
+        import lxml.etree as etree
+
+        elements = []
+        if self.currency != DEFAULT_CURRENCY:
+            elements.append(etree.Element("Currency"))
+            elements[-1].text = self.currency
+        if self.fx_rates:
+            elements.append(etree.Element("FXRates"))
+            elements[-1].extend(fx_rate.generate_etree_element() for fx_rate in self.fx_rates)
+        return elements
+
+    def _generate_pipeline_elements(self) -> List["etree.Element"]:
+        """Generate etree element of the pipeline, if it has any stage"""
+        import lxml.etree as etree
+
+        if not self.pipeline:
+            return []
+        element = etree.Element("Pipeline")
+        element.extend(stage.generate_etree_element() for stage in self.pipeline)
+        return [element]
+
+    def _generate_seed_elements(self) -> List["etree.Element"]:
+        """Generate etree elements of the seed and RNG algorithm, if not the default ones"""
+        import lxml.etree as etree
+
+        elements = []
+        if self.seed is not None:
+            elements.append(etree.Element("Seed"))
+            elements[-1].text = str(self.seed)
+        if self.rng_algorithm != random_type.DEFAULT_RNG_ALGORITHM:
+            elements.append(etree.Element("RNGAlgorithm"))
+            elements[-1].text = self.rng_algorithm
+        return elements
+
+    def generate_etree_element(self) -> "etree.Element":
         """Generate etree element of the instance"""
+        import lxml.etree as etree
+
         element = etree.Element("Summary")
         etree.SubElement(element, "InterestRate").text = str(self.interest_rate)
         etree.SubElement(element, "Years").text = str(self.years)
         etree.SubElement(element, "Iterations").text = str(self.iterations)
+        element.extend(self._generate_seed_elements())
+        element.extend(self._generate_currency_elements())
+        element.extend(self._generate_pipeline_elements())
         element.append(self.cash_flow_sheet.generate_etree_element())
         return element
 
-    def sample_cash_flow(self) -> None:
-        """Sample cash flow"""
-        (total_cash_flow, net_cash_flow) = self.cash_flow_sheet.get_cash_flow(self.years)
+    def generate_dict(self) -> dict:
+        """Generate dictionary of the instance"""
+        data = {"interestRate": self.interest_rate,
+                "years": self.years,
+                "iterations": self.iterations}
+        if self.seed is not None:
+            data["seed"] = self.seed
+        if self.rng_algorithm != random_type.DEFAULT_RNG_ALGORITHM:
+            data["rngAlgorithm"] = self.rng_algorithm
+        if self.currency != DEFAULT_CURRENCY:
+            data["currency"] = self.currency
+        if self.fx_rates:
+            data["fxRates"] = [fx_rate.generate_dict() for fx_rate in self.fx_rates]
+        if self.pipeline:
+            data["pipeline"] = [stage.generate_dict() for stage in self.pipeline]
+        data["cashFlowSheet"] = self.cash_flow_sheet.generate_dict()
+        return data
+
+    def sample_cash_flow(self, rng: Optional[np.random.Generator] = None) -> None:
+        """
+        Sample cash flow, in the reporting currency
+
+        Args:
+            rng: Random number generator, if None a generator seeded by the seed of the summary, created once
+                per seed and kept, so that every call samples a new cash flow
+        """
+        if rng is None:
+            key = (self.get_seed(), self.rng_algorithm)
+            if self._generator is None or self._generator[0] != key:
+                self._generator = (key, self.get_generator())
+            rng = self._generator[1]
+        fx_rates = {currency: rates[0] for (currency, rates) in self.sample_fx_rates(1, rng).items()}
+        (total_cash_flow, net_cash_flow) = self.cash_flow_sheet.get_cash_flow(self.years, rng, fx_rates)
         self._total_cash_flow = total_cash_flow
         self._net_cash_flow = net_cash_flow
         self.sampled = True
 
-    def get_IRR(self) -> float:
-        """Calculate internal rate of interest"""
+    def get_processed_cash_flow(self) -> np.ndarray:
+        """(years+1, ) array of the sampled net cash flow after the pipeline, which the metrics are of"""
         if not self.sampled:
             self.sample_cash_flow()
-        return np.irr(self.net_cash_flow)
+        return pipeline.apply(self.pipeline, np.array([self.net_cash_flow], dtype=float))[0]
+
+    def get_IRR(self) -> float:
+        """Calculate internal rate of interest of the sampled cash flow, NaN if it has none"""
+        return float(kernels.get_IRR(self.get_processed_cash_flow()[np.newaxis])[0])
 
     def get_NPV(self) -> float:
-        """Calculate net present value"""
-        if not self.sampled:
-            self.sample_cash_flow()
-        return np.npv(self.interest_rate, self.net_cash_flow)
+        """Calculate net present value of the sampled cash flow"""
+        return float(kernels.get_NPV(self.get_processed_cash_flow()[np.newaxis], self.interest_rate)[0])
 
     def get_payback_period(self) -> float:
-        """Calculate payback period"""
-        if not self.sampled:
-            self.sample_cash_flow()
-        cumsum_cash_flow = list(np.cumsum(self.net_cash_flow))
-        first_positive_year = self.years
-        for year in range(self.years):
-            if cumsum_cash_flow[year] > 0:
-                first_positive_year = year
-                break
-        complete_years = first_positive_year - 1
-        fractional_year = abs(cumsum_cash_flow[complete_years] / self.net_cash_flow[first_positive_year])
-        return (complete_years + fractional_year)
+        """Calculate payback period of the sampled cash flow"""
+        return float(kernels.get_payback_period(self.get_processed_cash_flow()[np.newaxis])[0])
 
     def get_textual_cash_flow_sheet(self) -> str:
         """Gives a textual cash flow sheet"""
@@ -523,27 +1230,31 @@ class Summary():
         format_str = "".join(["||{:^15.15}||{:^15.15}||",
                               "{:^15.15}||"*(self.years + 1)])
         years_text = ["Year {:d}".format(i) for i in range(self.years+1)]
-        string = format_str.format("Groups", "Items", *years_text)
+        lines = [format_str.format("Groups", "Items", *years_text)]
 
         # Total Cash Flow
+        currency_sign = self.get_currency_sign()
         names = self.cash_flow_sheet.get_names()
         format_str = "".join(["||{:^15.15}||{:^15.15}||",
-                              "".join([self.currency, "{:14.2f}||"])*(self.years + 1)])
+                              "".join([currency_sign, "{:14.2f}||"])*(self.years + 1)])
+        total_cash_flow = self.total_cash_flow
         for group_no in range(len(names)):
             group_name = names[group_no][0]
             item_names = names[group_no][1]
             for item_no in range(len(item_names)):
-                yr_val = [self.total_cash_flow[year][group_no][item_no]
+                yr_val = [total_cash_flow[year][group_no][item_no]
                           for year in range(self.years+1)]
-                string = "\n".join([string, format_str.format(group_name, item_names[item_no], *yr_val)])
+                lines.append(format_str.format(group_name, item_names[item_no], *yr_val))
                 group_name = ""    # Print Group name only in the first line
 
         # Net Cash Flow
         format_str = "".join(["||{:^32.32}||",
-                              "".join([self.currency, "{:14.2f}||"])*(self.years + 1)])
-        string = "\n".join([string, format_str.format("Net Cash Flow", *self.net_cash_flow)])
+                              "".join([currency_sign, "{:14.2f}||"])*(self.years + 1)])
+        lines.append(format_str.format("Net Cash Flow", *self.net_cash_flow))
+        if self.pipeline:
+            lines.append(format_str.format("After Pipeline", *self.get_processed_cash_flow()))
 
-        return string
+        return "\n".join(lines)
 
     # --- String Representation --- #
     def __repr__(self) -> str:
@@ -561,13 +1272,146 @@ class Summary():
                         f"{prop_names[2]:15}\n  =>{sheet_str}"])
 
 
+# ----- Frozen Summary ----- #
+class FrozenCashFlowItem(NamedTuple):
+    """Immutable and hashable form of a CashFlowItem"""
+    name: str
+    desc: str
+    upfront_cost: random_type.FrozenRandomType
+    recurring_cost: random_type.FrozenRandomType
+    currency: Optional[str] = None
+
+    def thaw(self) -> CashFlowItem:
+        """CashFlowItem of the frozen instance"""
+        return CashFlowItem(self.name, self.desc, self.upfront_cost.thaw(), self.recurring_cost.thaw(), self.currency)
+
+class FrozenCashFlowGroup(NamedTuple):
+    """Immutable and hashable form of a CashFlowGroup"""
+    name: str
+    desc: str
+    items: Tuple[FrozenCashFlowItem, ...]
+
+    def thaw(self) -> CashFlowGroup:
+        """CashFlowGroup of the frozen instance"""
+        return CashFlowGroup._create_unchecked(self.name, self.desc, [item.thaw() for item in self.items])
+
+class FrozenFXRate(NamedTuple):
+    """Immutable and hashable form of a FXRate"""
+    currency: str
+    rates: Tuple[random_type.FrozenRandomType, ...]
+
+    def thaw(self) -> FXRate:
+        """FXRate of the frozen instance"""
+        return FXRate(self.currency, [rate.thaw() for rate in self.rates])
+
+class FrozenSummary(NamedTuple):
+    """
+    Immutable and hashable form of a Summary
+
+    Being made of tuples alone, it is cheap to pickle for sending to
+    other processes and can be used as a dictionary key, e.g. for caches.
+    """
+    interest_rate: float
+    years: int
+    iterations: int
+    groups: Tuple[FrozenCashFlowGroup, ...]
+    seed: Optional[int] = None
+    rng_algorithm: str = random_type.DEFAULT_RNG_ALGORITHM
+    currency: str = DEFAULT_CURRENCY
+    fx_rates: Tuple[FrozenFXRate, ...] = ()
+    pipeline: Tuple["pipeline.Stage", ...] = ()
+
+    def thaw(self) -> Summary:
+        """Summary of the frozen instance"""
+        return Summary(CashFlowSheet._create_unchecked([group.thaw() for group in self.groups]),
+                       interest_rate=self.interest_rate, years=self.years, iterations=self.iterations,
+                       seed=self.seed, rng_algorithm=self.rng_algorithm, currency=self.currency,
+                       fx_rates=[fx_rate.thaw() for fx_rate in self.fx_rates], pipeline=self.pipeline)
+
+
 # ----- Module Methods for XML ----- #
+# lxml is imported on first use, so that computation alone does not pay its import cost
 def generate_XML_file(summary, file):
-    element = summary.generate_etree_element()
-    tree = etree.ElementTree(element)
-    tree.write(file, pretty_print=True, xml_declaration=True, method="xml")
+    stream_XML_file(summary, file)
+
+def stream_XML_file(summary: Summary,
+                    file,
+                    statistics_iterations: int = 0,
+                    rng: np.random.Generator = None) -> None:
+    """
+    Write XML file of the summary item by item
+
+    Only a single item is held as an etree element at a time, so memory
+    use does not grow with the size of the sheet.
+
+    Args:
+        summary: Summary to be written
+        file: File name or file object to write to
+        statistics_iterations: If non-zero, every item is sampled this many
+            times and statistics of its contribution to the NPV are written
+            along with it
+        rng: Random number generator for the statistics, the one of the summary if not given
+    """
+    import lxml.etree as etree
+
+    def _write(element, level):
+        etree.indent(element, space="  ", level=level)
+        xml_file.write("\n" + "  "*level, element)
+
+    def _text_element(tag, text):
+        element = etree.Element(tag)
+        element.text = text
+        return element
+
+    if statistics_iterations and rng is None:
+        rng = summary.get_generator()
+    fx_rates = summary.sample_fx_rates(statistics_iterations, rng) if statistics_iterations else None
+    output = contextlib.nullcontext(file) if hasattr(file, "write") else open(file, "wb")
+    with output as output_file, etree.xmlfile(output_file, encoding="ASCII") as xml_file:
+        # Text outside the root element cannot go through xmlfile
+        output_file.write(b"<?xml version='1.0' encoding='ASCII'?>\n")
+        with xml_file.element("Summary"):
+            _write(_text_element("InterestRate", str(summary.interest_rate)), 1)
+            _write(_text_element("Years", str(summary.years)), 1)
+            _write(_text_element("Iterations", str(summary.iterations)), 1)
+            settings = [summary._generate_seed_elements(), summary._generate_currency_elements(),
+                        summary._generate_pipeline_elements()]
+            for element in itertools.chain.from_iterable(settings):
+                _write(element, 1)
+            xml_file.write("\n  ")
+            with xml_file.element("CashFlowSheet"):
+                for group in summary.cash_flow_sheet.groups:
+                    xml_file.write("\n    ")
+                    with xml_file.element("CashFlowGroup"):
+                        _write(_text_element("name", group.name), 3)
+                        _write(_text_element("desc", group.desc), 3)
+                        for item in group.items:
+                            element = item.generate_etree_element()
+                            if statistics_iterations:
+                                element.append(_generate_statistics_element(
+                                    item.sample_NPV(summary.years, summary.interest_rate, statistics_iterations, rng,
+                                                    fx_rates)))
+                            _write(element, 3)
+                        xml_file.write("\n    ")
+                xml_file.write("\n  ")
+            xml_file.write("\n")
+        xml_file.flush()
+        output_file.write(b"\n")
+
+def _generate_statistics_element(values: np.ndarray) -> "etree.Element":
+    """Generate etree element with statistics of the sampled values"""
+    import lxml.etree as etree
+
+    element = etree.Element("Statistics", iterations=str(len(values)))
+    etree.SubElement(element, "mean").text = str(np.mean(values))
+    etree.SubElement(element, "std").text = str(np.std(values))
+    for (name, quantile) in zip(("p5", "p50", "p95"), np.quantile(values, [0.05, 0.5, 0.95])):
+        etree.SubElement(element, name).text = str(quantile)
+    return element
 
 def read_XML_file(file):
+    import lxml.etree as etree
+
     xmlschema_doc = etree.parse("xml_spec.xsd")
     xmlschema = etree.XMLSchema(xmlschema_doc)
     tree = etree.parse(file)
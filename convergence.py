@@ -0,0 +1,270 @@
+"""Module for Monte Carlo convergence diagnostics of the metrics
+
+`Convergence` extends `simulation.RunningStatistics`, updated chunk by
+chunk during a run, with:
+
+* the standard error of the mean of every metric
+* a batch-means confidence interval of the mean. Iterations are grouped
+  into consecutive batches, and the interval is the Student-t one of the
+  batch means. Once there are twice the target number of batches, pairs
+  of neighbouring batches are folded into one, doubling the batch size,
+  so memory stays bounded for any number of iterations.
+* the number of non-finite (failed) values, e.g. IRR without a solution,
+  kept out of all the statistics
+* a trace of the running mean at log-spaced checkpoints of the number of
+  iterations, e.g. 10, 13, 16, 20, 25, ..., to see whether it has settled
+
+Every update is vectorized over the chunk. `get_required_iterations`
+estimates how many iterations give a confidence interval of a given
+width, so a run tells whether it was long enough without a second one.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+import math
+import statistics
+
+import numpy as np
+
+from simulation import METRICS, RunningStatistics
+
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_BATCHES = 32
+DEFAULT_CHECKPOINTS_PER_DECADE = 10
+
+
+# ----- Module Methods ----- #
+def get_t_quantile(probability: float, degrees_of_freedom: int) -> float:
+    """
+    Quantile of Student's t distribution, by the Cornish-Fisher expansion around the normal one
+
+    Accurate to about 1e-4 for 3 or more degrees of freedom.
+
+    Args:
+        probability: Probability of the quantile
+        degrees_of_freedom: Degrees of freedom of the distribution
+
+    Returns:
+        Quantile of the distribution
+    """
+    z = statistics.NormalDist().inv_cdf(probability)
+    v = degrees_of_freedom
+    return z + (z**3 + z) / (4 * v) \
+        + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * v**2) \
+        + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * v**3) \
+        + (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / (92160 * v**4)
+
+def get_checkpoints(stop: int, per_decade: int = DEFAULT_CHECKPOINTS_PER_DECADE) -> np.ndarray:
+    """Log-spaced iteration counts from 1 up to stop, without repeats"""
+    if stop < 1:
+        return np.zeros(0, dtype=np.int64)
+    exponents = np.arange(int(math.floor(math.log10(stop) * per_decade)) + 1) / per_decade
+    return np.unique(np.round(10**exponents).astype(np.int64))
+
+
+# ----- Metric Convergence ----- #
+class MetricConvergence(NamedTuple):
+    """
+    Convergence diagnostics of a metric
+
+    Attributes:
+        metric: Name of the metric
+        count: Number of finite values
+        failed: Number of non-finite values
+        mean: Mean of the finite values
+        std: Std. deviation of the finite values
+        standard_error: Standard error of the mean
+        confidence: Confidence level of the interval
+        CI: Batch-means confidence interval around the mean, (NaN, NaN) with fewer than 2 batches
+        batches: Number of complete batches
+        batch_size: Number of iterations per batch
+        trace: Iterations at the checkpoints, and the running mean at each of them
+    """
+    metric: str
+    count: int
+    failed: int
+    mean: float
+    std: float
+    standard_error: float
+    confidence: float
+    CI: Tuple[float, float]
+    batches: int
+    batch_size: int
+    trace: Tuple[np.ndarray, np.ndarray]
+
+    def get_half_width(self) -> float:
+        """Half width of the confidence interval"""
+        return (self.CI[1] - self.CI[0]) / 2
+
+    def get_required_iterations(self, half_width: float) -> float:
+        """
+        Estimated number of iterations for the confidence interval to have a half width
+
+        The half width shrinks with the square root of the iterations, so
+        e.g. halving it takes four times the iterations run so far.
+
+        Args:
+            half_width: Wanted half width of the confidence interval
+
+        Returns:
+            Number of iterations, NaN if there is no interval yet
+        """
+        iterations = self.count + self.failed
+        return iterations * (self.get_half_width() / half_width)**2
+
+    def __str__(self) -> str:
+        """Readable string representation of the instance"""
+        return "".join([f"{self.metric}: mean {self.mean:.6g} ± {self.get_half_width():.3g} ",
+                        f"({self.confidence:.0%} CI, {self.batches} batches of {self.batch_size}), ",
+                        f"std. error {self.standard_error:.3g}, {self.count} values ({self.failed} undefined)"])
+
+
+# ----- Convergence ----- #
+class Convergence(RunningStatistics):
+    """
+    Running statistics of the metrics with convergence diagnostics, updated chunk by chunk
+
+    Attributes:
+        iterations: Number of iterations merged so far
+        confidence: Confidence level of the intervals
+        target_batches: Least number of batches once there are enough iterations; up to twice as many are kept
+        batch_size: Number of iterations per batch
+        checkpoints_per_decade: Number of trace checkpoints per decade of iterations
+    """
+    iterations: int
+    confidence: float
+    target_batches: int
+    batch_size: int
+    checkpoints_per_decade: int
+
+    def __init__(self,
+                 metrics: Iterable[str] = METRICS,
+                 confidence: float = DEFAULT_CONFIDENCE,
+                 target_batches: int = DEFAULT_BATCHES,
+                 checkpoints_per_decade: int = DEFAULT_CHECKPOINTS_PER_DECADE) -> None:
+        """
+        Default initialization method for Convergence class
+
+        Args:
+            metrics: Names of the metrics to track
+            confidence: Confidence level of the intervals
+            target_batches: Least number of batches once there are enough iterations
+            checkpoints_per_decade: Number of trace checkpoints per decade of iterations
+        """
+        super().__init__(metrics)
+        self.iterations = 0
+        self.confidence = confidence
+        self.target_batches = target_batches
+        self.batch_size = 1
+        self.checkpoints_per_decade = checkpoints_per_decade
+        # Sum and count of the finite values of every batch begun, the last one possibly open
+        self._batch_sums = {metric: np.zeros(0) for metric in self.count}
+        self._batch_counts = {metric: np.zeros(0, dtype=np.int64) for metric in self.count}
+        self._sums = {metric: 0.0 for metric in self.count}
+        self._trace: Dict[str, Tuple[List[int], List[float]]] = {metric: ([], []) for metric in self.count}
+
+    # --- Methods --- #
+    def update(self, chunk: Dict[str, np.ndarray]) -> None:
+        """
+        Merge a chunk of metric values into the statistics and diagnostics
+
+        Args:
+            chunk: Metric values of the chunk, as given by `simulation.run_chunk`
+        """
+        super().update(chunk)
+        size = len(chunk[next(iter(self.count))])
+        if size == 0:
+            return
+        (start, stop) = (self.iterations, self.iterations + size)
+        checkpoints = get_checkpoints(stop, self.checkpoints_per_decade)
+        checkpoints = checkpoints[checkpoints > start]
+        for metric in self.count:
+            values = chunk[metric]
+            finite = np.isfinite(values)
+            clean = np.where(finite, values, 0.0)
+            self._update_batches(metric, start, clean, finite)
+            self._update_trace(metric, start, checkpoints, clean, finite)
+        self.iterations = stop
+        while len(next(iter(self._batch_sums.values()))) > 2 * self.target_batches:
+            self._fold_batches()
+
+    def get(self, metric: str) -> MetricConvergence:
+        """Convergence diagnostics of the metric"""
+        count = self.count[metric]
+        std = self.get_std(metric)
+        standard_error = math.sqrt(self.m2[metric] / (count - 1) / count) if count > 1 else math.nan
+        batches = self.iterations // self.batch_size
+        sums = self._batch_sums[metric][:batches]
+        counts = self._batch_counts[metric][:batches]
+        batch_means = sums[counts > 0] / counts[counts > 0]
+        mean = self.mean[metric] if count else math.nan
+        if len(batch_means) > 1:
+            half_width = get_t_quantile((1 + self.confidence) / 2, len(batch_means) - 1) \
+                * float(np.std(batch_means, ddof=1)) / math.sqrt(len(batch_means))
+            CI = (mean - half_width, mean + half_width)
+        else:
+            CI = (math.nan, math.nan)
+        (trace_iterations, trace_means) = self._trace[metric]
+        return MetricConvergence(metric, count, self.failed[metric], mean, std, standard_error, self.confidence, CI,
+                                 len(batch_means), self.batch_size,
+                                 (np.array(trace_iterations, dtype=np.int64), np.array(trace_means)))
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        """Statistics and diagnostics as a plain dictionary, the trace as lists"""
+        data = super().as_dict()
+        for metric in self.count:
+            diagnostics = self.get(metric)
+            data[metric].update(standardError=diagnostics.standard_error,
+                                confidence=diagnostics.confidence,
+                                CI=list(diagnostics.CI),
+                                batches=diagnostics.batches,
+                                batchSize=diagnostics.batch_size,
+                                trace={"iterations": diagnostics.trace[0].tolist(),
+                                       "mean": diagnostics.trace[1].tolist()})
+        return data
+
+    # --- String Representation --- #
+    def __str__(self) -> str:
+        """Readable string representation of the instance"""
+        return "\n".join([f"{self.iterations} iterations"] + [str(self.get(metric)) for metric in self.count])
+
+    # --- Internal Functions --- #
+    def _update_batches(self, metric: str, start: int, clean: np.ndarray, finite: np.ndarray) -> None:
+        """Add the values to the batches they fall in, the first one possibly the open batch"""
+        first_batch = start // self.batch_size
+        batch_nos = (np.arange(start, start + len(clean)) // self.batch_size) - first_batch
+        sums = np.bincount(batch_nos, weights=clean)
+        counts = np.bincount(batch_nos, weights=finite.astype(np.float64)).astype(np.int64)
+        (old_sums, old_counts) = (self._batch_sums[metric], self._batch_counts[metric])
+        overlap = len(old_sums) - first_batch
+        if overlap > 0:
+            sums[:overlap] += old_sums[first_batch:]
+            counts[:overlap] += old_counts[first_batch:]
+        self._batch_sums[metric] = np.concatenate([old_sums[:first_batch], sums])
+        self._batch_counts[metric] = np.concatenate([old_counts[:first_batch], counts])
+
+    def _fold_batches(self) -> None:
+        """Merge pairs of neighbouring batches, doubling the batch size"""
+        for metric in self.count:
+            for batches in (self._batch_sums, self._batch_counts):
+                values = batches[metric]
+                if len(values) % 2:
+                    values = np.append(values, 0)
+                batches[metric] = values[0::2] + values[1::2]
+        self.batch_size *= 2
+
+    def _update_trace(self, metric: str, start: int, checkpoints: np.ndarray, clean: np.ndarray,
+                      finite: np.ndarray) -> None:
+        """Add the running mean at the checkpoints within the chunk"""
+        cumulative_sum = self._sums[metric] + np.cumsum(clean)
+        self._sums[metric] = float(cumulative_sum[-1])
+        if len(checkpoints) == 0:
+            return
+        positions = checkpoints - start - 1
+        cumulative_count = self.count[metric] - np.count_nonzero(finite) + np.cumsum(finite)[positions]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = np.where(cumulative_count > 0, cumulative_sum[positions] / cumulative_count, np.nan)
+        self._trace[metric][0].extend(checkpoints.tolist())
+        self._trace[metric][1].extend(means.tolist())
@@ -0,0 +1,254 @@
+"""Module for exporting simulation results to CSV and Parquet
+
+Two tables can be exported:
+
+* metrics: one row per iteration with its IRR, NPV and payback period
+* cash_flow: one row per iteration and item with its sampled cash flow of every year
+
+The iterations are run, and written, chunk by chunk, so memory use does
+not grow with the number of iterations. Chunk `n` is sampled with
+`Summary.get_generator(n)`, so both tables of a seeded summary hold the
+same iterations when exported with the same chunk size. Parquet needs the
+optional `pyarrow` package. The summary is checked by
+`validation.check` before the first chunk is run. Given a `telemetry.Telemetry`, the exporters
+count the chunks and report after every one of them, the time of writing
+going into the "write" stage.
+
+Run as a script to export a scenario, e.g.
+`python export.py scenario.xml metrics.parquet --iterations 1000000`.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from typing import Callable, Dict, Iterator, Optional, Tuple
+import argparse
+import contextlib
+import os
+
+import numpy as np
+
+from cash_flow import Summary
+from simulation import METRICS, run_chunk
+from telemetry import Telemetry, add_telemetry_arguments, create_from_arguments, measure
+from validation import check, check_iterations
+
+TABLES = ("metrics", "cash_flow")
+DEFAULT_CHUNK_SIZE = 100000
+
+
+# ----- Internal Functions ----- #
+def _iterate_chunks(summary: Summary,
+                    iterations: Optional[int],
+                    chunk_size: int) -> Iterator[Tuple[int, int, np.random.Generator]]:
+    """Yield first iteration, size and random number generator of every chunk, once the summary is checked"""
+    check(summary)
+    iterations = check_iterations(summary.iterations if iterations is None else iterations)
+    for (chunk_no, start) in enumerate(range(0, iterations, chunk_size)):
+        yield (start, min(chunk_size, iterations - start), summary.get_generator(chunk_no))
+
+def _iterate_item_cash_flows(summary: Summary,
+                             iterations: Optional[int],
+                             chunk_size: int,
+                             telemetry: Optional[Telemetry] = None) -> Iterator[Tuple[int, str, str, np.ndarray]]:
+    """Yield first iteration, group name, item name and (size, years+1) sampled cash flow of every chunk and item"""
+    for (start, size, rng) in _iterate_chunks(summary, iterations, chunk_size):
+        with measure(telemetry, "sample"):
+            fx_rates = summary.sample_fx_rates(size, rng)
+        for group in summary.cash_flow_sheet.groups:
+            for item in group.items:
+                with measure(telemetry, "sample"):
+                    cash_flow = item.sample_cash_flow(summary.years, size, rng, fx_rates)
+                if telemetry is not None:
+                    telemetry.add_arrays(cash_flow)
+                yield (start, group.name, item.name, cash_flow)
+        if telemetry is not None:
+            telemetry.add_samples(size)
+            telemetry.report()
+
+def _report(telemetry: Optional[Telemetry]) -> None:
+    """Write the final report of the telemetry, if any"""
+    if telemetry is not None:
+        telemetry.report(final=True)
+
+def _quote_CSV(text: str) -> str:
+    """Quote text for a CSV field, when needed"""
+    if any(character in text for character in ',"\n\r'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+def _write_rows(csv_file, row_format: str, array: np.ndarray) -> None:
+    """Write the rows of the array with a single write, as `np.savetxt` would one by one"""
+    row_format += "\n"
+    csv_file.write("".join([row_format % row for row in map(tuple, array.tolist())]))
+
+def _open(file, mode: str):
+    """Open a file path, or pass an already open file object through"""
+    if hasattr(file, "write"):
+        return contextlib.nullcontext(file)
+    return open(file, mode)
+
+
+# ----- Module Methods for CSV ----- #
+def export_metrics_CSV(summary: Summary,
+                       file,
+                       iterations: Optional[int] = None,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       telemetry: Optional[Telemetry] = None) -> None:
+    """
+    Write metrics of every iteration to a CSV file
+
+    Args:
+        summary: Summary to be simulated
+        file: File name or text file object to write to
+        iterations: Number of iterations, iterations of the summary if None
+        chunk_size: Number of iterations run and written at a time
+        telemetry: Telemetry of the export
+    """
+    with _open(file, "w") as csv_file:
+        csv_file.write(",".join(("iteration", ) + METRICS) + "\n")
+        for (start, size, rng) in _iterate_chunks(summary, iterations, chunk_size):
+            values = run_chunk(summary, size, rng, telemetry)
+            with measure(telemetry, "write"):
+                columns = [np.arange(start, start + size)] + [values[metric] for metric in METRICS]
+                _write_rows(csv_file, ",".join(["%d"] + ["%.17g"] * len(METRICS)), np.column_stack(columns))
+            if telemetry is not None:
+                telemetry.report()
+    _report(telemetry)
+
+def export_cash_flow_CSV(summary: Summary,
+                         file,
+                         iterations: Optional[int] = None,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         telemetry: Optional[Telemetry] = None) -> None:
+    """
+    Write sampled cash flow of every iteration and item to a CSV file
+
+    Args:
+        summary: Summary to be simulated
+        file: File name or text file object to write to
+        iterations: Number of iterations, iterations of the summary if None
+        chunk_size: Number of iterations run and written at a time
+        telemetry: Telemetry of the export
+    """
+    year_columns = [f"year_{year}" for year in range(summary.years + 1)]
+    with _open(file, "w") as csv_file:
+        csv_file.write(",".join(["iteration", "group", "item"] + year_columns) + "\n")
+        for (start, group_name, item_name, cash_flow) in _iterate_item_cash_flows(summary, iterations, chunk_size,
+                                                                                  telemetry):
+            with measure(telemetry, "write"):
+                # Names are constant over the block, so they go into the format itself
+                names = ",".join([_quote_CSV(group_name), _quote_CSV(item_name)]).replace("%", "%%")
+                iteration = np.arange(start, start + len(cash_flow))
+                _write_rows(csv_file, ",".join(["%d", names] + ["%.17g"] * len(year_columns)),
+                            np.column_stack([iteration, cash_flow]))
+    _report(telemetry)
+
+
+# ----- Module Methods for Parquet ----- #
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as error:
+        raise ImportError("Parquet export needs the optional 'pyarrow' package") from error
+    return pyarrow
+
+def export_metrics_Parquet(summary: Summary,
+                           file,
+                           iterations: Optional[int] = None,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE,
+                           telemetry: Optional[Telemetry] = None) -> None:
+    """
+    Write metrics of every iteration to a Parquet file, a row group per chunk
+
+    Args:
+        summary: Summary to be simulated
+        file: File name or binary file object to write to
+        iterations: Number of iterations, iterations of the summary if None
+        chunk_size: Number of iterations run and written at a time
+        telemetry: Telemetry of the export
+    """
+    pyarrow = _import_pyarrow()
+    schema = pyarrow.schema([("iteration", pyarrow.int64())] + [(metric, pyarrow.float64()) for metric in METRICS])
+    with pyarrow.parquet.ParquetWriter(file, schema) as writer:
+        for (start, size, rng) in _iterate_chunks(summary, iterations, chunk_size):
+            values = run_chunk(summary, size, rng, telemetry)
+            with measure(telemetry, "write"):
+                columns = [np.arange(start, start + size, dtype=np.int64)] + [values[metric] for metric in METRICS]
+                writer.write_table(pyarrow.Table.from_arrays(columns, schema=schema))
+            if telemetry is not None:
+                telemetry.report()
+    _report(telemetry)
+
+def export_cash_flow_Parquet(summary: Summary,
+                             file,
+                             iterations: Optional[int] = None,
+                             chunk_size: int = DEFAULT_CHUNK_SIZE,
+                             telemetry: Optional[Telemetry] = None) -> None:
+    """
+    Write sampled cash flow of every iteration and item to a Parquet file, a row group per chunk and item
+
+    Args:
+        summary: Summary to be simulated
+        file: File name or binary file object to write to
+        iterations: Number of iterations, iterations of the summary if None
+        chunk_size: Number of iterations run and written at a time
+        telemetry: Telemetry of the export
+    """
+    pyarrow = _import_pyarrow()
+    name_type = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    year_fields = [(f"year_{year}", pyarrow.float64()) for year in range(summary.years + 1)]
+    schema = pyarrow.schema([("iteration", pyarrow.int64()), ("group", name_type), ("item", name_type)] + year_fields)
+    with pyarrow.parquet.ParquetWriter(file, schema) as writer:
+        for (start, group_name, item_name, cash_flow) in _iterate_item_cash_flows(summary, iterations, chunk_size,
+                                                                                  telemetry):
+            with measure(telemetry, "write"):
+                size = len(cash_flow)
+                names = [pyarrow.DictionaryArray.from_arrays(np.zeros(size, dtype=np.int32), [name])
+                         for name in (group_name, item_name)]
+                columns = [np.arange(start, start + size, dtype=np.int64)] + names + list(cash_flow.T)
+                writer.write_table(pyarrow.Table.from_arrays(columns, schema=schema))
+    _report(telemetry)
+
+
+# ----- Module Methods for any Format ----- #
+EXPORTERS: Dict[Tuple[str, str], Callable] = {
+    ("metrics", ".csv"): export_metrics_CSV,
+    ("cash_flow", ".csv"): export_cash_flow_CSV,
+    ("metrics", ".parquet"): export_metrics_Parquet,
+    ("cash_flow", ".parquet"): export_cash_flow_Parquet,
+}
+
+def export_file(summary: Summary,
+                file: str,
+                table: str = "metrics",
+                iterations: Optional[int] = None,
+                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                telemetry: Optional[Telemetry] = None) -> None:
+    """Export a table in the format given by the file extension, see the exporters"""
+    extension = os.path.splitext(file)[1].lower()
+    if (table, extension) not in EXPORTERS:
+        raise ValueError(f"Cannot export table '{table}' as '{extension}', expected one of {TABLES} "
+                         "as .csv or .parquet")
+    EXPORTERS[(table, extension)](summary, file, iterations, chunk_size, telemetry)
+
+
+# ----- Command Line Interface ----- #
+def main() -> None:
+    from scenario_format import read_file
+
+    parser = argparse.ArgumentParser(description="Export per-iteration results of a scenario to CSV or Parquet")
+    parser.add_argument("scenario", help="Scenario in any of the scenario formats")
+    parser.add_argument("destination", help="Exported file, format given by the extension")
+    parser.add_argument("--table", choices=TABLES, default="metrics", help="Table to export")
+    parser.add_argument("--iterations", type=int, default=None, help="Number of iterations")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Iterations per chunk")
+    add_telemetry_arguments(parser)
+    args = parser.parse_args()
+    telemetry = create_from_arguments(args, {"scenario": args.scenario, "table": args.table})
+    export_file(read_file(args.scenario), args.destination, args.table, args.iterations, args.chunk_size, telemetry)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Module for goal seeking a parameter of a Random Type
+
+Goal seek finds the value of a parameter of an item's Random Type for
+which a statistic of a metric hits the target, e.g. the upfront cost for
+which P(NPV > 0) = 90%, or the break-even mu of a recurring cost.
+
+Every item is sampled with its own seed, so the items which are not
+sought are sampled only once, and re-sampling the sought item with the
+same seed at every step gives common random numbers. Each step of the
+bracketing secant (Illinois) iterations then costs one item's sampling.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from typing import Callable, Dict, List, Optional, Tuple
+import copy
+import math
+
+import numpy as np
+
+import pipeline
+from cash_flow import CashFlowItem, Summary
+from simulation import get_IRR, get_NPV, get_payback_period
+
+COSTS = ("upfront_cost", "recurring_cost")
+
+
+# ----- Statistics ----- #
+def get_mean() -> Callable[[np.ndarray], float]:
+    """Statistic giving mean of the finite values"""
+    return lambda values: float(np.mean(values[np.isfinite(values)]))
+
+def get_quantile(quantile: float) -> Callable[[np.ndarray], float]:
+    """Statistic giving the quantile of the finite values"""
+    return lambda values: float(np.quantile(values[np.isfinite(values)], quantile))
+
+def get_probability_above(threshold: float = 0.0) -> Callable[[np.ndarray], float]:
+    """Statistic giving the probability of a value above the threshold"""
+    return lambda values: float(np.mean(values > threshold))
+
+
+# ----- Goal Seek Result ----- #
+class GoalSeekResult():
+    """
+    Class for the result of a goal seek
+
+    Attributes:
+        value: Value of the parameter hitting the target
+        statistic: Statistic at the value
+        converged: Whether the target was hit within tolerance
+        steps: Pairs of parameter value and statistic, in order of evaluation
+    """
+    value: float
+    statistic: float
+    converged: bool
+    steps: List[Tuple[float, float]]
+
+    def __init__(self, value: float, statistic: float, converged: bool, steps: List[Tuple[float, float]]) -> None:
+        """
+        Default initialization method for GoalSeekResult class
+
+        Args:
+            value: Value of the parameter hitting the target
+            statistic: Statistic at the value
+            converged: Whether the target was hit within tolerance
+            steps: Pairs of parameter value and statistic, in order of evaluation
+        """
+        self.value = value
+        self.statistic = statistic
+        self.converged = converged
+        self.steps = steps
+
+    def __repr__(self) -> str:
+        """String representation of the instance"""
+        return "".join([f"{self.__class__.__name__}(value={self.value!r}, ",
+                        f"statistic={self.statistic!r}, ",
+                        f"converged={self.converged}, ",
+                        f"steps={len(self.steps)})"])
+
+
+# ----- Goal Seeker ----- #
+class GoalSeeker():
+    """
+    Goal seek over common random numbers of a summary
+
+    Attributes:
+        summary: Summary to be evaluated
+        iterations: Number of iterations
+        metric: One of "NPV", "IRR" or "payback_period"
+    """
+    summary: Summary
+    iterations: int
+    metric: str
+
+    def __init__(self,
+                 summary: Summary,
+                 iterations: Optional[int] = None,
+                 seed: Optional[int] = None,
+                 metric: str = "NPV") -> None:
+        """
+        Default initialization method for GoalSeeker class, sampling all the items once
+
+        Args:
+            summary: Summary to be evaluated
+            iterations: Number of iterations, iterations of the summary if None
+            seed: Seed of the random numbers, the one of the summary if None
+            metric: One of "NPV", "IRR" or "payback_period"
+        """
+        if metric not in ("NPV", "IRR", "payback_period"):
+            raise ValueError(f"Unknown metric '{metric}'")
+        self.summary = summary
+        self.iterations = summary.iterations if iterations is None else iterations
+        self.metric = metric
+
+        items = [(group.name, item) for group in summary.cash_flow_sheet.groups for item in group.items]
+        seed_sequences = np.random.SeedSequence(summary.get_seed() if seed is None else seed).spawn(len(items) + 1)
+        # FX rates are shared by all the items, so they get a stream of their own
+        self._fx_rates = summary.sample_fx_rates(self.iterations, np.random.default_rng(seed_sequences.pop()))
+        self._seeds: Dict[Tuple[str, str], np.random.SeedSequence] = {}
+        self._net_cash_flow = np.zeros((self.iterations, summary.years + 1))
+        for ((group_name, item), seed_sequence) in zip(items, seed_sequences):
+            self._seeds[(group_name, item.name)] = seed_sequence
+            self._net_cash_flow += self._sample_item(item, seed_sequence)
+
+    # --- Methods --- #
+    def evaluate(self, net_cash_flow: np.ndarray) -> np.ndarray:
+        """Metric of the net cash flow, once post-processed by the pipeline of the summary"""
+        net_cash_flow = pipeline.apply(self.summary.pipeline, net_cash_flow)
+        if self.metric == "NPV":
+            return get_NPV(net_cash_flow, self.summary.interest_rate)
+        elif self.metric == "IRR":
+            return get_IRR(net_cash_flow)
+        else:
+            return get_payback_period(net_cash_flow)
+
+    def seek(self,
+             group_name: str,
+             item_name: str,
+             cost: str,
+             parameter: str,
+             target: float,
+             statistic: Callable[[np.ndarray], float] = get_mean(),
+             bracket: Optional[Tuple[float, float]] = None,
+             tolerance: float = 1e-6,
+             max_steps: int = 100) -> GoalSeekResult:
+        """
+        Find the parameter value for which the statistic of the metric hits the target
+
+        Args:
+            group_name: Name of the group of the item
+            item_name: Name of the item
+            cost: Cost of the item, "upfront_cost" or "recurring_cost"
+            parameter: Parameter of the Random Type, e.g. "mu" or "value"
+            target: Target of the statistic
+            statistic: Function giving the statistic of the metric values, see `get_mean` etc.
+            bracket: Parameter values enclosing the solution, searched from the current value if None
+            tolerance: Absolute tolerance on the statistic
+            max_steps: Maximum number of evaluations
+
+        Returns:
+            Result of the goal seek
+        """
+        if cost not in COSTS:
+            raise ValueError(f"cost must be one of {COSTS}")
+        item = self.summary.cash_flow_sheet.get_groups(group_name)[0].get_items(item_name)[0]
+        seed_sequence = self._seeds[(group_name, item_name)]
+        other_cash_flow = self._net_cash_flow - self._sample_item(item, seed_sequence)
+        steps = []
+
+        def _objective(value: float) -> float:
+            random_type = copy.copy(getattr(item, cost))
+            setattr(random_type, parameter, value)
+            trial_item = copy.copy(item)
+            setattr(trial_item, cost, random_type)
+            result = statistic(self.evaluate(other_cash_flow + self._sample_item(trial_item, seed_sequence)))
+            steps.append((value, result))
+            return result - target
+
+        if bracket is None:
+            (bracket, bracket_values) = _find_bracket(_objective, float(getattr(getattr(item, cost), parameter)),
+                                                      max_steps)
+        else:
+            bracket_values = None
+        (value, objective_value, converged) = _illinois(_objective, bracket, tolerance, max_steps - len(steps),
+                                                        bracket_values)
+        return GoalSeekResult(value, objective_value + target, converged, steps)
+
+    # --- Internal Functions --- #
+    def _sample_item(self, item: CashFlowItem, seed_sequence: np.random.SeedSequence) -> np.ndarray:
+        """Sample the item with its own, always identical, random numbers"""
+        return item.sample_cash_flow(self.summary.years, self.iterations, np.random.default_rng(seed_sequence),
+                                     self._fx_rates)
+
+
+# ----- Solvers ----- #
+def _find_bracket(objective: Callable[[float], float],
+                  start: float,
+                  max_steps: int) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+    """Expand geometrically from the start value till the objective changes sign, giving bracket and objective"""
+    start_value = objective(start)
+    step = max(abs(start), 1.0) / 2
+    for _ in range(max_steps // 2):
+        for value in (start - step, start + step):
+            objective_value = objective(value)
+            if objective_value * start_value <= 0:
+                if value > start:
+                    return ((start, value), (start_value, objective_value))
+                return ((value, start), (objective_value, start_value))
+        step *= 2
+    raise ValueError("Could not bracket the target, give a bracket explicitly")
+
+def _illinois(objective: Callable[[float], float],
+              bracket: Tuple[float, float],
+              tolerance: float,
+              max_steps: int,
+              bracket_values: Optional[Tuple[float, float]] = None) -> Tuple[float, float, bool]:
+    """
+    Bracketing secant iterations with the Illinois modification
+
+    Args:
+        objective: Function whose root is sought
+        bracket: Parameter values enclosing the root
+        tolerance: Absolute tolerance on the objective
+        max_steps: Maximum number of evaluations after the ends of the bracket
+        bracket_values: Objective at the ends of the bracket if already known, evaluated if None
+
+    Returns:
+        Parameter value, objective at the value, and whether it is within tolerance
+    """
+    (lower, upper) = bracket
+    if bracket_values is None:
+        bracket_values = (objective(lower), objective(upper))
+    (lower_value, upper_value) = bracket_values
+    if lower_value * upper_value > 0:
+        raise ValueError("Target is not bracketed")
+    side = 0
+    (value, objective_value) = (lower, lower_value) if abs(lower_value) < abs(upper_value) else (upper, upper_value)
+    value_error = abs(objective_value)
+    for _ in range(max_steps):
+        if value_error <= tolerance or math.isclose(lower, upper, rel_tol=1e-12, abs_tol=1e-12):
+            break
+        if upper_value == lower_value:
+            value = (lower + upper) / 2
+        else:
+            value = (lower * upper_value - upper * lower_value) / (upper_value - lower_value)
+        objective_value = objective(value)
+        value_error = abs(objective_value)
+        if objective_value * upper_value > 0:
+            (upper, upper_value) = (value, objective_value)
+            if side == -1:
+                lower_value /= 2
+            side = -1
+        elif objective_value * lower_value > 0:
+            (lower, lower_value) = (value, objective_value)
+            if side == 1:
+                upper_value /= 2
+            side = 1
+        else:
+            value_error = 0.0
+    return (value, objective_value, value_error <= tolerance)
+
+
+# ----- Module Methods ----- #
+def goal_seek(summary: Summary,
+              group_name: str,
+              item_name: str,
+              cost: str,
+              parameter: str,
+              target: float,
+              statistic: Callable[[np.ndarray], float] = get_mean(),
+              metric: str = "NPV",
+              bracket: Optional[Tuple[float, float]] = None,
+              iterations: Optional[int] = None,
+              seed: Optional[int] = None) -> GoalSeekResult:
+    """
+    Goal seek a single parameter, see `GoalSeeker.seek`
+
+    Use a `GoalSeeker` directly to seek for several items, so that the
+    summary is sampled only once.
+    """
+    return GoalSeeker(summary, iterations, seed, metric).seek(group_name, item_name, cost, parameter, target,
+                                                              statistic, bracket)
@@ -0,0 +1,407 @@
+"""Module for the local job service running Monte Carlo simulations
+
+The service accepts scenario XML over HTTP (on a TCP port or a Unix socket),
+runs the iterations in chunks on a shared process pool and serves the
+statistics of finished scenarios from a cache keyed by the scenario hash.
+Chunks of the queued jobs are interleaved by the `scheduler` module.
+
+Endpoints:
+    POST   /jobs[?iterations=N&priority=P]
+                                 Submit scenario XML given in the request body
+    GET    /jobs                 List all the jobs
+    GET    /jobs/<id>            Status, progress and (partial) statistics
+    GET    /jobs/<id>/events     Stream of status updates as JSON lines
+    DELETE /jobs/<id>            Cancel the job
+    GET    /metrics              Telemetry of all the jobs as OpenMetrics text
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from typing import Dict, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from urllib.parse import urlsplit, parse_qs
+import argparse
+import asyncio
+import hashlib
+import io
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+import lxml.etree as etree
+
+from cash_flow import Summary, read_XML_file
+from scheduler import ScheduledJob, Scheduler
+from convergence import Convergence
+from simulation import run_chunk
+from telemetry import Telemetry, format_OpenMetrics
+from validation import ValidationError, check
+
+DEFAULT_CHUNK_SIZE = 10000
+
+_HTTP_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+# ----- Internal Functions ----- #
+def _run_chunk(summary: Summary, iterations: int, chunk_no: int) -> Tuple[Dict[str, np.ndarray], dict]:
+    """Run a chunk in a worker process with the random number stream of the chunk, along with its telemetry"""
+    telemetry = Telemetry()
+    values = run_chunk(summary, iterations, summary.get_generator(chunk_no), telemetry)
+    return (values, telemetry.snapshot())
+
+def scenario_hash(xml: bytes, iterations: int) -> str:
+    """
+    Hash identifying a scenario run
+
+    Args:
+        xml: Scenario XML
+        iterations: Number of iterations of the run
+
+    Returns:
+        Hex digest of the canonical XML and the number of iterations
+    """
+    parser = etree.XMLParser(remove_blank_text=True)
+    canonical = etree.tostring(etree.fromstring(xml, parser), method="c14n")
+    return hashlib.sha256(b"".join([canonical, b"\n", str(iterations).encode()])).hexdigest()
+
+
+# ----- Job ----- #
+class Job():
+    """
+    Class for a scenario run submitted to the service
+
+    Attributes:
+        id: Scenario hash of the job
+        summary: Summary to be simulated
+        iterations: Total number of iterations
+        completed: Number of completed iterations
+        status: One of "queued", "running", "done", "cancelled" or "failed"
+        error: Error message if the job failed
+        statistics: Statistics and convergence diagnostics of the completed iterations
+        schedule: Scheduling state of the job
+        chunks_dispatched: Number of chunks handed to the workers
+        telemetry: Telemetry of the completed chunks, its clock started with the first chunk
+    """
+    id: str
+    summary: Summary
+    iterations: int
+    completed: int
+    status: str
+    error: str
+    statistics: Convergence
+    schedule: ScheduledJob
+    chunks_dispatched: int
+    telemetry: Telemetry
+
+    def __init__(self, id: str, summary: Summary, iterations: int, schedule: ScheduledJob) -> None:
+        """
+        Default initialization method for Job class
+
+        Args:
+            id: Scenario hash of the job
+            summary: Summary to be simulated
+            iterations: Total number of iterations
+            schedule: Scheduling state of the job
+        """
+        self.id = id
+        self.summary = summary
+        self.iterations = iterations
+        self.completed = 0
+        self.status = "queued"
+        self.error = ""
+        self.statistics = Convergence()
+        self.schedule = schedule
+        self.chunks_dispatched = 0
+        self.telemetry = Telemetry(labels={"job": id})
+        self._chunks_merged = 0
+        self._pending_chunks: Dict[int, Tuple[int, Dict[str, np.ndarray]]] = {}
+        self._updated = asyncio.Event()
+        summary.get_seed()
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job has stopped running"""
+        return self.status in ("done", "cancelled", "failed")
+
+    def notify(self) -> None:
+        """Wake up everyone waiting for an update of the job"""
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def wait_for_update(self) -> None:
+        """Wait till the job is updated"""
+        await self._updated.wait()
+
+    def add_chunk(self, chunk_no: int, size: int, values: Dict[str, np.ndarray]) -> None:
+        """
+        Add the values of a completed chunk to the statistics
+
+        Chunks are merged in the order of their numbers, whatever order the
+        workers complete them in, so the statistics of a seeded scenario
+        are reproducible bit for bit.
+        """
+        self._pending_chunks[chunk_no] = (size, values)
+        while self._chunks_merged in self._pending_chunks:
+            (size, values) = self._pending_chunks.pop(self._chunks_merged)
+            self.statistics.update(values)
+            self.completed += size
+            self._chunks_merged += 1
+
+    def as_dict(self) -> dict:
+        """Job status as a plain dictionary"""
+        return {"id": self.id,
+                "status": self.status,
+                "error": self.error,
+                "iterations": self.iterations,
+                "completed": self.completed,
+                "seed": self.summary.seed,
+                "rngAlgorithm": self.summary.rng_algorithm,
+                "schedule": self.schedule.as_dict(),
+                "statistics": self.statistics.as_dict(),
+                "telemetry": self.telemetry.snapshot()}
+
+
+# ----- Job Service ----- #
+class JobService():
+    """
+    Asyncio based service running scenario jobs on a process pool
+
+    Attributes:
+        workers: Number of worker processes
+        chunk_size: Number of iterations run by a worker at a time
+        jobs: Jobs by their scenario hash, also serving as the result cache
+        scheduler: Scheduler handing out the chunks of the jobs, keyed by the scenario hash and the number of
+            the submission, so that chunks still running for a cancelled or failed job are not credited to
+            the job resubmitting its scenario
+    """
+    workers: int
+    chunk_size: int
+    jobs: Dict[str, Job]
+    scheduler: Scheduler
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        """
+        Default initialization method for JobService class
+
+        Args:
+            workers: Number of worker processes, number of CPUs if None
+            chunk_size: Number of iterations run by a worker at a time
+        """
+        self.workers = os.cpu_count() if workers is None else workers
+        self.chunk_size = chunk_size
+        self.jobs = {}
+        self.scheduler = Scheduler(chunk_size)
+        self._submissions = itertools.count()
+        self._executor = None
+        self._chunk_pending = asyncio.Event()
+
+    # --- Jobs --- #
+    def submit(self, xml: bytes, iterations: Optional[int] = None, priority: int = 0) -> Job:
+        """
+        Submit a scenario, reusing the cached job of an identical scenario
+
+        Args:
+            xml: Scenario XML
+            iterations: Number of iterations, as given in the scenario if None
+            priority: Priority of the job, higher is served first
+
+        Returns:
+            Job running (or having run) the scenario
+
+        Raises:
+            validation.ValidationError: If the scenario has errors
+            ValueError: If the number of iterations is not positive
+        """
+        if iterations is not None and iterations < 1:
+            raise ValueError(f"Number of iterations must be positive, not {iterations}")
+        summary = read_XML_file(io.BytesIO(xml))
+        check(summary)
+        iterations = summary.iterations if iterations is None else iterations
+        job_id = scenario_hash(xml, iterations)
+        job = self.jobs.get(job_id)
+        if job is None or job.status in ("cancelled", "failed"):
+            schedule = self.scheduler.add((job_id, next(self._submissions)), iterations, priority)
+            job = Job(job_id, summary, iterations, schedule)
+            self.jobs[job_id] = job
+            self._chunk_pending.set()
+        return job
+
+    def cancel(self, job_id: str) -> Job:
+        """Cancel a job which has not finished yet"""
+        job = self.jobs[job_id]
+        if not job.finished:
+            self.scheduler.cancel(job.schedule.key)
+            job.status = "cancelled"
+            job.notify()
+        return job
+
+    async def _dispatch(self) -> None:
+        """Keep one worker busy with the chunks handed out by the scheduler"""
+        loop = asyncio.get_running_loop()
+        while True:
+            chunk = self.scheduler.next_chunk()
+            if chunk is None:
+                self._chunk_pending.clear()
+                await self._chunk_pending.wait()
+                continue
+            (key, size) = chunk
+            job = self.jobs[key[0]]
+            job.status = "running"
+            chunk_no = job.chunks_dispatched
+            if chunk_no == 0:
+                job.telemetry.start()
+            job.chunks_dispatched += 1
+            start_time = time.perf_counter()
+            try:
+                (values, snapshot) = await loop.run_in_executor(self._executor, _run_chunk, job.summary, size,
+                                                                chunk_no)
+            except Exception as error:
+                self.scheduler.cancel(key)
+                if job.finished:
+                    continue
+                job.status = "failed"
+                job.error = repr(error)
+                job.notify()
+                continue
+            # Dropped by the scheduler if the job was cancelled or failed meanwhile
+            self.scheduler.complete(key, size, time.perf_counter() - start_time)
+            if job.finished:
+                continue
+            job.telemetry.merge(snapshot)
+            job.add_chunk(chunk_no, size, values)
+            if job.completed >= job.iterations:
+                job.status = "done"
+                job.telemetry.stop()
+            job.notify()
+
+    # --- Server --- #
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, unix_path: Optional[str] = None) -> None:
+        """
+        Serve the HTTP interface till cancelled
+
+        Args:
+            host: Host to listen on
+            port: TCP port to listen on
+            unix_path: Path of a Unix socket to listen on instead of TCP
+        """
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn")) as self._executor:
+            if unix_path is None:
+                server = await asyncio.start_server(self._handle_connection, host, port)
+            else:
+                server = await asyncio.start_unix_server(self._handle_connection, unix_path)
+            dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                for dispatcher in dispatchers:
+                    dispatcher.cancel()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Handle a single HTTP request"""
+        try:
+            method, target, body = await _read_request(reader)
+            await self._route(method, target, body, writer)
+        except (ValueError, KeyError, asyncio.IncompleteReadError) as error:
+            _write_json(writer, 400, {"error": repr(error)})
+        finally:
+            await writer.drain()
+            writer.close()
+
+    async def _route(self, method: str, target: str, body: bytes, writer: asyncio.StreamWriter) -> None:
+        """Dispatch the request to the job methods"""
+        url = urlsplit(target)
+        path = [part for part in url.path.split("/") if part]
+        if path == ["metrics"] and method == "GET":
+            body = format_OpenMetrics(job.telemetry for job in self.jobs.values()).encode()
+            writer.write(_response_head(200, "application/openmetrics-text; version=1.0.0; charset=utf-8",
+                                        len(body)) + body)
+        elif path == ["jobs"] and method == "GET":
+            _write_json(writer, 200, [job.as_dict() for job in self.jobs.values()])
+        elif path == ["jobs"] and method == "POST":
+            query = parse_qs(url.query)
+            iterations = int(query["iterations"][0]) if "iterations" in query else None
+            priority = int(query.get("priority", ["0"])[0])
+            try:
+                job = self.submit(body, iterations, priority)
+            except (etree.LxmlError, ValidationError) as error:
+                _write_json(writer, 400, _get_scenario_error(error))
+                return
+            _write_json(writer, 202, job.as_dict())
+        elif len(path) < 2 or path[0] != "jobs" or path[1] not in self.jobs:
+            _write_json(writer, 404, {"error": "No such job"})
+        elif len(path) == 2 and method == "GET":
+            _write_json(writer, 200, self.jobs[path[1]].as_dict())
+        elif len(path) == 2 and method == "DELETE":
+            _write_json(writer, 200, self.cancel(path[1]).as_dict())
+        elif path[2:] == ["events"] and method == "GET":
+            await self._stream_events(self.jobs[path[1]], writer)
+        else:
+            _write_json(writer, 405, {"error": "Method not allowed"})
+
+    async def _stream_events(self, job: Job, writer: asyncio.StreamWriter) -> None:
+        """Stream job updates as JSON lines till the job finishes"""
+        writer.write(_response_head(200, "application/x-ndjson"))
+        while True:
+            writer.write(json.dumps(job.as_dict()).encode() + b"\n")
+            await writer.drain()
+            if job.finished:
+                break
+            await job.wait_for_update()
+
+
+# ----- HTTP Helpers ----- #
+async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+    """Read method, target and body of an HTTP request"""
+    method, target, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if line == "":
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return (method.upper(), target, body)
+
+def _response_head(status: int, content_type: str, content_length: Optional[int] = None) -> bytes:
+    """HTTP response status line and headers"""
+    lines = [f"HTTP/1.1 {status} {_HTTP_REASONS[status]}",
+             f"Content-Type: {content_type}",
+             "Connection: close"]
+    if content_length is not None:
+        lines.append(f"Content-Length: {content_length}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+def _get_scenario_error(error: Exception) -> dict:
+    """Response body of a scenario which cannot be run, listing the problems of an invalid one"""
+    if isinstance(error, ValidationError):
+        return {"error": "Scenario is not valid", "problems": [problem._asdict() for problem in error.problems]}
+    return {"error": str(error)}
+
+def _write_json(writer: asyncio.StreamWriter, status: int, data) -> None:
+    """Write a complete JSON response"""
+    body = json.dumps(data).encode()
+    writer.write(_response_head(status, "application/json", len(body)) + body)
+
+
+# ----- Command Line Interface ----- #
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local job service for RoI simulations")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to listen on")
+    parser.add_argument("--unix", default=None, help="Unix socket to listen on instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Iterations per chunk")
+    args = parser.parse_args()
+
+    service = JobService(workers=args.workers, chunk_size=args.chunk_size)
+    asyncio.run(service.serve(args.host, args.port, args.unix))
+
+
+if __name__ == "__main__":
+    main()
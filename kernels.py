@@ -0,0 +1,165 @@
+"""Module for the metric kernels of the simulation
+
+Every metric has a NumPy implementation, working on all the cash flows
+together, and a Numba one, run in parallel over the cash flows with
+`prange`. Numba is optional: its kernels are used when it is installed,
+and the NumPy ones otherwise, or when chosen with `set_backend`. Numba is
+imported, and the kernels compiled, only on their first use.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from typing import Callable, Dict, Tuple, Union
+import functools
+import importlib.util
+
+import numpy as np
+
+BACKENDS = ("numba", "numpy")
+NUMBA_AVAILABLE = importlib.util.find_spec("numba") is not None
+
+_backend = "numba" if NUMBA_AVAILABLE else "numpy"
+
+
+# ----- Backend ----- #
+def get_backend() -> str:
+    """Name of the backend in use, one of `BACKENDS`"""
+    return _backend
+
+def set_backend(backend: str) -> None:
+    """
+    Choose the backend of the kernels
+
+    Args:
+        backend: One of `BACKENDS`
+
+    Raises:
+        ValueError: If the backend is unknown, or is "numba" without Numba installed
+    """
+    global _backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {', '.join(BACKENDS)}")
+    if backend == "numba" and not NUMBA_AVAILABLE:
+        raise ValueError("The numba backend needs the optional 'numba' package")
+    _backend = backend
+
+
+# ----- Metrics ----- #
+def get_NPV(net_cash_flow: np.ndarray, interest_rate: float) -> np.ndarray:
+    """
+    Calculate net present value for a batch of cash flows
+
+    Args:
+        net_cash_flow: (iterations, years+1) array of net cash flow
+        interest_rate: Annual rate of interest
+
+    Returns:
+        (iterations, ) array of net present values
+    """
+    if _backend == "numba":
+        return _get_numba_kernels()["NPV"](_as_float_array(net_cash_flow), float(interest_rate))
+    return get_NPV_numpy(net_cash_flow, interest_rate)
+
+def get_IRR(net_cash_flow: np.ndarray,
+            guess: float = 0.1,
+            tolerance: float = 1e-10,
+            max_iterations: int = 100,
+            return_iterations: bool = False) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Calculate internal rate of return for a batch of cash flows
+
+    Cash flows which do not converge, or whose rate falls below -100%,
+    give NaN.
+
+    Args:
+        net_cash_flow: (iterations, years+1) array of net cash flow
+        guess: Initial guess for the rate
+        tolerance: Absolute tolerance on the rate
+        max_iterations: Maximum number of Newton iterations
+        return_iterations: Whether to also return the number of Newton iterations run on each cash flow
+
+    Returns:
+        (iterations, ) array of internal rates of return, and the (iterations, ) array of Newton
+        iterations if asked for
+    """
+    if _backend == "numba":
+        (IRR, iterations) = _get_numba_kernels()["IRR"](_as_float_array(net_cash_flow), float(guess),
+                                                        float(tolerance), int(max_iterations))
+    else:
+        (IRR, iterations) = get_IRR_numpy(net_cash_flow, guess, tolerance, max_iterations, return_iterations=True)
+    return (IRR, iterations) if return_iterations else IRR
+
+def get_payback_period(net_cash_flow: np.ndarray) -> np.ndarray:
+    """
+    Calculate payback period for a batch of cash flows
+
+    Same definition as `Summary.get_payback_period`, evaluated for all the
+    cash flows together.
+
+    Args:
+        net_cash_flow: (iterations, years+1) array of net cash flow
+
+    Returns:
+        (iterations, ) array of payback periods in years
+    """
+    if _backend == "numba":
+        return _get_numba_kernels()["payback_period"](_as_float_array(net_cash_flow))
+    return get_payback_period_numpy(net_cash_flow)
+
+
+# ----- NumPy Kernels ----- #
+def get_NPV_numpy(net_cash_flow: np.ndarray, interest_rate: float) -> np.ndarray:
+    """NumPy kernel of `get_NPV`"""
+    discount = (1 + interest_rate) ** -np.arange(net_cash_flow.shape[-1], dtype=float)
+    return net_cash_flow @ discount
+
+def get_IRR_numpy(net_cash_flow: np.ndarray,
+                  guess: float = 0.1,
+                  tolerance: float = 1e-10,
+                  max_iterations: int = 100,
+                  return_iterations: bool = False) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    """NumPy kernel of `get_IRR`, running Newton iterations on all the cash flows together"""
+    years = np.arange(net_cash_flow.shape[-1], dtype=float)
+    rate = np.full(net_cash_flow.shape[0], guess)
+    converged = np.zeros(net_cash_flow.shape[0], dtype=bool)
+    iterations = np.zeros(net_cash_flow.shape[0], dtype=np.int64)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for _ in range(max_iterations):
+            iterations += ~converged
+            discount = (1 + rate[:, None]) ** -years
+            value = np.sum(net_cash_flow * discount, axis=1)
+            derivative = np.sum(-years * net_cash_flow * discount, axis=1) / (1 + rate)
+            step = value / derivative
+            rate = np.where(converged, rate, rate - step)
+            converged |= np.abs(step) < tolerance
+            if converged.all():
+                break
+    rate[~converged | ~np.isfinite(rate) | (rate <= -1)] = np.nan
+    return (rate, iterations) if return_iterations else rate
+
+def get_payback_period_numpy(net_cash_flow: np.ndarray) -> np.ndarray:
+    """NumPy kernel of `get_payback_period`, a cumulative sum and first crossing on all the cash flows together"""
+    years = net_cash_flow.shape[-1] - 1
+    rows = np.arange(net_cash_flow.shape[0])
+    cumsum_cash_flow = np.cumsum(net_cash_flow, axis=1)
+    positive = cumsum_cash_flow[:, :years] > 0
+    first_positive_year = np.where(positive.any(axis=1), positive.argmax(axis=1), years)
+    complete_years = first_positive_year - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fractional_year = np.abs(cumsum_cash_flow[rows, complete_years] / net_cash_flow[rows, first_positive_year])
+    return complete_years + fractional_year
+
+
+# ----- Numba Kernels ----- #
+def _as_float_array(net_cash_flow: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(net_cash_flow, dtype=np.float64)
+
+@functools.lru_cache(maxsize=None)
+def _get_numba_kernels() -> Dict[str, Callable]:
+    """Numba kernels, importing Numba on first use"""
+    import numba_kernels
+
+    return {"NPV": numba_kernels.get_NPV,
+            "IRR": numba_kernels.get_IRR,
+            "payback_period": numba_kernels.get_payback_period}
@@ -0,0 +1,75 @@
+"""Module for the Numba kernels of the metrics
+
+Needs the optional `numba` package, see the `kernels` module for the
+kernels to use. Each kernel runs one cash flow per iteration of a
+`prange` loop, and the compiled kernels are cached on disk.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+import numba
+import numpy as np
+
+_jit = numba.njit(parallel=True, error_model="numpy", cache=True)
+
+
+# ----- Kernels ----- #
+@_jit
+def get_NPV(net_cash_flow, interest_rate):
+    """Numba kernel of `kernels.get_NPV`"""
+    (iterations, columns) = net_cash_flow.shape
+    NPV = np.empty(iterations)
+    for row in numba.prange(iterations):
+        (value, discount) = (0.0, 1.0)
+        for year in range(columns):
+            value += net_cash_flow[row, year] * discount
+            discount /= 1 + interest_rate
+        NPV[row] = value
+    return NPV
+
+@_jit
+def get_IRR(net_cash_flow, guess, tolerance, max_iterations):
+    """Numba kernel of `kernels.get_IRR`, returning the rates and the Newton iterations run on each cash flow"""
+    (iterations, columns) = net_cash_flow.shape
+    IRR = np.empty(iterations)
+    newton_iterations = np.zeros(iterations, dtype=np.int64)
+    for row in numba.prange(iterations):
+        rate = guess
+        converged = False
+        for _ in range(max_iterations):
+            newton_iterations[row] += 1
+            (value, derivative, discount) = (0.0, 0.0, 1.0)
+            for year in range(columns):
+                value += net_cash_flow[row, year] * discount
+                derivative -= year * net_cash_flow[row, year] * discount
+                discount /= 1 + rate
+            step = value / (derivative / (1 + rate))
+            rate -= step
+            if abs(step) < tolerance:
+                converged = True
+                break
+        IRR[row] = rate if converged and np.isfinite(rate) and rate > -1 else np.nan
+    return (IRR, newton_iterations)
+
+@_jit
+def get_payback_period(net_cash_flow):
+    """Numba kernel of `kernels.get_payback_period`, stopping the cumulative sum at the first crossing"""
+    (iterations, columns) = net_cash_flow.shape
+    years = columns - 1
+    payback_period = np.empty(iterations)
+    for row in numba.prange(iterations):
+        (cumsum, first_positive_year) = (0.0, years)
+        for year in range(years):
+            cumsum += net_cash_flow[row, year]
+            if cumsum > 0:
+                first_positive_year = year
+                break
+        # Cumulative sum of the year before, which wraps to the last year as in the NumPy kernel
+        complete_years = first_positive_year - 1
+        last_year = complete_years if complete_years >= 0 else years
+        cumsum = 0.0
+        for year in range(last_year + 1):
+            cumsum += net_cash_flow[row, year]
+        payback_period[row] = complete_years + abs(cumsum / net_cash_flow[row, first_positive_year])
+    return payback_period
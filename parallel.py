@@ -0,0 +1,232 @@
+"""Module for running Monte Carlo iterations on worker processes over shared memory
+
+Nothing but names and slice bounds goes through the pipes of the process
+pool. The summary is frozen and pickled once into a shared memory block,
+which the workers load once per run, and the workers write the metric
+values of their slice of iterations directly into a preallocated shared
+result buffer.
+
+Slice `n` of the iterations is run with `Summary.get_generator(n)`, so a
+seeded summary gives the same values for any number of workers, and as
+`simulation.simulate` run in a single process. Given a
+`telemetry.Telemetry`, the workers return the counters of their slices,
+which are merged and reported slice by slice.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import get_context, shared_memory
+from typing import Callable, Dict, Optional, Tuple
+import os
+import pickle
+
+import numpy as np
+
+from cash_flow import Summary
+from simulation import DEFAULT_CHUNK_SIZE, METRICS, run_chunk
+from telemetry import Telemetry
+from validation import check, check_iterations
+
+
+# ----- Shared Array ----- #
+class SharedArray():
+    """
+    NumPy array in a shared memory block
+
+    Attributes:
+        name: Name of the shared memory block
+        array: Array over the block
+    """
+    name: str
+    array: np.ndarray
+
+    def __init__(self, shape: Tuple[int, ...], dtype=np.float64, name: Optional[str] = None) -> None:
+        """
+        Default initialization method for SharedArray class, creating a new block if no name is given
+
+        Args:
+            shape: Shape of the array
+            dtype: Data type of the array
+            name: Name of an existing block to attach to
+        """
+        size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        self._owner = name is None
+        self._memory = shared_memory.SharedMemory(name=name, create=self._owner, size=size if self._owner else 0)
+        self.name = self._memory.name
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self._memory.buf)
+
+    def close(self) -> None:
+        """Detach from the block, freeing it if created by this instance"""
+        self.array = None
+        if self._owner:
+            self._memory.unlink()
+        try:
+            self._memory.close()
+        except BufferError:
+            pass    # Views of the array are still in use, the block is unmapped once they are gone
+
+    def __enter__(self) -> "SharedArray":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+# ----- Worker ----- #
+# Blocks of the current run, attached once per worker process
+_worker_state: Dict[str, object] = {}
+
+def _attach(scenario: Tuple[str, int], result: Tuple[str, Tuple[int, int]]) -> Tuple[Summary, np.ndarray]:
+    """Summary and result array of the run, loading them only when the run changes"""
+    if _worker_state.get("key") != (scenario, result):
+        for shared in ("scenario", "result"):
+            if shared in _worker_state:
+                _worker_state.pop(shared).close()
+        scenario_block = SharedArray((scenario[1], ), np.uint8, scenario[0])
+        _worker_state["summary"] = pickle.loads(scenario_block.array.tobytes()).thaw()
+        _worker_state["scenario"] = scenario_block
+        _worker_state["result"] = SharedArray(result[1], np.float64, result[0])
+        _worker_state["key"] = (scenario, result)
+    return (_worker_state["summary"], _worker_state["result"].array)
+
+def _run_slice(scenario: Tuple[str, int], result: Tuple[str, Tuple[int, int]], slice_no: int, start: int,
+               size: int, with_telemetry: bool = False, metrics: Tuple[str, ...] = METRICS) -> Optional[dict]:
+    """Run a slice of the iterations, writing its metric values into the shared result, and return its telemetry"""
+    (summary, values) = _attach(scenario, result)
+    telemetry = Telemetry() if with_telemetry else None
+    chunk = run_chunk(summary, size, summary.get_generator(slice_no), telemetry, metrics)
+    for (metric_no, metric) in enumerate(metrics):
+        values[metric_no, start:start + size] = chunk[metric]
+    return None if telemetry is None else telemetry.snapshot()
+
+
+# ----- Parallel Runner ----- #
+class ParallelRunner():
+    """
+    Process pool running the iterations of summaries over shared memory
+
+    Use as a context manager, e.g.
+    `with ParallelRunner() as runner: values = runner.run(summary)`.
+
+    Attributes:
+        workers: Number of worker processes
+        chunk_size: Number of iterations of a slice run by a worker at a time
+    """
+    workers: int
+    chunk_size: int
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        """
+        Default initialization method for ParallelRunner class
+
+        Args:
+            workers: Number of worker processes, number of CPUs if None
+            chunk_size: Number of iterations of a slice run by a worker at a time
+        """
+        self.workers = os.cpu_count() if workers is None else workers
+        self.chunk_size = chunk_size
+        self._executor = None
+        self._result = None
+
+    # --- Methods --- #
+    def run(self,
+            summary: Summary,
+            iterations: Optional[int] = None,
+            telemetry: Optional[Telemetry] = None,
+            metrics: Tuple[str, ...] = METRICS,
+            callback: Optional[Callable[[int, Dict[str, np.ndarray]], Optional[bool]]] = None) -> Dict[str, np.ndarray]:
+        """
+        Run the iterations of the summary
+
+        Args:
+            summary: Summary to be simulated
+            iterations: Number of iterations, iterations of the summary if None
+            telemetry: Telemetry of the run, merging the counters of the slices and reporting slice by slice
+            metrics: Metrics to calculate, any of `METRICS`
+            callback: Called with the number of iterations completed and the values of every slice, in order
+                of the slices; the run stops early, dropping the slices after, if it returns False
+
+        Returns:
+            (iterations, ) array of values for each of the metrics, views into the shared result
+            which stay valid till the next run or the runner is closed
+
+        Raises:
+            ValueError: If the number of iterations is not positive
+            validation.ValidationError: If the summary has errors, before any iteration is run
+        """
+        check(summary)
+        iterations = check_iterations(summary.iterations if iterations is None else iterations)
+        if self._executor is None:
+            # Spawned, as forking after the Numba kernels have started their threads can hang the workers
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=get_context("spawn"))
+        summary.get_seed()
+        scenario_bytes = pickle.dumps(summary.freeze(), protocol=pickle.HIGHEST_PROTOCOL)
+        self._release_result()
+        self._result = SharedArray((len(metrics), iterations))
+        completed = 0
+        with SharedArray((len(scenario_bytes), ), np.uint8) as scenario_block:
+            scenario_block.array[:] = np.frombuffer(scenario_bytes, dtype=np.uint8)
+            scenario = (scenario_block.name, len(scenario_bytes))
+            result = (self._result.name, (len(metrics), iterations))
+            starts = range(0, iterations, self.chunk_size)
+            futures = [self._executor.submit(_run_slice, scenario, result, slice_no, start,
+                                             min(self.chunk_size, iterations - start), telemetry is not None,
+                                             metrics)
+                       for (slice_no, start) in enumerate(starts)]
+            for (future, start) in zip(futures, starts):
+                snapshot = future.result()
+                completed = min(start + self.chunk_size, iterations)
+                if telemetry is not None:
+                    telemetry.merge(snapshot)
+                    telemetry.report()
+                if callback is not None and callback(completed, self._get_values(metrics, start, completed)) is False:
+                    break
+            # Slices dropped by an early stop are cancelled, or finished if already running
+            for future in futures:
+                future.cancel()
+            wait(futures)
+        if telemetry is not None:
+            telemetry.report(final=True)
+        return self._get_values(metrics, 0, completed)
+
+    def close(self) -> None:
+        """Shut the workers down and free the shared result"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._release_result()
+
+    # --- Internal Functions --- #
+    def _get_values(self, metrics: Tuple[str, ...], start: int, stop: int) -> Dict[str, np.ndarray]:
+        return {metric: self._result.array[metric_no, start:stop] for (metric_no, metric) in enumerate(metrics)}
+
+    def _release_result(self) -> None:
+        if self._result is not None:
+            self._result.close()
+            self._result = None
+
+    def __enter__(self) -> "ParallelRunner":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+# ----- Module Methods ----- #
+def run_parallel(summary: Summary,
+                 iterations: Optional[int] = None,
+                 workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 telemetry: Optional[Telemetry] = None,
+                 metrics: Tuple[str, ...] = METRICS) -> Dict[str, np.ndarray]:
+    """
+    Run the iterations of the summary on a fresh process pool, see `ParallelRunner.run`
+
+    The values are copied out of the shared result once the pool is shut
+    down. Keep a `ParallelRunner` for several runs, or to use the values in place.
+    """
+    with ParallelRunner(workers, chunk_size) as runner:
+        values = runner.run(summary, iterations, telemetry, metrics)
+        return {metric: metric_values.copy() for (metric, metric_values) in values.items()}
@@ -0,0 +1,265 @@
+"""Module for post-processing stages of the sampled net cash flow
+
+A pipeline is a sequence of stages applied in order to the
+(iterations, years+1) net cash flow matrix before the metrics. Every stage
+is vectorized over all the iterations and years:
+
+* `Depreciation` capitalizes the upfront costs and deducts them from the
+  taxable income over their life, straight-line or declining-balance.
+* `Tax` taxes the taxable income, carrying losses forward. The income taxed
+  up to a year is the running maximum of the cumulative income (floored at
+  0), so the whole path-dependent carry-forward is a cumulative sum and a
+  cumulative maximum along the years, with no loop over the iterations.
+* `Inflation` deflates the nominal cash flow to real terms, so the interest
+  rate of the summary is then a real one.
+
+Stages pass the net cash flow and the taxable income on to the next one,
+the latter being the net cash flow itself till a stage changes it. Stages
+are immutable, so a pipeline is a plain tuple of them.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from typing import TYPE_CHECKING, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from random_type import _format_decimal
+
+if TYPE_CHECKING:
+    import lxml.etree as etree
+
+DEPRECIATION_METHODS = ("straightLine", "decliningBalance")
+
+
+# ----- Depreciation Stage ----- #
+class Depreciation(NamedTuple):
+    """
+    Depreciation of the upfront costs, deducted from the taxable income
+
+    Attributes:
+        method: One of `DEPRECIATION_METHODS`
+        life: Number of years over which the upfront costs are deducted, starting from year 1
+        rate: Rate of declining-balance depreciation, twice the straight-line rate if None;
+            the book value left in the last year of life is deducted in full
+    """
+    method: str = "straightLine"
+    life: int = 5
+    rate: Optional[float] = None
+
+    @classmethod
+    def create_from_etree_element(cls, etree_element: "etree.Element") -> "Depreciation":
+        """Initialize from an etree element"""
+        rate_element = etree_element.find("rate")
+        return cls(etree_element.find("method").text, int(etree_element.find("life").text),
+                   None if rate_element is None else float(rate_element.text))
+
+    @classmethod
+    def create_from_dict(cls, data: dict) -> "Depreciation":
+        """Initialize from a dictionary"""
+        return cls(data["method"], int(data["life"]), data.get("rate"))
+
+    def get_schedule(self, years: int) -> np.ndarray:
+        """(years+1, ) array of the fractions of the upfront costs deducted in each year"""
+        if self.method not in DEPRECIATION_METHODS:
+            raise ValueError(f"Unknown depreciation method '{self.method}'")
+        if self.method == "straightLine":
+            fractions = np.full(self.life, 1 / self.life)
+        else:
+            rate = 2 / self.life if self.rate is None else self.rate
+            fractions = rate * (1 - rate) ** np.arange(self.life)
+            fractions[-1] += (1 - rate) ** self.life
+        schedule = np.zeros(years + 1)
+        schedule[1:self.life + 1] = fractions[:years]
+        return schedule
+
+    def apply(self, net_cash_flow: np.ndarray, taxable_income: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Move the upfront costs out of the taxable income of year 0 and into the years of life"""
+        upfront_costs = np.maximum(-net_cash_flow[:, 0], 0.0)
+        adjustment = -self.get_schedule(net_cash_flow.shape[1] - 1)
+        adjustment[0] = 1.0
+        return (net_cash_flow, taxable_income + upfront_costs[:, np.newaxis] * adjustment)
+
+    def get_factors(self, years: int) -> np.ndarray:
+        """(years+1, ) array of factors of the net cash flow, as the stage leaves it unchanged"""
+        return np.ones(years + 1)
+
+    def generate_etree_element(self) -> "etree.Element":
+        """Generate etree element of the instance"""
+        import lxml.etree as etree
+
+        element = etree.Element("Depreciation")
+        etree.SubElement(element, "method").text = self.method
+        etree.SubElement(element, "life").text = str(self.life)
+        if self.rate is not None:
+            etree.SubElement(element, "rate").text = _format_decimal(self.rate)
+        return element
+
+    def generate_dict(self) -> dict:
+        """Generate dictionary of the instance"""
+        data = {"type": "Depreciation", "method": self.method, "life": self.life}
+        if self.rate is not None:
+            data["rate"] = self.rate
+        return data
+
+
+# ----- Tax Stage ----- #
+class Tax(NamedTuple):
+    """
+    Tax on the taxable income, paid in the year the income is made
+
+    Attributes:
+        rate: Rate of tax
+        loss_carry_forward: Whether losses are set off against the income of later years
+    """
+    rate: float
+    loss_carry_forward: bool = True
+
+    @classmethod
+    def create_from_etree_element(cls, etree_element: "etree.Element") -> "Tax":
+        """Initialize from an etree element"""
+        carry_forward_element = etree_element.find("lossCarryForward")
+        return cls(float(etree_element.find("rate").text),
+                   carry_forward_element is None or carry_forward_element.text.strip() in ("true", "1"))
+
+    @classmethod
+    def create_from_dict(cls, data: dict) -> "Tax":
+        """Initialize from a dictionary"""
+        return cls(data["rate"], data.get("lossCarryForward", True))
+
+    def get_taxed_income(self, taxable_income: np.ndarray) -> np.ndarray:
+        """
+        Income taxed in each year
+
+        With losses carried forward, the income taxed up to a year is the
+        running maximum of the cumulative taxable income, floored at 0.
+
+        Args:
+            taxable_income: (iterations, years+1) array of taxable income
+
+        Returns:
+            (iterations, years+1) array of taxed income
+        """
+        if not self.loss_carry_forward:
+            return np.maximum(taxable_income, 0.0)
+        taxed_to_date = np.maximum.accumulate(np.cumsum(taxable_income, axis=1), axis=1)
+        np.maximum(taxed_to_date, 0.0, out=taxed_to_date)
+        return np.diff(taxed_to_date, axis=1, prepend=0.0)
+
+    def apply(self, net_cash_flow: np.ndarray, taxable_income: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Pay the tax out of the net cash flow"""
+        tax = self.rate * self.get_taxed_income(taxable_income)
+        return (net_cash_flow - tax, taxable_income - tax)
+
+    def get_factors(self, years: int) -> None:
+        """None, as tax is not linear in the net cash flow"""
+        return None
+
+    def generate_etree_element(self) -> "etree.Element":
+        """Generate etree element of the instance"""
+        import lxml.etree as etree
+
+        element = etree.Element("Tax")
+        etree.SubElement(element, "rate").text = _format_decimal(self.rate)
+        etree.SubElement(element, "lossCarryForward").text = "true" if self.loss_carry_forward else "false"
+        return element
+
+    def generate_dict(self) -> dict:
+        """Generate dictionary of the instance"""
+        return {"type": "Tax", "rate": self.rate, "lossCarryForward": self.loss_carry_forward}
+
+
+# ----- Inflation Stage ----- #
+class Inflation(NamedTuple):
+    """
+    Deflation of the nominal net cash flow to the money of year 0
+
+    Attributes:
+        rate: Annual rate of inflation
+    """
+    rate: float
+
+    @classmethod
+    def create_from_etree_element(cls, etree_element: "etree.Element") -> "Inflation":
+        """Initialize from an etree element"""
+        return cls(float(etree_element.find("rate").text))
+
+    @classmethod
+    def create_from_dict(cls, data: dict) -> "Inflation":
+        """Initialize from a dictionary"""
+        return cls(data["rate"])
+
+    def apply(self, net_cash_flow: np.ndarray, taxable_income: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Deflate the net cash flow and the taxable income"""
+        factors = self.get_factors(net_cash_flow.shape[1] - 1)
+        return (net_cash_flow * factors, taxable_income * factors)
+
+    def get_factors(self, years: int) -> np.ndarray:
+        """(years+1, ) array of deflators"""
+        return (1 + self.rate) ** -np.arange(years + 1, dtype=float)
+
+    def generate_etree_element(self) -> "etree.Element":
+        """Generate etree element of the instance"""
+        import lxml.etree as etree
+
+        element = etree.Element("Inflation")
+        etree.SubElement(element, "rate").text = _format_decimal(self.rate)
+        return element
+
+    def generate_dict(self) -> dict:
+        """Generate dictionary of the instance"""
+        return {"type": "Inflation", "rate": self.rate}
+
+
+Stage = Union[Depreciation, Tax, Inflation]
+STAGES = {"Depreciation": Depreciation, "Tax": Tax, "Inflation": Inflation}
+
+
+# ----- Module Methods ----- #
+def apply(stages: Tuple[Stage, ...], net_cash_flow: np.ndarray) -> np.ndarray:
+    """
+    Apply the stages of a pipeline to the net cash flow
+
+    Args:
+        stages: Stages of the pipeline, in order
+        net_cash_flow: (iterations, years+1) array of net cash flow
+
+    Returns:
+        (iterations, years+1) array of processed net cash flow, the same array if there are no stages
+    """
+    taxable_income = net_cash_flow
+    for stage in stages:
+        (net_cash_flow, taxable_income) = stage.apply(net_cash_flow, taxable_income)
+    return net_cash_flow
+
+def get_factors(stages: Tuple[Stage, ...], years: int) -> Optional[np.ndarray]:
+    """
+    Factors of the net cash flow of every year, if the pipeline is linear in it
+
+    Args:
+        stages: Stages of the pipeline, in order
+        years: Number of years
+
+    Returns:
+        (years+1, ) array of factors, None if a stage is not linear, e.g. `Tax`
+    """
+    factors = np.ones(years + 1)
+    for stage in stages:
+        stage_factors = stage.get_factors(years)
+        if stage_factors is None:
+            return None
+        factors *= stage_factors
+    return factors
+
+def create_from_etree_element(etree_element: "etree.Element") -> Stage:
+    """Initialize a stage from an etree element"""
+    if etree_element.tag not in STAGES:
+        raise ValueError(f"Unknown pipeline stage '{etree_element.tag}'")
+    return STAGES[etree_element.tag].create_from_etree_element(etree_element)
+
+def create_from_dict(data: dict) -> Stage:
+    """Initialize a stage from a dictionary"""
+    if data["type"] not in STAGES:
+        raise ValueError(f"Unknown pipeline stage '{data['type']}'")
+    return STAGES[data["type"]].create_from_dict(data)
@@ -0,0 +1,232 @@
+"""Module for selecting a portfolio of investments under an upfront budget
+
+Every candidate investment is a `Summary`. Their NPV is sampled once into
+an (iterations, n_candidates) matrix, row i of which is the same iteration
+for every candidate, so the NPV of any portfolio is a sum of columns. The
+selection is a greedy fill by objective gain per upfront cost, improved
+by a local search of add, drop and swap moves. Every move is evaluated on
+the precomputed matrix for all the candidates at once, without any
+re-simulation.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from cash_flow import Summary
+from simulation import get_NPV
+
+Objective = Callable[[np.ndarray], np.ndarray]
+
+
+# ----- Objectives ----- #
+def get_expected_value(NPV: np.ndarray) -> np.ndarray:
+    """
+    Expected NPV of portfolios
+
+    Args:
+        NPV: (iterations, n_portfolios) array of portfolio NPV
+
+    Returns:
+        (n_portfolios, ) array of expected NPV
+    """
+    return np.mean(NPV, axis=0)
+
+def get_CVaR(alpha: float = 0.05) -> Objective:
+    """
+    Objective giving conditional value at risk, i.e. mean NPV of the worst alpha fraction of iterations
+
+    Args:
+        alpha: Fraction of the iterations in the lower tail
+
+    Returns:
+        Objective mapping (iterations, n_portfolios) NPV to (n_portfolios, ) CVaR
+    """
+    if not 0 < alpha <= 1:
+        raise ValueError("alpha must be in (0, 1]")
+
+    def _CVaR(NPV: np.ndarray) -> np.ndarray:
+        tail = max(1, int(np.ceil(alpha * NPV.shape[0])))
+        return np.mean(np.partition(NPV, tail - 1, axis=0)[:tail], axis=0)
+    return _CVaR
+
+
+# ----- Portfolio Result ----- #
+class PortfolioResult():
+    """
+    Class for a selected portfolio
+
+    Attributes:
+        selection: (n_candidates, ) boolean array of selected candidates
+        objective: Objective of the portfolio
+        upfront_cost: Total upfront cost of the portfolio
+        NPV: (iterations, ) array of NPV of the portfolio
+    """
+    selection: np.ndarray
+    objective: float
+    upfront_cost: float
+    NPV: np.ndarray
+
+    def __init__(self, selection: np.ndarray, objective: float, upfront_cost: float, NPV: np.ndarray) -> None:
+        """
+        Default initialization method for PortfolioResult class
+
+        Args:
+            selection: (n_candidates, ) boolean array of selected candidates
+            objective: Objective of the portfolio
+            upfront_cost: Total upfront cost of the portfolio
+            NPV: (iterations, ) array of NPV of the portfolio
+        """
+        self.selection = selection
+        self.objective = objective
+        self.upfront_cost = upfront_cost
+        self.NPV = NPV
+
+    # --- Methods --- #
+    def get_selected(self) -> List[int]:
+        """Positions of the selected candidates"""
+        return np.flatnonzero(self.selection).tolist()
+
+    # --- String Representation --- #
+    def __repr__(self) -> str:
+        """String representation of the instance"""
+        return "".join([f"{self.__class__.__name__}(selected={self.get_selected()}, ",
+                        f"objective={self.objective!r}, ",
+                        f"upfront_cost={self.upfront_cost!r})"])
+
+
+# ----- Sampling ----- #
+def sample_candidates(summaries: Sequence[Summary],
+                      iterations: int = 10000,
+                      rng: Optional[np.random.Generator] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Jointly sample NPV and upfront cost of the candidates
+
+    Each candidate is evaluated with its own interest rate and years.
+
+    Args:
+        summaries: Candidate investments
+        iterations: Number of iterations
+        rng: Random number generator, one seeded by the seeds of all the candidates if not given, so that
+            the same candidates give the same samples
+
+    Returns:
+        (iterations, n_candidates) array of NPV and (n_candidates, ) array of expected upfront cost
+    """
+    if rng is None:
+        rng = np.random.default_rng([summary.get_seed() for summary in summaries])
+    NPV = np.empty((iterations, len(summaries)))
+    upfront_costs = np.empty(len(summaries))
+    for (candidate_no, summary) in enumerate(summaries):
+        net_cash_flow = summary.sample_net_cash_flow(iterations, rng)
+        NPV[:, candidate_no] = get_NPV(net_cash_flow, summary.interest_rate)
+        upfront_costs[candidate_no] = -np.mean(net_cash_flow[:, 0])
+    return (NPV, upfront_costs)
+
+
+# ----- Optimization ----- #
+def optimize(NPV: np.ndarray,
+             upfront_costs: np.ndarray,
+             budget: float,
+             objective: Objective = get_expected_value,
+             max_moves: int = 1000) -> PortfolioResult:
+    """
+    Select the candidates maximizing the objective within the upfront budget
+
+    Args:
+        NPV: (iterations, n_candidates) array of jointly sampled NPV
+        upfront_costs: (n_candidates, ) array of upfront cost, negative for an upfront income
+        budget: Maximum total upfront cost
+        objective: Maps (iterations, n_portfolios) NPV to (n_portfolios, ) objective,
+            e.g. `get_expected_value` or `get_CVaR(0.05)`
+        max_moves: Maximum number of local search moves
+
+    Returns:
+        Selected portfolio
+    """
+    NPV = np.asarray(NPV, dtype=float)
+    upfront_costs = np.asarray(upfront_costs, dtype=float)
+    selection = np.zeros(NPV.shape[1], dtype=bool)
+    total = np.zeros(NPV.shape[0])
+    current = float(objective(total[:, None])[0])
+    cost = 0.0
+
+    # Greedy fill by gain per upfront cost till the budget runs out, then keep the best
+    # portfolio along the way, as a risk-adjusted objective may improve only after several additions
+    (order, best_length, best_value) = ([], 0, current)
+    while True:
+        feasible = np.flatnonzero(~selection & (cost + upfront_costs <= budget))
+        if len(feasible) == 0:
+            break
+        values = objective(total[:, None] + NPV[:, feasible])
+        best = int(np.argmax((values - current) / np.maximum(upfront_costs[feasible], 1e-12)))
+        candidate_no = int(feasible[best])
+        selection[candidate_no] = True
+        total = total + NPV[:, candidate_no]
+        cost += float(upfront_costs[candidate_no])
+        current = float(values[best])
+        order.append(candidate_no)
+        if current > best_value:
+            (best_length, best_value) = (len(order), current)
+    selection[order[best_length:]] = False
+    total = NPV[:, selection].sum(axis=1)
+    cost = float(np.sum(upfront_costs[selection]))
+    current = best_value
+
+    # Local search with best improving add, drop or swap
+    for _ in range(max_moves):
+        (move, move_value) = _best_move(NPV, upfront_costs, budget, objective, selection, total, cost)
+        if move_value <= current + 1e-12 * max(1.0, abs(current)):
+            break
+        (dropped, added) = move
+        for (candidate_no, sign) in ((dropped, -1), (added, 1)):
+            if candidate_no is not None:
+                selection[candidate_no] = sign > 0
+                total = total + sign * NPV[:, candidate_no]
+                cost += sign * float(upfront_costs[candidate_no])
+        current = move_value
+    return PortfolioResult(selection, current, cost, total)
+
+def _best_move(NPV: np.ndarray,
+               upfront_costs: np.ndarray,
+               budget: float,
+               objective: Objective,
+               selection: np.ndarray,
+               total: np.ndarray,
+               cost: float) -> Tuple[Tuple[Optional[int], Optional[int]], float]:
+    """Best move as (dropped, added) candidates, None for no candidate, and its objective"""
+    (best_move, best_value) = ((None, None), -np.inf)
+    selected = np.flatnonzero(selection)
+    unselected = np.flatnonzero(~selection)
+    for dropped in [None] + selected.tolist():
+        (base, base_cost) = (total, cost)
+        if dropped is not None:
+            (base, base_cost) = (total - NPV[:, dropped], cost - upfront_costs[dropped])
+            if base_cost <= budget:
+                value = float(objective(base[:, None])[0])
+                if value > best_value:
+                    (best_move, best_value) = ((dropped, None), value)
+        added = unselected[base_cost + upfront_costs[unselected] <= budget]
+        if len(added) == 0:
+            continue
+        values = objective(base[:, None] + NPV[:, added])
+        best = int(np.argmax(values))
+        if values[best] > best_value:
+            (best_move, best_value) = ((dropped, int(added[best])), float(values[best]))
+    return (best_move, best_value)
+
+def optimize_portfolio(summaries: Sequence[Summary],
+                       budget: float,
+                       objective: Objective = get_expected_value,
+                       iterations: int = 10000,
+                       rng: Optional[np.random.Generator] = None) -> PortfolioResult:
+    """
+    Sample the candidates and select the portfolio, see `sample_candidates` and `optimize`
+
+    Sample once with `sample_candidates` to compare several budgets or objectives.
+    """
+    (NPV, upfront_costs) = sample_candidates(summaries, iterations, rng)
+    return optimize(NPV, upfront_costs, budget, objective)
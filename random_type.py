@@ -3,10 +3,14 @@
 __version__ = "0.1"
 __author__ = "Vaibhav Gupta"
 
+from typing import TYPE_CHECKING, NamedTuple, Optional, Tuple
 import math
-import random
+import secrets
 
-import lxml.etree as etree
+import numpy as np
+
+if TYPE_CHECKING:
+    import lxml.etree as etree
 
 
 # ----- Internal Functions ----- #
@@ -16,15 +20,114 @@ def _value_or_default(value: str, default: float) -> float:
     else:
         return float(value)
 
+def _format_decimal(value: float) -> str:
+    """Text of a value for an xs:decimal field, which does not allow an exponent"""
+    return np.format_float_positional(value, trim="0")
+
 def _value_or_empty(value: float, compare_to: float) -> str:
     if value == compare_to:
         return ""
+    elif float(value).is_integer():
+        return str(int(value))
     else:
         return str(value)
 
+
+# ----- Random Number Generators ----- #
+RNG_ALGORITHMS = {"PCG64": np.random.PCG64,
+                  "PCG64DXSM": np.random.PCG64DXSM,
+                  "Philox": np.random.Philox,
+                  "SFC64": np.random.SFC64,
+                  "MT19937": np.random.MT19937}
+
+DEFAULT_RNG_ALGORITHM = "PCG64"
+
+def create_seed() -> int:
+    """Fresh random seed, small enough for every scenario format"""
+    return secrets.randbits(63)
+
+def create_generator(seed: int,
+                     rng_algorithm: str = DEFAULT_RNG_ALGORITHM,
+                     spawn_key: Tuple[int, ...] = ()) -> np.random.Generator:
+    """
+    Create a random number generator
+
+    Generators with the same seed but different spawn keys give
+    independent streams, e.g. for the chunks of a parallel run.
+
+    Args:
+        seed: Seed of the generator
+        rng_algorithm: Name of the bit generator, one of `RNG_ALGORITHMS`
+        spawn_key: Key of the stream
+
+    Returns:
+        Random number generator
+    """
+    if rng_algorithm not in RNG_ALGORITHMS:
+        raise ValueError(f"Unknown RNG algorithm '{rng_algorithm}', expected one of {', '.join(RNG_ALGORITHMS)}")
+    return np.random.Generator(RNG_ALGORITHMS[rng_algorithm](np.random.SeedSequence(seed, spawn_key=spawn_key)))
+
 # ----- Base Class for Random Type ----- #
 class RandomType():
-    pass
+    """Base class for all the Random Types"""
+    __slots__ = ()
+
+    def freeze(self) -> "FrozenRandomType":
+        """Immutable and hashable form of the instance"""
+        data = self.generate_dict()
+        return FrozenRandomType(data.pop("type"), tuple(data.items()))
+
+    def get_means(self, years: np.ndarray) -> np.ndarray:
+        """
+        Analytic mean of the values of the years
+
+        Args:
+            years: Years of sampling
+
+        Returns:
+            (len(years), ) array of means, 0 for years outside active interval
+        """
+        return np.where(self._active_years(years), self.get_mean(), 0.0)
+
+    def get_variances(self, years: np.ndarray) -> np.ndarray:
+        """
+        Analytic variance of the values of the years
+
+        Args:
+            years: Years of sampling
+
+        Returns:
+            (len(years), ) array of variances, 0 for years outside active interval
+        """
+        return np.where(self._active_years(years), self.get_variance(), 0.0)
+
+    def _active_years(self, years: np.ndarray) -> np.ndarray:
+        """Boolean mask of the years which lie in the active interval"""
+        return (years >= self.start_year) & (years <= self.end_year)
+
+    def _add_active_interval(self, data: dict) -> dict:
+        """Add active interval, if not the default one, to the dictionary of the instance"""
+        if self.start_year != 0:
+            data["startYear"] = int(self.start_year)
+        if not math.isinf(self.end_year):
+            data["endYear"] = int(self.end_year)
+        return data
+
+# ----- Frozen Random Type ----- #
+class FrozenRandomType(NamedTuple):
+    """
+    Immutable and hashable form of a Random Type
+
+    Attributes:
+        type: Name of the Random Type
+        parameters: Pairs of parameter name and value, as in the dictionary of the Random Type
+    """
+    type: str
+    parameters: Tuple[Tuple[str, float], ...]
+
+    def thaw(self) -> RandomType:
+        """Random Type of the frozen instance"""
+        return create_from_dict(dict(self.parameters, type=self.type))
 
 # ----- Gaussian Random Type ----- #
 class Gaussian(RandomType):
@@ -37,6 +140,7 @@ class Gaussian(RandomType):
         start_year: Starting year of active interval
         end_year: Ending year of active interval
     """
+    __slots__ = ("mu", "sigma", "start_year", "end_year")
     mu: float
     sigma: float
     start_year: float
@@ -62,37 +166,78 @@ class Gaussian(RandomType):
         self.end_year = end_year
 
     @classmethod
-    def create_from_etree_element(cls, etree_element: etree.Element) -> None:
+    def create_from_etree_element(cls, etree_element: "etree.Element") -> None:
         """Initialize from an etree element"""
         return cls(mu=float(etree_element.find("mu").text),
                    sigma=float(etree_element.find("sigma").text),
                    start_year=_value_or_default(etree_element.find("startYear").text, 0),
                    end_year=_value_or_default(etree_element.find("endYear").text, math.inf))
 
-    def sample_value(self, year: int = 0) -> float:
+    @classmethod
+    def create_from_dict(cls, data: dict) -> "Gaussian":
+        """Initialize from a dictionary"""
+        return cls(mu=data["mu"], sigma=data["sigma"],
+                   start_year=data.get("startYear", 0),
+                   end_year=data.get("endYear", math.inf))
+
+    def sample_value(self, year: int = 0, rng: Optional[np.random.Generator] = None) -> float:
         """
         Sample a random value for the year
 
         Args:
             year: Year of sampling
+            rng: Random number generator, a fresh one if not given
 
         Returns:
             sampled value if year in active interval, 0 otherwise
         """
         if (year >= self.start_year and year <= self.end_year):
-            return random.gauss(self.mu, self.sigma)
+            if rng is None:
+                rng = np.random.default_rng()
+            return float(rng.normal(self.mu, self.sigma))
         else:
             return 0.0
 
-    def generate_etree_element(self) -> etree.Element:
+    def sample_values(self, years: np.ndarray, size: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Sample random values for a batch of iterations
+
+        Args:
+            years: Years of sampling
+            size: Number of iterations
+            rng: Random number generator
+
+        Returns:
+            (size, len(years)) array of sampled values, 0 for years outside active interval
+        """
+        active = self._active_years(years)
+        values = np.zeros((size, len(years)))
+        values[:, active] = rng.normal(self.mu, self.sigma, (size, np.count_nonzero(active)))
+        return values
+
+    def get_mean(self) -> float:
+        """Mean of the distribution"""
+        return self.mu
+
+    def get_variance(self) -> float:
+        """Variance of the distribution"""
+        return self.sigma**2
+
+    def generate_etree_element(self) -> "etree.Element":
         """Generate etree element of the instance"""
+        import lxml.etree as etree
+
         element = etree.Element("Gaussian")
-        etree.SubElement(element, "mu").text = str(self.mu)
-        etree.SubElement(element, "sigma").text = str(self.sigma)
+        etree.SubElement(element, "mu").text = _format_decimal(self.mu)
+        etree.SubElement(element, "sigma").text = _format_decimal(self.sigma)
         etree.SubElement(element, "startYear").text = _value_or_empty(self.start_year, 0)
         etree.SubElement(element, "endYear").text = _value_or_empty(self.end_year, math.inf)
         return element
 
+    def generate_dict(self) -> dict:
+        """Generate dictionary of the instance"""
+        return self._add_active_interval({"type": "Gaussian", "mu": self.mu, "sigma": self.sigma})
+
     def __repr__(self) -> str:
         """String representation of the instance"""
         string_list = [f"{self.__class__.__name__}(mu={self.mu:.2f}, sigma={self.sigma:.2f}"]
@@ -122,6 +267,7 @@ class Constant(RandomType):
         start_year: Starting year of active interval
         end_year: Ending year of active interval
     """
+    __slots__ = ("value", "start_year", "end_year")
     value: float
     start_year: float
     end_year: float
@@ -143,18 +289,26 @@ class Constant(RandomType):
         self.end_year = end_year
 
     @classmethod
-    def create_from_etree_element(cls, etreeElement: etree.Element) -> None:
+    def create_from_etree_element(cls, etreeElement: "etree.Element") -> None:
         """Initialize from an etree element"""
         return cls(value=float(etreeElement.find("value").text),
                    start_year=_value_or_default(etreeElement.find("startYear").text, 0),
                    end_year=_value_or_default(etreeElement.find("endYear").text, math.inf))
 
-    def sample_value(self, year: int = 0) -> float:
+    @classmethod
+    def create_from_dict(cls, data: dict) -> "Constant":
+        """Initialize from a dictionary"""
+        return cls(value=data["value"],
+                   start_year=data.get("startYear", 0),
+                   end_year=data.get("endYear", math.inf))
+
+    def sample_value(self, year: int = 0, rng: Optional[np.random.Generator] = None) -> float:
         """
         Sample a random value for the year
 
         Args:
             year: Year of sampling
+            rng: Random number generator, a fresh one if not given
 
         Returns:
             sampled value if year in active interval, 0 otherwise
@@ -164,14 +318,45 @@ class Constant(RandomType):
         else:
             return 0.0
 
-    def generate_etree_element(self) -> etree.Element:
+    def sample_values(self, years: np.ndarray, size: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Sample random values for a batch of iterations
+
+        Args:
+            years: Years of sampling
+            size: Number of iterations
+            rng: Random number generator
+
+        Returns:
+            (size, len(years)) array of sampled values, 0 for years outside active interval
+        """
+        active = self._active_years(years)
+        values = np.zeros((size, len(years)))
+        values[:, active] = self.value
+        return values
+
+    def get_mean(self) -> float:
+        """Mean of the distribution"""
+        return self.value
+
+    def get_variance(self) -> float:
+        """Variance of the distribution"""
+        return 0.0
+
+    def generate_etree_element(self) -> "etree.Element":
         """Generate etree element of the instance"""
+        import lxml.etree as etree
+
         element = etree.Element("Constant")
-        etree.SubElement(element, "value").text = str(self.value)
+        etree.SubElement(element, "value").text = _format_decimal(self.value)
         etree.SubElement(element, "startYear").text = _value_or_empty(self.start_year, 0)
         etree.SubElement(element, "endYear").text = _value_or_empty(self.end_year, math.inf)
         return element
 
+    def generate_dict(self) -> dict:
+        """Generate dictionary of the instance"""
+        return self._add_active_interval({"type": "Constant", "value": self.value})
+
     def __repr__(self) -> str:
         """String representation of the instance"""
         string_list = [f"{self.__class__.__name__}(value={self.value:.2f}"]
@@ -201,6 +386,7 @@ class Pareto(RandomType):
         start_year: Starting year of active interval
         end_year: Ending year of active interval
     """
+    __slots__ = ("alpha", "start_year", "end_year")
     alpha: float
     start_year: float
     end_year: float
@@ -222,35 +408,76 @@ class Pareto(RandomType):
         self.end_year = end_year
 
     @classmethod
-    def create_from_etree_element(cls, etreeElement: etree.Element) -> None:
+    def create_from_etree_element(cls, etreeElement: "etree.Element") -> None:
         """Initialize from an etree element"""
         return cls(alpha=float(etreeElement.find("alpha").text),
                    start_year=_value_or_default(etreeElement.find("startYear").text, 0),
                    end_year=_value_or_default(etreeElement.find("endYear").text, math.inf))
 
-    def sample_value(self, year: int = 0) -> float:
+    @classmethod
+    def create_from_dict(cls, data: dict) -> "Pareto":
+        """Initialize from a dictionary"""
+        return cls(alpha=data["alpha"],
+                   start_year=data.get("startYear", 0),
+                   end_year=data.get("endYear", math.inf))
+
+    def sample_value(self, year: int = 0, rng: Optional[np.random.Generator] = None) -> float:
         """
         Sample a random value for the year
 
         Args:
             year: Year of sampling
+            rng: Random number generator, a fresh one if not given
 
         Returns:
             sampled value if year in active interval, 0 otherwise
         """
         if (year >= self.start_year and year <= self.end_year):
-            return random.paretovariate(self.alpha)
+            if rng is None:
+                rng = np.random.default_rng()
+            return float(rng.pareto(self.alpha)) + 1
         else:
             return 0.0
 
-    def generate_etree_element(self) -> etree.Element:
+    def sample_values(self, years: np.ndarray, size: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Sample random values for a batch of iterations
+
+        Args:
+            years: Years of sampling
+            size: Number of iterations
+            rng: Random number generator
+
+        Returns:
+            (size, len(years)) array of sampled values, 0 for years outside active interval
+        """
+        active = self._active_years(years)
+        values = np.zeros((size, len(years)))
+        values[:, active] = rng.pareto(self.alpha, (size, np.count_nonzero(active))) + 1
+        return values
+
+    def get_mean(self) -> float:
+        """Mean of the distribution, infinite for alpha of 1 or less"""
+        return self.alpha / (self.alpha - 1) if self.alpha > 1 else math.inf
+
+    def get_variance(self) -> float:
+        """Variance of the distribution, infinite for alpha of 2 or less"""
+        return self.alpha / ((self.alpha - 1)**2 * (self.alpha - 2)) if self.alpha > 2 else math.inf
+
+    def generate_etree_element(self) -> "etree.Element":
         """Generate etree element of the instance"""
+        import lxml.etree as etree
+
         element = etree.Element("Pareto")
-        etree.SubElement(element, "alpha").text = str(self.alpha)
+        etree.SubElement(element, "alpha").text = _format_decimal(self.alpha)
         etree.SubElement(element, "startYear").text = _value_or_empty(self.start_year, 0)
         etree.SubElement(element, "endYear").text = _value_or_empty(self.end_year, math.inf)
         return element
 
+    def generate_dict(self) -> dict:
+        """Generate dictionary of the instance"""
+        return self._add_active_interval({"type": "Pareto", "alpha": self.alpha})
+
     def __repr__(self) -> str:
         """String representation of the instance"""
         string_list = [f"{self.__class__.__name__}(alpha={self.alpha:.2f}"]
@@ -270,11 +497,450 @@ class Pareto(RandomType):
             string = "".join([string, f", ending in year {self.end_year:.0f}"])
         return string
 
+# ----- Bernoulli Random Type ----- #
+class Bernoulli(RandomType):
+    """
+    Random Type of an event which may happen in each year, e.g. a repair
+
+    Attributes:
+        probability: Probability of the event in a year
+        value: Value of the event, e.g. its cost
+        start_year: Starting year of active interval
+        end_year: Ending year of active interval
+    """
+    __slots__ = ("probability", "value", "start_year", "end_year")
+    probability: float
+    value: float
+    start_year: float
+    end_year: float
+
+    def __init__(self,
+                 probability: float = 0.1,
+                 value: float = 0.0,
+                 start_year: float = 0,
+                 end_year: float = math.inf) -> None:
+        """
+        Default initialization method for Bernoulli Random Type
+
+        Args:
+            probability: Probability of the event in a year
+            value: Value of the event, e.g. its cost
+            start_year: Starting year of active interval
+            end_year: Ending year of active interval
+        """
+        self.probability = probability
+        self.value = value
+        self.start_year = start_year
+        self.end_year = end_year
+
+    @classmethod
+    def create_from_etree_element(cls, etree_element: "etree.Element") -> "Bernoulli":
+        """Initialize from an etree element"""
+        return cls(probability=float(etree_element.find("probability").text),
+                   value=float(etree_element.find("value").text),
+                   start_year=_value_or_default(etree_element.find("startYear").text, 0),
+                   end_year=_value_or_default(etree_element.find("endYear").text, math.inf))
+
+    @classmethod
+    def create_from_dict(cls, data: dict) -> "Bernoulli":
+        """Initialize from a dictionary"""
+        return cls(probability=data["probability"], value=data["value"],
+                   start_year=data.get("startYear", 0),
+                   end_year=data.get("endYear", math.inf))
+
+    def sample_value(self, year: int = 0, rng: Optional[np.random.Generator] = None) -> float:
+        """
+        Sample a random value for the year
+
+        Args:
+            year: Year of sampling
+            rng: Random number generator, a fresh one if not given
+
+        Returns:
+            value if the event happens in a year in active interval, 0 otherwise
+        """
+        if (year >= self.start_year and year <= self.end_year):
+            if rng is None:
+                rng = np.random.default_rng()
+            return self.value if rng.random() < self.probability else 0.0
+        else:
+            return 0.0
+
+    def sample_values(self, years: np.ndarray, size: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Sample random values for a batch of iterations
+
+        Args:
+            years: Years of sampling
+            size: Number of iterations
+            rng: Random number generator
+
+        Returns:
+            (size, len(years)) array of sampled values, 0 for years outside active interval
+        """
+        active = self._active_years(years)
+        values = np.zeros((size, len(years)))
+        values[:, active] = (rng.random((size, np.count_nonzero(active))) < self.probability) * self.value
+        return values
+
+    def get_mean(self) -> float:
+        """Mean of the distribution"""
+        return self.probability * self.value
+
+    def get_variance(self) -> float:
+        """Variance of the distribution"""
+        return self.probability * (1 - self.probability) * self.value**2
+
+    def generate_etree_element(self) -> "etree.Element":
+        """Generate etree element of the instance"""
+        import lxml.etree as etree
+
+        element = etree.Element("Bernoulli")
+        etree.SubElement(element, "probability").text = _format_decimal(self.probability)
+        etree.SubElement(element, "value").text = _format_decimal(self.value)
+        etree.SubElement(element, "startYear").text = _value_or_empty(self.start_year, 0)
+        etree.SubElement(element, "endYear").text = _value_or_empty(self.end_year, math.inf)
+        return element
+
+    def generate_dict(self) -> dict:
+        """Generate dictionary of the instance"""
+        return self._add_active_interval({"type": "Bernoulli", "probability": self.probability, "value": self.value})
+
+    def __repr__(self) -> str:
+        """String representation of the instance"""
+        string_list = [f"{self.__class__.__name__}(probability={self.probability:.3f}, value={self.value:.2f}"]
+        if self.start_year != 0:
+            string_list.append(f", start_year={self.start_year:.0f}")
+        if not math.isinf(self.end_year):
+            string_list.append(f", end_year={self.end_year:.0f}")
+        string_list.append(")")
+        return "".join(string_list)
+
+    def __str__(self) -> str:
+        """Readable string representation of the instance"""
+        string = f"Event of {self.value:.2f} with a probability of {self.probability:.3f} per year"
+        if self.start_year != 0:
+            string = "".join([string, f", starting in year {self.start_year:.0f}"])
+        if not math.isinf(self.end_year):
+            string = "".join([string, f", ending in year {self.end_year:.0f}"])
+        return string
+
+# ----- Poisson Random Type ----- #
+class Poisson(RandomType):
+    """
+    Random Type of events happening a Poisson number of times in each year, each with a Gaussian value
+
+    The sum of the `n` values of a year is Gaussian with mean `n mu` and
+    std. deviation `sqrt(n) sigma`, so it is sampled with a single draw
+    whatever the number of events.
+
+    Attributes:
+        rate: Mean number of events in a year
+        mu: Mean value of an event, e.g. its cost
+        sigma: Std. deviation of the value of an event
+        start_year: Starting year of active interval
+        end_year: Ending year of active interval
+    """
+    __slots__ = ("rate", "mu", "sigma", "start_year", "end_year")
+    rate: float
+    mu: float
+    sigma: float
+    start_year: float
+    end_year: float
+
+    def __init__(self,
+                 rate: float = 1,
+                 mu: float = 0,
+                 sigma: float = 0,
+                 start_year: float = 0,
+                 end_year: float = math.inf) -> None:
+        """
+        Default initialization method for Poisson Random Type
+
+        Args:
+            rate: Mean number of events in a year
+            mu: Mean value of an event, e.g. its cost
+            sigma: Std. deviation of the value of an event
+            start_year: Starting year of active interval
+            end_year: Ending year of active interval
+        """
+        self.rate = rate
+        self.mu = mu
+        self.sigma = sigma
+        self.start_year = start_year
+        self.end_year = end_year
+
+    @classmethod
+    def create_from_etree_element(cls, etree_element: "etree.Element") -> "Poisson":
+        """Initialize from an etree element"""
+        return cls(rate=float(etree_element.find("rate").text),
+                   mu=float(etree_element.find("mu").text),
+                   sigma=float(etree_element.find("sigma").text),
+                   start_year=_value_or_default(etree_element.find("startYear").text, 0),
+                   end_year=_value_or_default(etree_element.find("endYear").text, math.inf))
+
+    @classmethod
+    def create_from_dict(cls, data: dict) -> "Poisson":
+        """Initialize from a dictionary"""
+        return cls(rate=data["rate"], mu=data["mu"], sigma=data["sigma"],
+                   start_year=data.get("startYear", 0),
+                   end_year=data.get("endYear", math.inf))
+
+    def sample_value(self, year: int = 0, rng: Optional[np.random.Generator] = None) -> float:
+        """
+        Sample a random value for the year
+
+        Args:
+            year: Year of sampling
+            rng: Random number generator, a fresh one if not given
+
+        Returns:
+            sum of the values of the events if year in active interval, 0 otherwise
+        """
+        if (year >= self.start_year and year <= self.end_year):
+            if rng is None:
+                rng = np.random.default_rng()
+            count = rng.poisson(self.rate)
+            return float(count * self.mu + math.sqrt(count) * self.sigma * rng.standard_normal())
+        else:
+            return 0.0
+
+    def sample_values(self, years: np.ndarray, size: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Sample random values for a batch of iterations
+
+        Args:
+            years: Years of sampling
+            size: Number of iterations
+            rng: Random number generator
+
+        Returns:
+            (size, len(years)) array of sampled values, 0 for years outside active interval
+        """
+        active = self._active_years(years)
+        values = np.zeros((size, len(years)))
+        counts = rng.poisson(self.rate, (size, np.count_nonzero(active)))
+        values[:, active] = counts * self.mu + np.sqrt(counts) * self.sigma * rng.standard_normal(counts.shape)
+        return values
+
+    def get_mean(self) -> float:
+        """Mean of the distribution"""
+        return self.rate * self.mu
+
+    def get_variance(self) -> float:
+        """Variance of the distribution"""
+        return self.rate * (self.mu**2 + self.sigma**2)
+
+    def generate_etree_element(self) -> "etree.Element":
+        """Generate etree element of the instance"""
+        import lxml.etree as etree
+
+        element = etree.Element("Poisson")
+        etree.SubElement(element, "rate").text = _format_decimal(self.rate)
+        etree.SubElement(element, "mu").text = _format_decimal(self.mu)
+        etree.SubElement(element, "sigma").text = _format_decimal(self.sigma)
+        etree.SubElement(element, "startYear").text = _value_or_empty(self.start_year, 0)
+        etree.SubElement(element, "endYear").text = _value_or_empty(self.end_year, math.inf)
+        return element
+
+    def generate_dict(self) -> dict:
+        """Generate dictionary of the instance"""
+        return self._add_active_interval({"type": "Poisson", "rate": self.rate, "mu": self.mu, "sigma": self.sigma})
+
+    def __repr__(self) -> str:
+        """String representation of the instance"""
+        string_list = [f"{self.__class__.__name__}(rate={self.rate:.3f}, mu={self.mu:.2f}, sigma={self.sigma:.2f}"]
+        if self.start_year != 0:
+            string_list.append(f", start_year={self.start_year:.0f}")
+        if not math.isinf(self.end_year):
+            string_list.append(f", end_year={self.end_year:.0f}")
+        string_list.append(")")
+        return "".join(string_list)
+
+    def __str__(self) -> str:
+        """Readable string representation of the instance"""
+        string = "".join([f"{self.rate:.3f} events per year on average, ",
+                          f"each with mu={self.mu:.2f} and sigma={self.sigma:.2f}"])
+        if self.start_year != 0:
+            string = "".join([string, f", starting in year {self.start_year:.0f}"])
+        if not math.isinf(self.end_year):
+            string = "".join([string, f", ending in year {self.end_year:.0f}"])
+        return string
+
+# ----- One-off Event Random Type ----- #
+class OneOffEvent(RandomType):
+    """
+    Random Type of an event which may happen once, in a year drawn uniformly from the active interval
+
+    The years of an iteration are not independent, as the event happens in
+    one of them at most, so the variance of a single year is not enough for
+    analytic moments, which fall back to sampling.
+
+    Attributes:
+        probability: Probability of the event happening at all
+        value: Value of the event, e.g. its cost
+        start_year: Starting year of active interval
+        end_year: Ending year of active interval, which must be finite
+    """
+    __slots__ = ("probability", "value", "start_year", "end_year")
+    probability: float
+    value: float
+    start_year: float
+    end_year: float
+
+    def __init__(self,
+                 probability: float = 1,
+                 value: float = 0.0,
+                 start_year: float = 0,
+                 end_year: float = 0) -> None:
+        """
+        Default initialization method for OneOffEvent Random Type
+
+        Args:
+            probability: Probability of the event happening at all
+            value: Value of the event, e.g. its cost
+            start_year: Starting year of active interval
+            end_year: Ending year of active interval
+
+        Raises:
+            ValueError: If the end year is infinite
+        """
+        if math.isinf(end_year):
+            raise ValueError("One-off event must have a finite end year")
+        self.probability = probability
+        self.value = value
+        self.start_year = start_year
+        self.end_year = end_year
+
+    @classmethod
+    def create_from_etree_element(cls, etree_element: "etree.Element") -> "OneOffEvent":
+        """Initialize from an etree element"""
+        return cls(probability=float(etree_element.find("probability").text),
+                   value=float(etree_element.find("value").text),
+                   start_year=_value_or_default(etree_element.find("startYear").text, 0),
+                   end_year=float(etree_element.find("endYear").text))
+
+    @classmethod
+    def create_from_dict(cls, data: dict) -> "OneOffEvent":
+        """Initialize from a dictionary"""
+        return cls(probability=data["probability"], value=data["value"],
+                   start_year=data.get("startYear", 0),
+                   end_year=data["endYear"])
+
+    def get_window(self) -> int:
+        """Number of years in the active interval"""
+        return max(int(self.end_year) - int(self.start_year) + 1, 0)
+
+    def sample_value(self, year: int = 0, rng: Optional[np.random.Generator] = None) -> float:
+        """
+        Sample a random value for the year
+
+        A single year does not know of the others, so this samples the
+        probability of the event falling in the year alone. Use
+        `sample_values` over all the years of an iteration, as the cash flow
+        sheet does, to keep the event to a single year.
+
+        Args:
+            year: Year of sampling
+            rng: Random number generator, a fresh one if not given
+
+        Returns:
+            value if the event happens in the year, 0 otherwise
+        """
+        if (year >= self.start_year and year <= self.end_year):
+            if rng is None:
+                rng = np.random.default_rng()
+            return self.value if rng.random() < self.probability / self.get_window() else 0.0
+        else:
+            return 0.0
+
+    def sample_values(self, years: np.ndarray, size: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Sample random values for a batch of iterations
+
+        Args:
+            years: Years of sampling, in increasing order
+            size: Number of iterations
+            rng: Random number generator
+
+        Returns:
+            (size, len(years)) array of sampled values, the value in the year of the event
+            if it happens in one of the years, 0 elsewhere
+        """
+        values = np.zeros((size, len(years)))
+        if self.get_window() == 0 or len(years) == 0:
+            return values
+        happens = rng.random(size) < self.probability
+        event_years = self.start_year + rng.integers(self.get_window(), size=size)
+        columns = np.minimum(np.searchsorted(years, event_years), len(years) - 1)
+        hits = np.nonzero(happens & (years[columns] == event_years))[0]
+        values[hits, columns[hits]] = self.value
+        return values
+
+    def get_mean(self) -> float:
+        """Mean of the value of a year in active interval"""
+        return self.probability * self.value / self.get_window() if self.get_window() else 0.0
+
+    def get_variance(self) -> float:
+        """NaN, as the values of different years are not independent"""
+        return math.nan
+
+    def generate_etree_element(self) -> "etree.Element":
+        """Generate etree element of the instance"""
+        import lxml.etree as etree
+
+        element = etree.Element("OneOffEvent")
+        etree.SubElement(element, "probability").text = _format_decimal(self.probability)
+        etree.SubElement(element, "value").text = _format_decimal(self.value)
+        etree.SubElement(element, "startYear").text = _value_or_empty(self.start_year, 0)
+        etree.SubElement(element, "endYear").text = _value_or_empty(self.end_year, math.inf)
+        return element
+
+    def generate_dict(self) -> dict:
+        """Generate dictionary of the instance"""
+        return self._add_active_interval({"type": "OneOffEvent", "probability": self.probability,
+                                          "value": self.value})
+
+    def __repr__(self) -> str:
+        """String representation of the instance"""
+        string_list = [f"{self.__class__.__name__}(probability={self.probability:.3f}, value={self.value:.2f}"]
+        if self.start_year != 0:
+            string_list.append(f", start_year={self.start_year:.0f}")
+        string_list.append(f", end_year={self.end_year:.0f})")
+        return "".join(string_list)
+
+    def __str__(self) -> str:
+        """Readable string representation of the instance"""
+        return "".join([f"One-off event of {self.value:.2f} with a probability of {self.probability:.3f}, ",
+                        f"in a year from {self.start_year:.0f} to {self.end_year:.0f}"])
+
 # ----- Base Methods for Random Type ----- #
-def create_from_etree_element(etree_element: etree.Element) -> RandomType:
+def create_from_etree_element(etree_element: "etree.Element") -> RandomType:
     if (etree_element.tag == "Gaussian"):
         return Gaussian.create_from_etree_element(etree_element)
     elif (etree_element.tag == "Constant"):
         return Constant.create_from_etree_element(etree_element)
     elif (etree_element.tag == "Pareto"):
         return Pareto.create_from_etree_element(etree_element)
+    elif (etree_element.tag == "Bernoulli"):
+        return Bernoulli.create_from_etree_element(etree_element)
+    elif (etree_element.tag == "Poisson"):
+        return Poisson.create_from_etree_element(etree_element)
+    elif (etree_element.tag == "OneOffEvent"):
+        return OneOffEvent.create_from_etree_element(etree_element)
+    raise ValueError(f"Unknown Random Type '{etree_element.tag}'")
+
+def create_from_dict(data: dict) -> RandomType:
+    if (data["type"] == "Gaussian"):
+        return Gaussian.create_from_dict(data)
+    elif (data["type"] == "Constant"):
+        return Constant.create_from_dict(data)
+    elif (data["type"] == "Pareto"):
+        return Pareto.create_from_dict(data)
+    elif (data["type"] == "Bernoulli"):
+        return Bernoulli.create_from_dict(data)
+    elif (data["type"] == "Poisson"):
+        return Poisson.create_from_dict(data)
+    elif (data["type"] == "OneOffEvent"):
+        return OneOffEvent.create_from_dict(data)
+    raise ValueError(f"Unknown Random Type '{data['type']}'")
@@ -0,0 +1,291 @@
+"""Module for diffing scenarios and estimating the impact of the changes
+
+The diff compares two summaries setting by setting, group by group and
+item by item, down to the parameters of the Random Types. The impact on
+NPV is estimated without rerunning the scenario:
+
+* Mean and variance change by the analytic moments of the changed items
+  alone, as the items are sampled independently of each other.
+* Items whose distribution has no finite moment are resampled, alone.
+* Items in another currency are converted by the moments of its FX rate,
+  leaving out the covariance the shared rate adds between items.
+* The pipeline of the summary is left out, so the estimate is of NPV
+  before tax, depreciation and inflation.
+* Given the per-item sample columns of the old scenario (an
+  `attribution.Attribution`), the NPV samples of the new scenario are the
+  old ones with the columns of the changed items swapped for resampled
+  ones, which also gives the change in the probability of a positive NPV.
+
+Run as a script to diff two scenarios, e.g.
+`python scenario_diff.py old.xml new.xml`.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import argparse
+import math
+
+import numpy as np
+
+from attribution import Attribution
+from cash_flow import CashFlowItem, Summary
+
+SETTINGS = (("interestRate", "interest_rate"), ("years", "years"), ("iterations", "iterations"),
+            ("seed", "seed"), ("rngAlgorithm", "rng_algorithm"), ("currency", "currency"),
+            ("pipeline", "pipeline"))
+
+
+# ----- Diff ----- #
+class Change(NamedTuple):
+    """
+    A change between two scenarios
+
+    Attributes:
+        kind: One of "added", "removed" or "changed"
+        path: Path of the changed entry, e.g. "Group/Item/recurringCost.mu"
+        old: Old value, None if added
+        new: New value, None if removed
+    """
+    kind: str
+    path: str
+    old: Any
+    new: Any
+
+    def __str__(self) -> str:
+        """Readable string representation of the instance"""
+        if self.kind == "added":
+            return f"+ {self.path}"
+        elif self.kind == "removed":
+            return f"- {self.path}"
+        return f"~ {self.path}: {self.old!r} -> {self.new!r}"
+
+def _get_items(summary: Summary) -> Dict[Tuple[str, str], CashFlowItem]:
+    return {(group.name, item.name): item for group in summary.cash_flow_sheet.groups for item in group.items}
+
+def _get_fx_rate_dict(summary: Summary, item: CashFlowItem) -> Optional[dict]:
+    """Dictionary of the FX rate converting the item, None if it is in the reporting currency"""
+    fx_rate = summary.get_fx_rate(item.currency)
+    return None if fx_rate is None else fx_rate.generate_dict()
+
+def _diff_fx_rates(old: Summary, new: Summary) -> List[Change]:
+    (old_rates, new_rates) = ({fx_rate.currency: fx_rate.generate_dict() for fx_rate in summary.fx_rates}
+                              for summary in (old, new))
+    changes = []
+    for currency in list(old_rates) + [currency for currency in new_rates if currency not in old_rates]:
+        (old_rate, new_rate) = (old_rates.get(currency), new_rates.get(currency))
+        if old_rate != new_rate:
+            kind = "added" if old_rate is None else "removed" if new_rate is None else "changed"
+            changes.append(Change(kind, f"fxRates/{currency}", old_rate, new_rate))
+    return changes
+
+def _diff_dicts(old: dict, new: dict, path: str) -> List[Change]:
+    """Changes between two dictionaries of an item, recursing into the Random Types of the same type"""
+    changes = []
+    for key in [key for key in old if key != "name"] + [key for key in new if key not in old]:
+        (old_value, new_value) = (old.get(key), new.get(key))
+        if old_value == new_value:
+            continue
+        if isinstance(old_value, dict) and isinstance(new_value, dict) and old_value["type"] == new_value["type"]:
+            changes += _diff_dicts(old_value, new_value, f"{path}{key}.")
+        else:
+            changes.append(Change("changed", f"{path}{key}", old_value, new_value))
+    return changes
+
+def diff(old: Summary, new: Summary) -> List[Change]:
+    """
+    Changes from the old summary to the new one
+
+    Args:
+        old: Old summary
+        new: New summary
+
+    Returns:
+        Changes of the settings, then of the groups and items in order of the old and new sheets
+    """
+    changes = [Change("changed", key, getattr(old, attribute), getattr(new, attribute))
+               for (key, attribute) in SETTINGS if getattr(old, attribute) != getattr(new, attribute)]
+    changes += _diff_fx_rates(old, new)
+    (old_groups, new_groups) = ({group.name: group for group in sheet.groups}
+                                for sheet in (old.cash_flow_sheet, new.cash_flow_sheet))
+    changes += [Change("removed", name, group.generate_dict(), None)
+                for (name, group) in old_groups.items() if name not in new_groups]
+    changes += [Change("added", name, None, group.generate_dict())
+                for (name, group) in new_groups.items() if name not in old_groups]
+    for (name, old_group) in old_groups.items():
+        if name not in new_groups:
+            continue
+        new_group = new_groups[name]
+        if old_group.desc != new_group.desc:
+            changes.append(Change("changed", f"{name}/desc", old_group.desc, new_group.desc))
+        (old_items, new_items) = ({item.name: item for item in group.items} for group in (old_group, new_group))
+        for (item_name, old_item) in old_items.items():
+            if item_name not in new_items:
+                changes.append(Change("removed", f"{name}/{item_name}", old_item.generate_dict(), None))
+            else:
+                changes += _diff_dicts(old_item.generate_dict(), new_items[item_name].generate_dict(),
+                                       f"{name}/{item_name}/")
+        changes += [Change("added", f"{name}/{item_name}", None, new_item.generate_dict())
+                    for (item_name, new_item) in new_items.items() if item_name not in old_items]
+    return changes
+
+
+# ----- Impact Estimation ----- #
+class ItemImpact(NamedTuple):
+    """
+    Impact of a changed item on NPV
+
+    Attributes:
+        group: Name of the group
+        item: Name of the item
+        mean_change: Change of the mean of NPV
+        variance_change: Change of the variance of NPV
+        method: "analytic" or "resampled"
+    """
+    group: str
+    item: str
+    mean_change: float
+    variance_change: float
+    method: str
+
+class Impact():
+    """
+    Estimated impact of changes on NPV
+
+    Attributes:
+        old_mean: Mean of NPV of the old summary
+        old_variance: Variance of NPV of the old summary
+        items: Impacts of the changed items
+        NPV: (iterations, ) array of NPV samples of the new summary, None if the old samples were not given
+    """
+    old_mean: float
+    old_variance: float
+    items: List[ItemImpact]
+    NPV: Optional[np.ndarray]
+
+    def __init__(self, old_mean: float, old_variance: float, items: List[ItemImpact],
+                 NPV: Optional[np.ndarray] = None) -> None:
+        """
+        Default initialization method for Impact class
+
+        Args:
+            old_mean: Mean of NPV of the old summary
+            old_variance: Variance of NPV of the old summary
+            items: Impacts of the changed items
+            NPV: (iterations, ) array of NPV samples of the new summary
+        """
+        self.old_mean = old_mean
+        self.old_variance = old_variance
+        self.items = items
+        self.NPV = NPV
+
+    # --- Methods --- #
+    def get_mean_change(self) -> float:
+        """Change of the mean of NPV"""
+        return math.fsum(item.mean_change for item in self.items)
+
+    def get_variance_change(self) -> float:
+        """Change of the variance of NPV"""
+        return math.fsum(item.variance_change for item in self.items)
+
+    def get_new_mean(self) -> float:
+        """Mean of NPV of the new summary"""
+        return self.old_mean + self.get_mean_change()
+
+    def get_new_std(self) -> float:
+        """Std. deviation of NPV of the new summary"""
+        return math.sqrt(max(self.old_variance + self.get_variance_change(), 0.0))
+
+    # --- String Representation --- #
+    def __str__(self) -> str:
+        """Readable string representation of the instance"""
+        lines = [f"Mean NPV  {self.old_mean:14.2f} -> {self.get_new_mean():14.2f}",
+                 f"Std. NPV  {math.sqrt(self.old_variance):14.2f} -> {self.get_new_std():14.2f}"]
+        if self.NPV is not None:
+            lines.append(f"P(NPV > 0) of new {np.mean(self.NPV > 0):8.4f}")
+        lines += [f"  {item.group}/{item.item}: mean {item.mean_change:+.2f}, "
+                  f"variance {item.variance_change:+.4g} ({item.method})" for item in self.items]
+        return "\n".join(lines)
+
+def _sample_item_NPV(item: CashFlowItem, summary: Summary, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """Sample NPV contribution of the item alone, in the reporting currency"""
+    fx_rate = summary.get_fx_rate(item.currency)
+    fx_rates = None if fx_rate is None else {item.currency: fx_rate.sample_values(summary.years, iterations, rng)}
+    return item.sample_NPV(summary.years, summary.interest_rate, iterations, rng, fx_rates)
+
+def _item_moments(item: Optional[CashFlowItem],
+                  summary: Summary,
+                  iterations: int,
+                  rng: np.random.Generator,
+                  samples: Optional[np.ndarray] = None) -> Tuple[float, float, bool, Optional[np.ndarray]]:
+    """Mean and variance of the NPV of an item, whether they were sampled, and the samples if drawn"""
+    if item is None:
+        return (0.0, 0.0, False, None)
+    (mean, variance) = item.get_NPV_moments(summary.years, summary.interest_rate, summary.get_fx_rate(item.currency))
+    if math.isfinite(mean) and math.isfinite(variance):
+        return (mean, variance, False, samples)
+    if samples is None:
+        samples = _sample_item_NPV(item, summary, iterations, rng)
+    return (float(np.mean(samples)), float(np.var(samples)), True, samples)
+
+def estimate_impact(old: Summary,
+                    new: Summary,
+                    attribution: Optional[Attribution] = None,
+                    rng: Optional[np.random.Generator] = None) -> Impact:
+    """
+    Estimate the impact on NPV of the changes from the old summary to the new one
+
+    Args:
+        old: Old summary
+        new: New summary
+        attribution: Per-item NPV samples of the old summary, see `attribution.attribute`
+        rng: Random number generator for the resampled items, the one of the new summary if not given
+
+    Returns:
+        Estimated impact
+    """
+    if rng is None:
+        rng = new.get_generator()
+    iterations = old.iterations if attribution is None else attribution.item_NPV.shape[0]
+    (old_items, new_items) = (_get_items(old), _get_items(new))
+    same_settings = (old.years, old.interest_rate, old.currency) == (new.years, new.interest_rate, new.currency)
+    columns = {} if attribution is None else {name: no for (no, name) in enumerate(attribution.item_names)}
+    NPV = None if attribution is None else attribution.get_NPV()
+
+    (old_mean, old_variance, items) = (0.0, 0.0, [])
+    for key in list(old_items) + [key for key in new_items if key not in old_items]:
+        (old_item, new_item) = (old_items.get(key), new_items.get(key))
+        old_samples = attribution.item_NPV[:, columns[key]] if key in columns else None
+        (mean, variance, old_sampled, old_samples) = _item_moments(old_item, old, iterations, rng, old_samples)
+        (old_mean, old_variance) = (old_mean + mean, old_variance + variance)
+        if same_settings and old_item is not None and new_item is not None \
+                and old_item.generate_dict() == new_item.generate_dict() \
+                and _get_fx_rate_dict(old, old_item) == _get_fx_rate_dict(new, new_item):
+            continue
+        (new_mean, new_variance, new_sampled, new_samples) = _item_moments(new_item, new, iterations, rng)
+        if NPV is not None:
+            if new_item is not None and new_samples is None:
+                new_samples = _sample_item_NPV(new_item, new, iterations, rng)
+            NPV = NPV - (0 if old_samples is None else old_samples) + (0 if new_samples is None else new_samples)
+        method = "resampled" if old_sampled or new_sampled else "analytic"
+        items.append(ItemImpact(key[0], key[1], new_mean - mean, new_variance - variance, method))
+    return Impact(old_mean, old_variance, items, NPV)
+
+
+# ----- Command Line Interface ----- #
+def main() -> None:
+    from scenario_format import read_file
+
+    parser = argparse.ArgumentParser(description="Diff two scenarios and estimate the impact on NPV")
+    parser.add_argument("old", help="Old scenario, in any of the scenario formats")
+    parser.add_argument("new", help="New scenario, in any of the scenario formats")
+    args = parser.parse_args()
+    (old, new) = (read_file(args.old), read_file(args.new))
+    for change in diff(old, new):
+        print(change)
+    print(estimate_impact(old, new))
+
+
+if __name__ == "__main__":
+    main()
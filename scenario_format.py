@@ -0,0 +1,256 @@
+"""Module for the compact JSON and MessagePack scenario formats
+
+Both formats store the dictionary given by `Summary.generate_dict`, which
+mirrors the XML model element by element, so scenarios convert between
+all the formats without loss. MessagePack needs the optional `msgpack`
+package.
+
+Run as a script to convert between formats, e.g.
+`python scenario_format.py scenario.xml scenario.msgpack`.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from typing import Callable, Dict, Tuple
+import argparse
+import contextlib
+import json
+import os
+
+from cash_flow import Summary, generate_XML_file, read_XML_file
+from pipeline import DEPRECIATION_METHODS
+from random_type import RNG_ALGORITHMS
+
+RANDOM_TYPE_FIELDS = {"Gaussian": ("mu", "sigma"),
+                      "Constant": ("value", ),
+                      "Pareto": ("alpha", ),
+                      "Bernoulli": ("probability", "value"),
+                      "Poisson": ("rate", "mu", "sigma"),
+                      "OneOffEvent": ("probability", "value")}
+
+# Required and optional fields of the pipeline stages
+PIPELINE_STAGE_FIELDS = {"Depreciation": (("method", "life"), ("rate", )),
+                         "Tax": (("rate", ), ("lossCarryForward", )),
+                         "Inflation": (("rate", ), ())}
+
+_ACTIVE_INTERVAL_FIELDS = ("startYear", "endYear")
+_SUMMARY_OPTIONAL_FIELDS = ("seed", "rngAlgorithm", "currency", "fxRates", "pipeline")
+
+
+# ----- Validation ----- #
+class ScenarioFormatError(ValueError):
+    """Raised when a scenario dictionary does not follow the format"""
+    pass
+
+def _fail(path: str, message: str) -> None:
+    raise ScenarioFormatError(f"{path}: {message}")
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _is_integer(value) -> bool:
+    return _is_number(value) and float(value).is_integer()
+
+def _check_object(data, path: str, required: Tuple[str, ...], optional: Tuple[str, ...] = ()) -> None:
+    """Ensures that 'data' is a dictionary with the required and no unknown keys"""
+    if not isinstance(data, dict):
+        _fail(path, "must be an object")
+    for key in required:
+        if key not in data:
+            _fail(path, f"missing '{key}'")
+    if len(data) > len(required):
+        unknown = set(data).difference(required, optional)
+        if unknown:
+            _fail(path, f"unknown keys {sorted(unknown)}")
+
+def _check_name_desc(data: dict, path: str) -> None:
+    if not isinstance(data["name"], str) or data["name"] == "":
+        _fail(f"{path}.name", "must be a non-empty string")
+    if not isinstance(data.get("desc", ""), str):
+        _fail(f"{path}.desc", "must be a string")
+
+def _check_list(data, path: str) -> None:
+    if not isinstance(data, list) or len(data) == 0:
+        _fail(path, "must be a non-empty list")
+
+def _check_currency(data: dict, key: str, path: str) -> None:
+    if key in data:
+        currency = data[key]
+        if not (isinstance(currency, str) and len(currency) == 3 and currency.isascii() and currency.isupper()):
+            _fail(f"{path}.{key}", "must be a code of three capital letters")
+
+def _validate_random_type(data, path: str) -> None:
+    if not isinstance(data, dict) or data.get("type") not in RANDOM_TYPE_FIELDS:
+        _fail(path, "must be an object with 'type' as one of " + ", ".join(RANDOM_TYPE_FIELDS))
+    fields = RANDOM_TYPE_FIELDS[data["type"]]
+    _check_object(data, path, ("type", ) + fields, _ACTIVE_INTERVAL_FIELDS)
+    for field in fields:
+        if not _is_number(data[field]):
+            _fail(f"{path}.{field}", "must be a number")
+    for field in _ACTIVE_INTERVAL_FIELDS:
+        if field in data and not _is_integer(data[field]):
+            _fail(f"{path}.{field}", "must be an integer")
+    if "probability" in data and not 0 <= data["probability"] <= 1:
+        _fail(f"{path}.probability", "must be between 0 and 1")
+    if data["type"] == "OneOffEvent" and "endYear" not in data:
+        _fail(path, "missing 'endYear'")
+
+def _validate_item(data, path: str) -> None:
+    _check_object(data, path, ("name", "upfrontCost", "recurringCost"), ("desc", "currency"))
+    _check_name_desc(data, path)
+    _check_currency(data, "currency", path)
+    _validate_random_type(data["upfrontCost"], f"{path}.upfrontCost")
+    _validate_random_type(data["recurringCost"], f"{path}.recurringCost")
+
+def _validate_group(data, path: str) -> None:
+    _check_object(data, path, ("name", "items"), ("desc", ))
+    _check_name_desc(data, path)
+    _check_list(data["items"], f"{path}.items")
+    for (item_no, item_data) in enumerate(data["items"]):
+        _validate_item(item_data, f"{path}.items[{item_no}]")
+
+def _validate_fx_rates(data, path: str) -> None:
+    _check_list(data, path)
+    currencies = set()
+    for (fx_rate_no, fx_rate_data) in enumerate(data):
+        fx_rate_path = f"{path}[{fx_rate_no}]"
+        _check_object(fx_rate_data, fx_rate_path, ("currency", "rates"))
+        _check_currency(fx_rate_data, "currency", fx_rate_path)
+        if fx_rate_data["currency"] in currencies:
+            _fail(f"{fx_rate_path}.currency", "is repeated")
+        currencies.add(fx_rate_data["currency"])
+        _check_list(fx_rate_data["rates"], f"{fx_rate_path}.rates")
+        for (rate_no, rate_data) in enumerate(fx_rate_data["rates"]):
+            _validate_random_type(rate_data, f"{fx_rate_path}.rates[{rate_no}]")
+
+def _validate_stage(data, path: str) -> None:
+    if not isinstance(data, dict) or data.get("type") not in PIPELINE_STAGE_FIELDS:
+        _fail(path, "must be an object with 'type' as one of " + ", ".join(PIPELINE_STAGE_FIELDS))
+    (required, optional) = PIPELINE_STAGE_FIELDS[data["type"]]
+    _check_object(data, path, ("type", ) + required, optional)
+    if "rate" in data and not _is_number(data["rate"]):
+        _fail(f"{path}.rate", "must be a number")
+    if "method" in data and data["method"] not in DEPRECIATION_METHODS:
+        _fail(f"{path}.method", "must be one of " + ", ".join(DEPRECIATION_METHODS))
+    if "life" in data and not (_is_integer(data["life"]) and data["life"] > 0):
+        _fail(f"{path}.life", "must be a positive integer")
+    if "lossCarryForward" in data and not isinstance(data["lossCarryForward"], bool):
+        _fail(f"{path}.lossCarryForward", "must be a boolean")
+
+def validate(data) -> None:
+    """
+    Validate a scenario dictionary against the format
+
+    Checks the same constraints as the XML schema, without building any
+    model objects.
+
+    Args:
+        data: Scenario dictionary, as given by `Summary.generate_dict`
+
+    Raises:
+        ScenarioFormatError: With the path of the first invalid entry
+    """
+    _check_object(data, "summary", ("interestRate", "years", "iterations", "cashFlowSheet"), _SUMMARY_OPTIONAL_FIELDS)
+    if not _is_number(data["interestRate"]):
+        _fail("summary.interestRate", "must be a number")
+    for key in ("years", "iterations"):
+        if not _is_integer(data[key]):
+            _fail(f"summary.{key}", "must be an integer")
+    if "seed" in data and not (isinstance(data["seed"], int) and data["seed"] >= 0):
+        _fail("summary.seed", "must be a non-negative integer")
+    if "rngAlgorithm" in data and data["rngAlgorithm"] not in RNG_ALGORITHMS:
+        _fail("summary.rngAlgorithm", "must be one of " + ", ".join(RNG_ALGORITHMS))
+    _check_currency(data, "currency", "summary")
+    if "fxRates" in data:
+        _validate_fx_rates(data["fxRates"], "summary.fxRates")
+    if "pipeline" in data:
+        _check_list(data["pipeline"], "summary.pipeline")
+        for (stage_no, stage_data) in enumerate(data["pipeline"]):
+            _validate_stage(stage_data, f"summary.pipeline[{stage_no}]")
+    _check_object(data["cashFlowSheet"], "summary.cashFlowSheet", ("groups", ))
+    groups = data["cashFlowSheet"]["groups"]
+    _check_list(groups, "summary.cashFlowSheet.groups")
+    for (group_no, group_data) in enumerate(groups):
+        _validate_group(group_data, f"summary.cashFlowSheet.groups[{group_no}]")
+
+
+# ----- Module Methods for JSON ----- #
+def _open(file, mode: str):
+    """Open a file path, or pass an already open file object through"""
+    if hasattr(file, "read") or hasattr(file, "write"):
+        return contextlib.nullcontext(file)
+    return open(file, mode)
+
+def generate_JSON_file(summary: Summary, file) -> None:
+    with _open(file, "w") as json_file:
+        json.dump(summary.generate_dict(), json_file, separators=(",", ":"))
+
+def read_JSON_file(file, validate_data: bool = True) -> Summary:
+    with _open(file, "r") as json_file:
+        data = json.load(json_file)
+    if validate_data:
+        validate(data)
+    return Summary.create_from_dict(data)
+
+
+# ----- Module Methods for MessagePack ----- #
+def _import_msgpack():
+    try:
+        import msgpack
+    except ImportError as error:
+        raise ImportError("MessagePack scenarios need the optional 'msgpack' package") from error
+    return msgpack
+
+def generate_MessagePack_file(summary: Summary, file) -> None:
+    msgpack = _import_msgpack()
+    with _open(file, "wb") as msgpack_file:
+        msgpack_file.write(msgpack.packb(summary.generate_dict()))
+
+def read_MessagePack_file(file, validate_data: bool = True) -> Summary:
+    msgpack = _import_msgpack()
+    with _open(file, "rb") as msgpack_file:
+        data = msgpack.unpackb(msgpack_file.read())
+    if validate_data:
+        validate(data)
+    return Summary.create_from_dict(data)
+
+
+# ----- Module Methods for any Format ----- #
+FORMATS: Dict[str, Tuple[Callable, Callable]] = {
+    ".xml": (read_XML_file, generate_XML_file),
+    ".json": (read_JSON_file, generate_JSON_file),
+    ".msgpack": (read_MessagePack_file, generate_MessagePack_file),
+    ".mpk": (read_MessagePack_file, generate_MessagePack_file),
+}
+
+def _get_format(file: str) -> Tuple[Callable, Callable]:
+    extension = os.path.splitext(file)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unknown scenario format '{extension}', expected one of {', '.join(FORMATS)}")
+    return FORMATS[extension]
+
+def read_file(file: str) -> Summary:
+    """Read a scenario in the format given by the file extension"""
+    return _get_format(file)[0](file)
+
+def generate_file(summary: Summary, file: str) -> None:
+    """Write a scenario in the format given by the file extension"""
+    _get_format(file)[1](summary, file)
+
+def convert_file(source: str, destination: str) -> None:
+    """Convert a scenario between the formats given by the file extensions"""
+    generate_file(read_file(source), destination)
+
+
+# ----- Command Line Interface ----- #
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert scenarios between XML, JSON and MessagePack")
+    parser.add_argument("source", help="Scenario to convert")
+    parser.add_argument("destination", help="Converted scenario, format given by the extension")
+    args = parser.parse_args()
+    convert_file(args.source, args.destination)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Module for scheduling chunks of Monte Carlo iterations across jobs
+
+Every job is split into chunks of iterations. Jobs with a higher priority
+are always served first, while jobs with the same priority get an equal
+share of the chunks, so that a short run submitted behind a large batch
+run starts right away instead of waiting for the batch run to finish.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from typing import Dict, Hashable, Optional, Tuple
+import itertools
+import time
+
+
+# ----- Scheduled Job ----- #
+class ScheduledJob():
+    """
+    Class for the scheduling state of a job
+
+    Attributes:
+        key: Key identifying the job
+        priority: Priority of the job, higher is served first
+        iterations: Total number of iterations
+        scheduled: Number of iterations handed out as chunks
+        completed: Number of iterations completed
+        busy_time: Worker time spent on the job in seconds
+        start_time: Time at which the first chunk was handed out
+        end_time: Time at which the job completed or was cancelled
+        virtual_time: Fair share clock of the job
+    """
+    key: Hashable
+    priority: int
+    iterations: int
+    scheduled: int
+    completed: int
+    busy_time: float
+    start_time: Optional[float]
+    end_time: Optional[float]
+    virtual_time: float
+
+    def __init__(self, key: Hashable, iterations: int, priority: int = 0, virtual_time: float = 0) -> None:
+        """
+        Default initialization method for ScheduledJob class
+
+        Args:
+            key: Key identifying the job
+            iterations: Total number of iterations
+            priority: Priority of the job, higher is served first
+            virtual_time: Fair share clock to start the job with
+        """
+        self.key = key
+        self.priority = priority
+        self.iterations = iterations
+        self.scheduled = 0
+        self.completed = 0
+        self.busy_time = 0.0
+        self.start_time = None
+        self.end_time = None
+        self.virtual_time = virtual_time
+
+    @property
+    def remaining(self) -> int:
+        """Number of iterations yet to be handed out"""
+        return self.iterations - self.scheduled
+
+    def get_throughput(self) -> float:
+        """Completed iterations per second of wall time since the job started"""
+        if self.start_time is None:
+            return 0.0
+        end_time = time.perf_counter() if self.end_time is None else self.end_time
+        return self.completed / max(end_time - self.start_time, 1e-9)
+
+    def as_dict(self) -> dict:
+        """Scheduling state as a plain dictionary"""
+        return {"priority": self.priority,
+                "scheduled": self.scheduled,
+                "completed": self.completed,
+                "busy_time": self.busy_time,
+                "throughput": self.get_throughput()}
+
+
+# ----- Scheduler ----- #
+class Scheduler():
+    """
+    Priority and fair share scheduler handing out chunks of iterations
+
+    Attributes:
+        chunk_size: Maximum number of iterations in a chunk
+        jobs: Jobs which are not completed or cancelled yet
+    """
+    chunk_size: int
+    jobs: Dict[Hashable, ScheduledJob]
+
+    def __init__(self, chunk_size: int = 10000) -> None:
+        """
+        Default initialization method for Scheduler class
+
+        Args:
+            chunk_size: Maximum number of iterations in a chunk
+        """
+        self.chunk_size = chunk_size
+        self.jobs = {}
+        self._order = itertools.count()
+        self._sequence = {}
+
+    def add(self, key: Hashable, iterations: int, priority: int = 0) -> ScheduledJob:
+        """
+        Add a job to the scheduler
+
+        A new job starts at the fair share clock of the jobs already running
+        at its priority, so it neither waits for them nor gets a burst of
+        chunks to catch up with them.
+
+        Args:
+            key: Key identifying the job
+            iterations: Total number of iterations
+            priority: Priority of the job, higher is served first
+
+        Returns:
+            Scheduling state of the job
+        """
+        if key in self.jobs:
+            raise KeyError(f"Job {key!r} is already scheduled")
+        peers = [job.virtual_time for job in self.jobs.values() if job.priority == priority and job.remaining > 0]
+        job = ScheduledJob(key, iterations, priority, min(peers, default=0.0))
+        self.jobs[key] = job
+        self._sequence[key] = next(self._order)
+        return job
+
+    def cancel(self, key: Hashable) -> None:
+        """Stop handing out chunks of the job"""
+        job = self.jobs.pop(key, None)
+        self._sequence.pop(key, None)
+        if job is not None:
+            job.end_time = time.perf_counter()
+
+    def next_chunk(self) -> Optional[Tuple[Hashable, int]]:
+        """
+        Hand out the next chunk
+
+        Returns:
+            Key of the job and number of iterations in the chunk, None if no chunk is pending
+        """
+        pending = [job for job in self.jobs.values() if job.remaining > 0]
+        if not pending:
+            return None
+        job = min(pending, key=lambda job: (-job.priority, job.virtual_time, self._sequence[job.key]))
+        size = min(self.chunk_size, job.remaining)
+        if job.start_time is None:
+            job.start_time = time.perf_counter()
+        job.scheduled += size
+        job.virtual_time += size
+        return (job.key, size)
+
+    def complete(self, key: Hashable, size: int, busy_time: float = 0.0) -> None:
+        """
+        Record completion of a chunk
+
+        Args:
+            key: Key of the job
+            size: Number of iterations in the chunk
+            busy_time: Worker time spent on the chunk in seconds
+        """
+        job = self.jobs.get(key)
+        if job is None:
+            return
+        job.completed += size
+        job.busy_time += busy_time
+        if job.completed >= job.iterations:
+            self.cancel(key)
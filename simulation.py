@@ -0,0 +1,405 @@
+"""Module for Monte Carlo simulation of the cash flow summary
+
+`simulate` is the entry point for the GUI, the command line and other
+Python code alike, e.g.
+
+    result = simulate(summary, iterations=100000, seed=42, workers=4)
+    result.values["NPV"]            # (iterations, ) array of NPV
+    print(result.statistics)        # Means with confidence intervals
+    result.NPV_statistics           # Exact NPV mean and std. deviation where possible
+    result.attribution.summarize()  # NPV contributions of the groups
+
+The metric values are computed by the run, while the statistics and the
+per-item data are computed on first use. Chunk `n` of the iterations is
+sampled with `Summary.get_generator(n)`, so the per-item data replays the
+random numbers of the run instead of keeping them, and a seeded run gives
+the same values for any number of workers.
+
+Run as a script to simulate a scenario, e.g.
+`python simulation.py scenario.xml --iterations 1000000 --workers 4`.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Optional, Tuple
+import argparse
+import json
+import math
+
+import numpy as np
+
+from attribution import Attribution, attribute
+from cash_flow import Summary
+from kernels import get_IRR, get_NPV, get_payback_period
+from telemetry import Telemetry, add_telemetry_arguments, create_from_arguments, measure
+from validation import check, check_iterations
+
+if TYPE_CHECKING:
+    from convergence import Convergence
+
+METRICS = ("IRR", "NPV", "payback_period")
+DEFAULT_CHUNK_SIZE = 100000
+
+
+# ----- Running Statistics ----- #
+class RunningStatistics():
+    """
+    Mean and std. deviation of the metrics, updated chunk by chunk.
+
+    Non-finite values (e.g. IRR which does not exist) are counted separately
+    and kept out of the statistics.
+
+    Attributes:
+        count: Number of finite values per metric
+        mean: Running mean per metric
+        m2: Running sum of squared deviations per metric
+        failed: Number of non-finite values per metric
+    """
+    count: Dict[str, int]
+    mean: Dict[str, float]
+    m2: Dict[str, float]
+    failed: Dict[str, int]
+
+    def __init__(self, metrics: Iterable[str] = METRICS) -> None:
+        """
+        Default initialization method for RunningStatistics class
+
+        Args:
+            metrics: Names of the metrics to track
+        """
+        self.count = {metric: 0 for metric in metrics}
+        self.mean = {metric: 0.0 for metric in metrics}
+        self.m2 = {metric: 0.0 for metric in metrics}
+        self.failed = {metric: 0 for metric in metrics}
+
+    def update(self, chunk: Dict[str, np.ndarray]) -> None:
+        """
+        Merge a chunk of metric values into the statistics
+
+        Args:
+            chunk: Metric values of the chunk, as given by `run_chunk`
+        """
+        for metric in self.count:
+            values = chunk[metric]
+            finite = values[np.isfinite(values)]
+            self.failed[metric] += len(values) - len(finite)
+            if len(finite) == 0:
+                continue
+            # Chan et al. parallel update of mean and M2
+            count = self.count[metric] + len(finite)
+            chunk_mean = float(np.mean(finite))
+            delta = chunk_mean - self.mean[metric]
+            self.m2[metric] += float(np.sum((finite - chunk_mean)**2)) \
+                + delta**2 * self.count[metric] * len(finite) / count
+            self.mean[metric] += delta * len(finite) / count
+            self.count[metric] = count
+
+    def get_std(self, metric: str) -> float:
+        """Std. deviation of the metric"""
+        if self.count[metric] == 0:
+            return math.nan
+        return math.sqrt(self.m2[metric] / self.count[metric])
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        """Statistics as a plain dictionary"""
+        return {metric: {"mean": self.mean[metric] if self.count[metric] else math.nan,
+                         "std": self.get_std(metric),
+                         "count": self.count[metric],
+                         "failed": self.failed[metric]}
+                for metric in self.count}
+
+
+# ----- Simulation ----- #
+def sample_net_cash_flow(summary: Summary,
+                         iterations: int,
+                         rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Sample net cash flow of the summary for a batch of iterations
+
+    Args:
+        summary: Summary to be sampled
+        iterations: Number of iterations
+        rng: Random number generator, the one of the summary if not given
+
+    Returns:
+        (iterations, years+1) array of net cash flow
+    """
+    if rng is None:
+        rng = summary.get_generator()
+    return summary.sample_net_cash_flow(iterations, rng)
+
+def run_chunk(summary: Summary,
+              iterations: int,
+              rng: Optional[np.random.Generator] = None,
+              telemetry: Optional[Telemetry] = None,
+              metrics: Iterable[str] = METRICS) -> Dict[str, np.ndarray]:
+    """
+    Run a chunk of Monte Carlo iterations
+
+    Args:
+        summary: Summary to be simulated
+        iterations: Number of iterations in the chunk
+        rng: Random number generator, the one of the summary if not given
+        telemetry: Telemetry counting the samples, the time of every stage, the arrays and the IRR iterations
+        metrics: Metrics to calculate, any of `METRICS`
+
+    Returns:
+        Dictionary with an array of values for each of the metrics
+    """
+    with measure(telemetry, "sample"):
+        net_cash_flow = sample_net_cash_flow(summary, iterations, rng)
+    values = {}
+    for metric in metrics:
+        with measure(telemetry, metric):
+            if metric == "IRR" and telemetry is not None:
+                (values[metric], IRR_iterations) = get_IRR(net_cash_flow, return_iterations=True)
+                telemetry.add_IRR_iterations(IRR_iterations)
+            elif metric == "IRR":
+                values[metric] = get_IRR(net_cash_flow)
+            elif metric == "NPV":
+                values[metric] = get_NPV(net_cash_flow, summary.interest_rate)
+            else:
+                values[metric] = get_payback_period(net_cash_flow)
+    if telemetry is not None:
+        telemetry.add_samples(iterations)
+        telemetry.add_arrays(net_cash_flow, *values.values())
+    return values
+
+
+# ----- Simulation Result ----- #
+class SimulationResult():
+    """
+    Result of `simulate`, computing the statistics and the per-item data on first use
+
+    Attributes:
+        summary: Summary simulated, holding the seed of the run
+        iterations: Number of iterations run, fewer than asked for if stopped early
+        chunk_size: Number of iterations sampled with the random number stream of a chunk
+        values: (iterations, ) array of values of each of the metrics
+        telemetry: Telemetry of the run
+    """
+    summary: Summary
+    iterations: int
+    chunk_size: int
+    values: Dict[str, np.ndarray]
+    telemetry: Telemetry
+
+    def __init__(self,
+                 summary: Summary,
+                 iterations: int,
+                 chunk_size: int,
+                 values: Dict[str, np.ndarray],
+                 telemetry: Telemetry) -> None:
+        """
+        Default initialization method for SimulationResult class
+
+        Args:
+            summary: Summary simulated, holding the seed of the run
+            iterations: Number of iterations run
+            chunk_size: Number of iterations sampled with the random number stream of a chunk
+            values: (iterations, ) array of values of each of the metrics
+            telemetry: Telemetry of the run
+        """
+        self.summary = summary
+        self.iterations = iterations
+        self.chunk_size = chunk_size
+        self.values = values
+        self.telemetry = telemetry
+        self._statistics = None
+        self._attribution = None
+        self._NPV_statistics = None
+
+    # --- Properties --- #
+    @property
+    def metrics(self) -> Tuple[str, ...]:
+        """Metrics of the run"""
+        return tuple(self.values)
+
+    @property
+    def seed(self) -> int:
+        """Seed of the run"""
+        return self.summary.seed
+
+    @property
+    def statistics(self) -> "Convergence":
+        """Statistics and convergence diagnostics of the metrics, merged chunk by chunk as in the run"""
+        if self._statistics is None:
+            from convergence import Convergence
+
+            statistics = Convergence(self.metrics)
+            for start in range(0, self.iterations, self.chunk_size):
+                statistics.update({metric: values[start:start + self.chunk_size]
+                                   for (metric, values) in self.values.items()})
+            self._statistics = statistics
+        return self._statistics
+
+    @property
+    def attribution(self) -> Attribution:
+        """
+        NPV contributions of every item, sampled with the random numbers of the run
+
+        The contributions are before the pipeline of the summary, so they
+        add up to the NPV of the run only if it has no pipeline.
+        """
+        if self._attribution is None:
+            chunks = [attribute(self.summary, min(self.chunk_size, self.iterations - start),
+                                self.summary.get_generator(chunk_no))
+                      for (chunk_no, start) in enumerate(range(0, self.iterations, self.chunk_size))]
+            if len(chunks) == 0:
+                chunks = [attribute(self.summary, 0)]
+            self._attribution = Attribution(chunks[0].group_names, chunks[0].item_names, chunks[0].group_starts,
+                                            np.concatenate([chunk.item_NPV for chunk in chunks]))
+        return self._attribution
+
+    @property
+    def NPV_statistics(self) -> Tuple[Dict[str, float], str]:
+        """
+        Mean and std. deviation of NPV, and the method giving them, see `analytic.get_NPV_statistics`
+
+        They are exact when the summary allows it, and those of the values
+        of the run otherwise.
+        """
+        if self._NPV_statistics is None:
+            from analytic import get_NPV_statistics
+
+            if "NPV" in self.values:
+                self._NPV_statistics = get_NPV_statistics(self.summary, NPV=self.values["NPV"])
+            else:
+                self._NPV_statistics = get_NPV_statistics(self.summary, iterations=self.iterations)
+        return self._NPV_statistics
+
+    @property
+    def timings(self) -> Dict[str, float]:
+        """Wall time of the run and the time spent in every stage, in seconds"""
+        return {"elapsed": self.telemetry.get_elapsed_seconds(), **self.telemetry.stage_seconds}
+
+    # --- Methods --- #
+    def get_quantiles(self, metric: str, quantiles: Iterable[float] = (0.05, 0.5, 0.95)) -> np.ndarray:
+        """Quantiles of the finite values of the metric"""
+        values = self.values[metric]
+        return np.quantile(values[np.isfinite(values)], list(quantiles))
+
+    def as_dict(self) -> dict:
+        """Statistics, timings and telemetry of the run as a plain dictionary, leaving out the values"""
+        return {"iterations": self.iterations,
+                "seed": self.seed,
+                "rngAlgorithm": self.summary.rng_algorithm,
+                "statistics": self.statistics.as_dict(),
+                "NPVStatistics": {**self.NPV_statistics[0], "method": self.NPV_statistics[1]},
+                "timings": self.timings,
+                "telemetry": self.telemetry.snapshot()}
+
+    # --- String Representation --- #
+    def __repr__(self) -> str:
+        """String representation of the instance"""
+        return "".join([f"{self.__class__.__name__}(iterations={self.iterations}, ",
+                        f"seed={self.seed}, ",
+                        f"metrics={self.metrics})"])
+
+    def __str__(self) -> str:
+        """Readable string representation of the instance"""
+        (NPV_statistics, method) = self.NPV_statistics
+        return "\n".join([str(self.statistics),
+                          f"NPV mean {NPV_statistics['mean']:.6g}, std {NPV_statistics['std']:.6g} ({method})",
+                          f"Seed {self.seed}, {self.timings['elapsed']:.3f} s"])
+
+
+# ----- Module Methods ----- #
+def _run_serial(summary: Summary,
+                iterations: int,
+                chunk_size: int,
+                telemetry: Telemetry,
+                metrics: Tuple[str, ...],
+                callback: Optional[Callable[[int, Dict[str, np.ndarray]], Optional[bool]]]) -> Dict[str, np.ndarray]:
+    """Run the chunks one after another in this process, see `simulate`"""
+    values = {metric: np.empty(iterations) for metric in metrics}
+    completed = 0
+    for (chunk_no, start) in enumerate(range(0, iterations, chunk_size)):
+        size = min(chunk_size, iterations - start)
+        chunk = run_chunk(summary, size, summary.get_generator(chunk_no), telemetry, metrics)
+        for metric in metrics:
+            values[metric][start:start + size] = chunk[metric]
+        completed += size
+        telemetry.report()
+        if callback is not None and callback(completed, chunk) is False:
+            break
+    telemetry.report(final=True)
+    return {metric: metric_values[:completed] for (metric, metric_values) in values.items()}
+
+def simulate(summary: Summary,
+             iterations: Optional[int] = None,
+             seed: Optional[int] = None,
+             workers: Optional[int] = 1,
+             metrics: Iterable[str] = METRICS,
+             chunk_size: int = DEFAULT_CHUNK_SIZE,
+             telemetry: Optional[Telemetry] = None,
+             callback: Optional[Callable[[int, Dict[str, np.ndarray]], Optional[bool]]] = None) -> SimulationResult:
+    """
+    Run the Monte Carlo iterations of a summary
+
+    Args:
+        summary: Summary to be simulated
+        iterations: Number of iterations, iterations of the summary if None
+        seed: Seed of the run, run on a copy of the summary if given, the seed of the summary
+            (drawn and kept if it has none) otherwise
+        workers: Number of worker processes, see `parallel.ParallelRunner`, number of CPUs if None,
+            in this process if 1
+        metrics: Metrics to calculate, any of `METRICS`
+        chunk_size: Number of iterations sampled with the random number stream of a chunk
+        telemetry: Telemetry of the run, a fresh one not writing reports if not given
+        callback: Called with the number of iterations completed and the values of every chunk, in order
+            of the chunks; the run stops early if it returns False
+
+    Returns:
+        Result of the run
+
+    Raises:
+        ValueError: If a metric is unknown, or the number of iterations is not positive
+        validation.ValidationError: If the summary has errors, before any iteration is run
+    """
+    metrics = tuple(metrics)
+    unknown = set(metrics).difference(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown metrics {sorted(unknown)}, expected any of {', '.join(METRICS)}")
+    if seed is not None:
+        summary = summary.freeze().thaw()
+        summary.seed = seed
+    check(summary)
+    summary.get_seed()
+    iterations = check_iterations(summary.iterations if iterations is None else iterations)
+    telemetry = Telemetry() if telemetry is None else telemetry
+    if workers == 1:
+        values = _run_serial(summary, iterations, chunk_size, telemetry, metrics, callback)
+    else:
+        from parallel import ParallelRunner
+
+        with ParallelRunner(workers, chunk_size) as runner:
+            values = {metric: metric_values.copy() for (metric, metric_values)
+                      in runner.run(summary, iterations, telemetry, metrics, callback).items()}
+    completed = len(values[metrics[0]]) if metrics else iterations
+    return SimulationResult(summary, completed, chunk_size, values, telemetry)
+
+
+# ----- Command Line Interface ----- #
+def main() -> None:
+    from scenario_format import read_file
+
+    parser = argparse.ArgumentParser(description="Monte Carlo simulation of a scenario")
+    parser.add_argument("scenario", help="Scenario in any of the scenario formats")
+    parser.add_argument("--iterations", type=int, default=None, help="Number of iterations")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the run")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--metrics", nargs="+", choices=METRICS, default=METRICS, help="Metrics to calculate")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Iterations per chunk")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    add_telemetry_arguments(parser)
+    args = parser.parse_args()
+    telemetry = create_from_arguments(args, {"scenario": args.scenario})
+    result = simulate(read_file(args.scenario), args.iterations, args.seed, args.workers, args.metrics,
+                      args.chunk_size, telemetry)
+    print(json.dumps(result.as_dict(), indent=2) if args.json else result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Module for sweeping interest rate and horizon over one set of samples
+
+The cash flow is sampled once for the longest horizon. NPV for all the
+interest rates is then a single matrix product of the sampled cash flow
+with the discount factors of every rate, and shorter horizons use a
+prefix of the years, so the grid costs no additional sampling.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from cash_flow import Summary
+
+
+# ----- Sweep Result ----- #
+class SweepResult():
+    """
+    NPV samples over a grid of horizons and interest rates
+
+    Attributes:
+        horizons: (n_horizons, ) array of horizons in years
+        interest_rates: (n_rates, ) array of annual rates of interest
+        NPV: (n_horizons, iterations, n_rates) array of net present values
+    """
+    dims = ("horizon", "iteration", "interest_rate")
+    horizons: np.ndarray
+    interest_rates: np.ndarray
+    NPV: np.ndarray
+
+    def __init__(self, horizons: np.ndarray, interest_rates: np.ndarray, NPV: np.ndarray) -> None:
+        """
+        Default initialization method for SweepResult class
+
+        Args:
+            horizons: (n_horizons, ) array of horizons in years
+            interest_rates: (n_rates, ) array of annual rates of interest
+            NPV: (n_horizons, iterations, n_rates) array of net present values
+        """
+        self.horizons = horizons
+        self.interest_rates = interest_rates
+        self.NPV = NPV
+
+    # --- Methods --- #
+    def select(self, horizon: int, interest_rate: float) -> np.ndarray:
+        """
+        NPV samples for a point of the grid
+
+        Args:
+            horizon: Horizon in years, must be one of the swept horizons
+            interest_rate: Annual rate of interest, must be one of the swept rates
+
+        Returns:
+            (iterations, ) array of net present values
+        """
+        horizon_no = int(np.flatnonzero(self.horizons == horizon)[0])
+        rate_no = int(np.flatnonzero(np.isclose(self.interest_rates, interest_rate))[0])
+        return self.NPV[horizon_no, :, rate_no]
+
+    def get_mean(self) -> np.ndarray:
+        """(n_horizons, n_rates) array of mean NPV"""
+        return np.mean(self.NPV, axis=1)
+
+    def get_std(self) -> np.ndarray:
+        """(n_horizons, n_rates) array of std. deviation of NPV"""
+        return np.std(self.NPV, axis=1)
+
+    def get_quantile(self, quantile: float) -> np.ndarray:
+        """(n_horizons, n_rates) array of the quantile of NPV"""
+        return np.quantile(self.NPV, quantile, axis=1)
+
+    def get_probability_positive(self) -> np.ndarray:
+        """(n_horizons, n_rates) array of probability of a positive NPV"""
+        return np.mean(self.NPV > 0, axis=1)
+
+    def as_records(self) -> List[Dict[str, float]]:
+        """Statistics of every point of the grid as a list of plain dictionaries"""
+        mean = self.get_mean()
+        std = self.get_std()
+        probability_positive = self.get_probability_positive()
+        return [{"horizon": int(horizon),
+                 "interest_rate": float(interest_rate),
+                 "mean": float(mean[horizon_no, rate_no]),
+                 "std": float(std[horizon_no, rate_no]),
+                 "probability_positive": float(probability_positive[horizon_no, rate_no])}
+                for (horizon_no, horizon) in enumerate(self.horizons)
+                for (rate_no, interest_rate) in enumerate(self.interest_rates)]
+
+    # --- String Representation --- #
+    def __repr__(self) -> str:
+        """String representation of the instance"""
+        return "".join([f"{self.__class__.__name__}(horizons={self.horizons.tolist()}, ",
+                        f"interest_rates={self.interest_rates.tolist()}, ",
+                        f"iterations={self.NPV.shape[1]})"])
+
+
+# ----- Sweep ----- #
+def get_discount_factors(interest_rates: np.ndarray, years: int) -> np.ndarray:
+    """
+    Discount factors of every year for every interest rate
+
+    Args:
+        interest_rates: (n_rates, ) array of annual rates of interest
+        years: Number of years after the upfront year
+
+    Returns:
+        (years+1, n_rates) array of discount factors
+    """
+    return (1 + interest_rates[None, :]) ** -np.arange(years + 1, dtype=float)[:, None]
+
+def sweep(summary: Summary,
+          interest_rates: Sequence[float],
+          horizons: Optional[Sequence[int]] = None,
+          iterations: Optional[int] = None,
+          rng: Optional[np.random.Generator] = None) -> SweepResult:
+    """
+    Evaluate NPV over a grid of interest rates and horizons
+
+    Args:
+        summary: Summary to be evaluated, its interest rate and years are ignored
+        interest_rates: Annual rates of interest
+        horizons: Horizons in years, only the years of the summary if None
+        iterations: Number of iterations, iterations of the summary if None
+        rng: Random number generator, the one of the summary if not given
+
+    Returns:
+        NPV samples over the grid
+    """
+    interest_rates = np.asarray(interest_rates, dtype=float)
+    horizons = np.asarray([summary.years] if horizons is None else horizons, dtype=int)
+    iterations = summary.iterations if iterations is None else iterations
+    if rng is None:
+        rng = summary.get_generator()
+    if np.any(horizons < 0):
+        raise ValueError("horizons must not be negative")
+
+    years = int(np.max(horizons))
+    net_cash_flow = summary.sample_net_cash_flow(iterations, rng, years)
+    discount = get_discount_factors(interest_rates, years)
+    NPV = np.empty((len(horizons), iterations, len(interest_rates)))
+    for (horizon_no, horizon) in enumerate(horizons):
+        NPV[horizon_no] = net_cash_flow[:, :horizon + 1] @ discount[:horizon + 1]
+    return SweepResult(horizons, interest_rates, NPV)
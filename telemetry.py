@@ -0,0 +1,324 @@
+"""Module for performance telemetry of simulation runs
+
+A `Telemetry` collects the counters of a run:
+
+* samples run, and samples per second of wall time
+* time spent in every stage, e.g. sampling the cash flow or solving IRR
+* peak resident set size (RSS) of the processes of the run
+* bytes of the sampled cash flow and metric arrays allocated
+* Newton iterations of the IRR solver, in total and the most of any cash flow
+
+Runners pass a telemetry down to `simulation.run_chunk` and call `report`
+after every chunk, which writes a report at most once per interval and
+always at the end of the run. Reports are JSON lines, appended to the
+file, or an OpenMetrics text exposition, rewriting the file. Workers in
+other processes collect their own counters, which the runner merges.
+
+Peak RSS is the high-water mark of each process over its lifetime, as
+reported by the OS, so a long-lived worker reports the peak of all the
+runs it took part in.
+
+Run as a script to run a scenario on worker processes and report its
+telemetry, e.g.
+`python telemetry.py scenario.xml --workers 4 --telemetry run.prom --telemetry-format openmetrics`.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from typing import Dict, Iterable, Iterator, Optional
+import argparse
+import contextlib
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+FORMATS = ("jsonl", "openmetrics")
+DEFAULT_INTERVAL = 10.0
+
+# OpenMetrics families: name, type, help text and the key of the snapshot
+_METRIC_FAMILIES = (("roi_samples", "counter", "Monte Carlo iterations run", "samples"),
+                    ("roi_samples_per_second", "gauge", "Iterations run per second of wall time",
+                     "samples_per_second"),
+                    ("roi_elapsed_seconds", "gauge", "Wall time of the run", "elapsed_seconds"),
+                    ("roi_stage_seconds", "counter", "Time spent per stage, summed over the workers",
+                     "stage_seconds"),
+                    ("roi_peak_rss_bytes", "gauge", "Peak resident set size of the processes of the run",
+                     "peak_RSS_bytes"),
+                    ("roi_array_bytes", "counter", "Bytes of the sampled cash flow and metric arrays allocated",
+                     "array_bytes"),
+                    ("roi_irr_iterations", "counter", "Newton iterations of the IRR solver", "IRR_iterations"),
+                    ("roi_irr_max_iterations", "gauge", "Most Newton iterations of the IRR solver on a cash flow",
+                     "IRR_max_iterations"))
+
+
+# ----- Internal Functions ----- #
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+               for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for (name, value) in zip(labels, escaped)) + "}"
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and not math.isfinite(value):
+        return "NaN" if math.isnan(value) else ("+Inf" if value > 0 else "-Inf")
+    return repr(value)
+
+
+# ----- Telemetry ----- #
+class Telemetry():
+    """
+    Performance counters of a simulation run
+
+    Attributes:
+        samples: Number of iterations run
+        stage_seconds: Time spent per stage, summed over the workers
+        array_bytes: Bytes of the sampled cash flow and metric arrays allocated
+        IRR_iterations: Total Newton iterations of the IRR solver
+        IRR_max_iterations: Most Newton iterations of the IRR solver on a single cash flow
+        peak_RSS_bytes: Peak RSS of the merged worker processes in bytes, None if not known
+        labels: Labels of the run in OpenMetrics reports, e.g. {"scenario": "test.xml"}
+        file: File name or text file object the reports are written to, None to not write reports
+        format: Format of the reports, one of `FORMATS`
+        interval: Minimum number of seconds between periodic reports
+    """
+    samples: int
+    stage_seconds: Dict[str, float]
+    array_bytes: int
+    IRR_iterations: int
+    IRR_max_iterations: int
+    peak_RSS_bytes: Optional[int]
+    labels: Dict[str, str]
+    file: object
+    format: str
+    interval: float
+
+    def __init__(self,
+                 file=None,
+                 format: str = "jsonl",
+                 interval: float = DEFAULT_INTERVAL,
+                 labels: Optional[Dict[str, str]] = None) -> None:
+        """
+        Default initialization method for Telemetry class, starting the clock of the run
+
+        Args:
+            file: File name or text file object the reports are written to, None to not write reports
+            format: Format of the reports, one of `FORMATS`
+            interval: Minimum number of seconds between periodic reports
+            labels: Labels of the run in OpenMetrics reports
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Unknown telemetry format '{format}', expected one of {', '.join(FORMATS)}")
+        self.samples = 0
+        self.stage_seconds = {}
+        self.array_bytes = 0
+        self.IRR_iterations = 0
+        self.IRR_max_iterations = 0
+        self.peak_RSS_bytes = None
+        self.labels = {} if labels is None else dict(labels)
+        self.file = file
+        self.format = format
+        self.interval = interval
+        self._start_time = time.perf_counter()
+        self._end_time = None
+        self._last_report = self._start_time
+
+    # --- Counters --- #
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Context manager adding the time spent in it to the stage"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + time.perf_counter() - start_time
+
+    def add_samples(self, samples: int) -> None:
+        """Count iterations run"""
+        self.samples += samples
+
+    def add_arrays(self, *arrays: np.ndarray) -> None:
+        """Count the bytes of allocated arrays"""
+        self.array_bytes += sum(array.nbytes for array in arrays)
+
+    def add_IRR_iterations(self, iterations: np.ndarray) -> None:
+        """Count the Newton iterations of the IRR solver, given per cash flow"""
+        if len(iterations) > 0:
+            self.IRR_iterations += int(np.sum(iterations))
+            self.IRR_max_iterations = max(self.IRR_max_iterations, int(np.max(iterations)))
+
+    def merge(self, snapshot: dict) -> None:
+        """
+        Add the counters of a worker to the run
+
+        Args:
+            snapshot: Snapshot of the telemetry of the worker, see `snapshot`
+        """
+        self.samples += snapshot["samples"]
+        for (name, seconds) in snapshot["stage_seconds"].items():
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+        self.array_bytes += snapshot["array_bytes"]
+        self.IRR_iterations += snapshot["IRR_iterations"]
+        self.IRR_max_iterations = max(self.IRR_max_iterations, snapshot["IRR_max_iterations"])
+        if snapshot["peak_RSS_bytes"] is not None:
+            self.peak_RSS_bytes = max(self.peak_RSS_bytes or 0, snapshot["peak_RSS_bytes"])
+
+    # --- Methods --- #
+    def start(self) -> None:
+        """Restart the clock of the run, e.g. when a queued run starts running"""
+        self._start_time = time.perf_counter()
+        self._end_time = None
+        self._last_report = self._start_time
+
+    def stop(self) -> None:
+        """Stop the clock of the run once it has ended"""
+        if self._end_time is None:
+            self._end_time = time.perf_counter()
+
+    def get_elapsed_seconds(self) -> float:
+        """Wall time of the run, till now if it has not been stopped"""
+        return (time.perf_counter() if self._end_time is None else self._end_time) - self._start_time
+
+    def snapshot(self) -> dict:
+        """Counters of the run so far as a plain dictionary"""
+        elapsed_seconds = self.get_elapsed_seconds()
+        own_peak = get_peak_RSS()
+        peak_RSS_bytes = self.peak_RSS_bytes if own_peak is None else max(self.peak_RSS_bytes or 0, own_peak)
+        return {"timestamp": time.time(),
+                "elapsed_seconds": elapsed_seconds,
+                "samples": self.samples,
+                "samples_per_second": self.samples / elapsed_seconds if elapsed_seconds > 0 else math.nan,
+                "stage_seconds": dict(self.stage_seconds),
+                "peak_RSS_bytes": peak_RSS_bytes,
+                "array_bytes": self.array_bytes,
+                "IRR_iterations": self.IRR_iterations,
+                "IRR_max_iterations": self.IRR_max_iterations}
+
+    def report(self, final: bool = False) -> None:
+        """
+        Write a report if the interval since the last one has passed
+
+        Args:
+            final: Whether the run has ended, which stops the clock and always writes a report
+        """
+        if final:
+            self.stop()
+        now = time.perf_counter()
+        if self.file is None or (not final and now - self._last_report < self.interval):
+            return
+        self._last_report = now
+        if self.format == "jsonl":
+            snapshot = self.snapshot()
+            snapshot.update(labels=self.labels, final=final)
+            text = json.dumps(snapshot) + "\n"
+            if hasattr(self.file, "write"):
+                self.file.write(text)
+                self.file.flush()
+            else:
+                with open(self.file, "a") as file:
+                    file.write(text)
+        else:
+            text = format_OpenMetrics([self])
+            if hasattr(self.file, "write"):
+                self.file.write(text)
+                self.file.flush()
+            else:
+                # Replace the file in one go, so a scraper never reads half a report
+                path = os.fspath(self.file)
+                with open(path + ".tmp", "w") as file:
+                    file.write(text)
+                os.replace(path + ".tmp", path)
+
+    # --- String Representation --- #
+    def __str__(self) -> str:
+        """Readable string representation of the instance"""
+        snapshot = self.snapshot()
+        lines = [f"Samples        {snapshot['samples']} in {snapshot['elapsed_seconds']:.3f} s "
+                 f"({snapshot['samples_per_second']:.1f} per s)"]
+        lines += [f"  {name:14} {seconds:.3f} s" for (name, seconds) in snapshot["stage_seconds"].items()]
+        peak = "n/a" if snapshot["peak_RSS_bytes"] is None else f"{snapshot['peak_RSS_bytes'] / 2**20:.1f} MiB"
+        lines += [f"Peak RSS       {peak}",
+                  f"Array bytes    {snapshot['array_bytes'] / 2**20:.1f} MiB",
+                  f"IRR iterations {snapshot['IRR_iterations']} (max {snapshot['IRR_max_iterations']})"]
+        return "\n".join(lines)
+
+
+# ----- Module Methods ----- #
+def get_peak_RSS() -> Optional[int]:
+    """Peak resident set size of this process in bytes, None where the OS does not report it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes everywhere else
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def measure(telemetry: Optional[Telemetry], name: str):
+    """Context manager timing a stage of the telemetry, doing nothing if there is no telemetry"""
+    return contextlib.nullcontext() if telemetry is None else telemetry.stage(name)
+
+def format_OpenMetrics(telemetries: Iterable[Telemetry]) -> str:
+    """
+    OpenMetrics text exposition of runs, told apart by their labels
+
+    Args:
+        telemetries: Telemetry of the runs
+
+    Returns:
+        Exposition with a family per counter, ending in "# EOF"
+    """
+    snapshots = [(telemetry.labels, telemetry.snapshot()) for telemetry in telemetries]
+    lines = []
+    for (name, metric_type, help_text, key) in _METRIC_FAMILIES:
+        lines += [f"# TYPE {name} {metric_type}", f"# HELP {name} {help_text}"]
+        sample_name = f"{name}_total" if metric_type == "counter" else name
+        for (labels, snapshot) in snapshots:
+            if key == "stage_seconds":
+                lines += [f"{sample_name}{_format_labels(dict(labels, stage=stage))} {_format_value(seconds)}"
+                          for (stage, seconds) in snapshot[key].items()]
+            elif snapshot[key] is not None:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(snapshot[key])}")
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+def add_telemetry_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the telemetry options to the parser of a command line interface"""
+    parser.add_argument("--telemetry", default=None, help="File to write telemetry reports to")
+    parser.add_argument("--telemetry-format", choices=FORMATS, default="jsonl", help="Format of telemetry reports")
+    parser.add_argument("--telemetry-interval", type=float, default=DEFAULT_INTERVAL,
+                        help="Seconds between periodic telemetry reports")
+
+def create_from_arguments(args: argparse.Namespace, labels: Optional[Dict[str, str]] = None) -> Optional[Telemetry]:
+    """Telemetry given by the options of `add_telemetry_arguments`, None if no file is given"""
+    if args.telemetry is None:
+        return None
+    return Telemetry(args.telemetry, args.telemetry_format, args.telemetry_interval, labels)
+
+
+# ----- Command Line Interface ----- #
+def main() -> None:
+    from parallel import DEFAULT_CHUNK_SIZE, run_parallel
+    from scenario_format import read_file
+
+    parser = argparse.ArgumentParser(description="Run a scenario on worker processes and report its telemetry")
+    parser.add_argument("scenario", help="Scenario in any of the scenario formats")
+    parser.add_argument("--iterations", type=int, default=None, help="Number of iterations")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Iterations per slice")
+    add_telemetry_arguments(parser)
+    args = parser.parse_args()
+    telemetry = create_from_arguments(args, {"scenario": args.scenario})
+    if telemetry is None:
+        telemetry = Telemetry(labels={"scenario": args.scenario})
+    run_parallel(read_file(args.scenario), args.iterations, args.workers, args.chunk_size, telemetry)
+    print(telemetry)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""Configuration of the tests, e.g. `python -m pytest tests`"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def _repository_directory(monkeypatch):
+    """Run every test in the repository directory, which the scenario schema is read from"""
+    monkeypatch.chdir(ROOT)
@@ -0,0 +1,76 @@
+"""Tests of the analytic NPV statistics against seeded Monte Carlo runs"""
+
+import math
+
+import numpy as np
+import pytest
+
+import pipeline
+import random_type
+from analytic import AnalyticNPV, get_NPV_statistics
+from cash_flow import CashFlowGroup, CashFlowItem, CashFlowSheet, FXRate, Summary, read_XML_file
+from simulation import simulate
+
+ITERATIONS = 200000
+TOLERANCE = 4.0    # Standard errors of the Monte Carlo statistics
+
+
+def _create_fx_pareto_inflation_summary() -> Summary:
+    """Summary with an item in a foreign currency, a Pareto recurring cost and inflation"""
+    group = CashFlowGroup("Plant")
+    group.add_items([CashFlowItem("Machine", upfront_cost=random_type.Gaussian(-1000, 100),
+                                  recurring_cost=random_type.Gaussian(150, 30, 1, 8)),
+                     CashFlowItem("Licence", upfront_cost=random_type.Constant(-5),
+                                  recurring_cost=random_type.Gaussian(4, 1, 1), currency="USD"),
+                     CashFlowItem("Repairs", recurring_cost=random_type.Pareto(5, 2))])
+    sheet = CashFlowSheet()
+    sheet.add_groups([group])
+    return Summary(sheet, interest_rate=0.08, years=10, fx_rates=[FXRate("USD", random_type.Gaussian(80, 4))],
+                   pipeline=(pipeline.Inflation(0.03), ))
+
+
+@pytest.fixture(params=["test.xml", "fx_pareto_inflation"])
+def summary(request) -> Summary:
+    if request.param == "test.xml":
+        return read_XML_file("test.xml")
+    return _create_fx_pareto_inflation_summary()
+
+
+def test_moments_match_monte_carlo(summary):
+    analytic = AnalyticNPV.create_from_summary(summary)
+    NPV = simulate(summary, ITERATIONS, seed=0, metrics=("NPV", )).values["NPV"]
+    (mean, std) = (float(np.mean(NPV)), float(np.std(NPV)))
+    assert abs(mean - analytic.mean) <= TOLERANCE * std / math.sqrt(ITERATIONS)
+    # Standard error of the std. deviation, by the delta method on the variance
+    std_error = float(np.std((NPV - mean)**2)) / (2 * std * math.sqrt(ITERATIONS))
+    assert abs(std - math.sqrt(analytic.variance)) <= TOLERANCE * std_error
+
+
+def test_statistics_are_analytic(summary):
+    (statistics, method) = get_NPV_statistics(summary, ("mean", "std"))
+    analytic = AnalyticNPV.create_from_summary(summary)
+    assert method == "analytic"
+    assert statistics == {"mean": analytic.mean, "std": math.sqrt(analytic.variance)}
+
+
+def test_gaussian_quantiles_match_monte_carlo():
+    summary = read_XML_file("test.xml")
+    for group in summary.cash_flow_sheet.groups:
+        for item in group.items:
+            item.upfront_cost = random_type.Gaussian(-500, 50)
+            item.recurring_cost = random_type.Gaussian(100, 20, 1)
+    analytic = AnalyticNPV.create_from_summary(summary)
+    assert analytic.gaussian
+    NPV = simulate(summary, ITERATIONS, seed=0, metrics=("NPV", )).values["NPV"]
+    density = math.exp(-1.645**2 / 2) / math.sqrt(2 * math.pi * analytic.variance)
+    for quantile in (0.05, 0.95):
+        standard_error = math.sqrt(quantile * (1 - quantile) / ITERATIONS) / density
+        assert abs(np.quantile(NPV, quantile) - analytic.get(f"p{quantile * 100:g}")) <= TOLERANCE * standard_error
+
+
+def test_tax_falls_back_to_monte_carlo():
+    summary = _create_fx_pareto_inflation_summary()
+    summary.pipeline = (pipeline.Tax(0.3), )
+    assert not AnalyticNPV.create_from_summary(summary).has("mean")
+    (_, method) = get_NPV_statistics(summary, ("mean", ), iterations=1000)
+    assert method == "monte_carlo"
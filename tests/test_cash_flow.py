@@ -0,0 +1,36 @@
+"""Tests of sampling the cash flow sheet of a summary"""
+
+import numpy as np
+
+import pipeline
+import random_type
+from cash_flow import CashFlowGroup, CashFlowItem, CashFlowSheet, Summary
+from kernels import get_IRR, get_NPV, get_payback_period
+
+
+def _create_summary(recurring_cost: random_type.RandomType) -> Summary:
+    group = CashFlowGroup("Group")
+    group.add_items([CashFlowItem("Item", upfront_cost=random_type.Constant(-10), recurring_cost=recurring_cost)])
+    sheet = CashFlowSheet()
+    sheet.add_groups([group])
+    return Summary(sheet, years=10, seed=3)
+
+
+def test_one_off_event_happens_once_in_the_sheet():
+    summary = _create_summary(random_type.OneOffEvent(probability=1, value=1, start_year=1, end_year=5))
+    events = []
+    for _ in range(2000):
+        summary.sample_cash_flow()
+        events.append(sum(summary.net_cash_flow[1:]))
+    assert set(events) == {1.0}
+
+
+def test_metrics_are_of_the_cash_flow_after_the_pipeline():
+    summary = _create_summary(random_type.Gaussian(3, 1, 1))
+    summary.pipeline = (pipeline.Inflation(0.04), pipeline.Tax(0.25))
+    summary.sample_cash_flow()
+    processed_cash_flow = pipeline.apply(summary.pipeline, np.array([summary.net_cash_flow]))
+    np.testing.assert_array_equal(summary.get_processed_cash_flow(), processed_cash_flow[0])
+    assert summary.get_NPV() == get_NPV(processed_cash_flow, summary.interest_rate)[0]
+    assert summary.get_IRR() == get_IRR(processed_cash_flow)[0]
+    assert summary.get_payback_period() == get_payback_period(processed_cash_flow)[0]
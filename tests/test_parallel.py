@@ -0,0 +1,26 @@
+"""Tests of the reproducibility of seeded runs across the number of workers"""
+
+import numpy as np
+
+from cash_flow import read_XML_file
+from parallel import run_parallel
+from simulation import simulate
+
+
+def test_serial_and_parallel_runs_are_identical():
+    summary = read_XML_file("test.xml")
+    serial = simulate(summary, 10000, seed=7, chunk_size=3000)
+    parallel = simulate(summary, 10000, seed=7, workers=2, chunk_size=3000)
+    assert serial.metrics == parallel.metrics
+    for metric in serial.metrics:
+        np.testing.assert_array_equal(serial.values[metric], parallel.values[metric])
+    assert serial.statistics.as_dict() == parallel.statistics.as_dict()
+
+
+def test_run_parallel_keeps_the_seed_of_the_summary():
+    summary = read_XML_file("test.xml")
+    summary.seed = 11
+    values = run_parallel(summary, 5000, workers=2, chunk_size=2000)
+    expected = simulate(summary, 5000, chunk_size=2000).values
+    for (metric, metric_values) in expected.items():
+        np.testing.assert_array_equal(values[metric], metric_values)
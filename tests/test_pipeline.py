@@ -0,0 +1,57 @@
+"""Tests of the pipeline stages against year by year references"""
+
+import numpy as np
+import pytest
+
+import pipeline
+
+
+def _get_taxed_income_by_loop(taxable_income: np.ndarray) -> np.ndarray:
+    """Income taxed in each year, carrying the losses forward one year at a time"""
+    taxed_income = np.zeros_like(taxable_income)
+    for (row, incomes) in enumerate(taxable_income):
+        losses = 0.0
+        for (year, income) in enumerate(incomes):
+            if income < 0:
+                losses -= income
+            else:
+                set_off = min(losses, income)
+                losses -= set_off
+                taxed_income[row, year] = income - set_off
+    return taxed_income
+
+
+def test_loss_carry_forward_matches_loop():
+    rng = np.random.default_rng(0)
+    taxable_income = rng.normal(0, 100, (1000, 11))
+    taxable_income[:10] = 0.0
+    taxable_income[10:20] = -np.abs(taxable_income[10:20])
+    taxed_income = pipeline.Tax(0.3).get_taxed_income(taxable_income)
+    np.testing.assert_allclose(taxed_income, _get_taxed_income_by_loop(taxable_income), atol=1e-9)
+
+
+def test_without_loss_carry_forward_losses_are_lost():
+    taxable_income = np.array([[-100.0, 60.0, -10.0, 80.0]])
+    taxed_income = pipeline.Tax(0.3, loss_carry_forward=False).get_taxed_income(taxable_income)
+    np.testing.assert_array_equal(taxed_income, [[0.0, 60.0, 0.0, 80.0]])
+
+
+@pytest.mark.parametrize("stage", [pipeline.Depreciation("straightLine", 4),
+                                   pipeline.Depreciation("decliningBalance", 4, 0.3)])
+def test_depreciation_deducts_upfront_cost_in_full(stage):
+    np.testing.assert_allclose(stage.get_schedule(10).sum(), 1.0)
+    assert stage.get_schedule(10)[0] == 0.0
+
+
+def test_tax_after_depreciation():
+    net_cash_flow = np.array([[-1000.0, 400.0, 400.0, 400.0]])
+    stages = (pipeline.Depreciation("straightLine", 2), pipeline.Tax(0.5))
+    # Taxable income of 0, -100, -100 and 400 after deducting 500 in years 1 and 2, so 200 is taxed in year 3
+    np.testing.assert_allclose(pipeline.apply(stages, net_cash_flow), [[-1000.0, 400.0, 400.0, 300.0]])
+
+
+def test_linear_stages_give_factors():
+    inflation = pipeline.Inflation(0.05)
+    net_cash_flow = np.ones((1, 4))
+    np.testing.assert_allclose(pipeline.apply((inflation, ), net_cash_flow)[0], pipeline.get_factors((inflation, ), 3))
+    assert pipeline.get_factors((inflation, pipeline.Tax(0.3)), 3) is None
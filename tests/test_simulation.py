@@ -0,0 +1,27 @@
+"""Tests of the public simulation API"""
+
+import pytest
+
+from cash_flow import read_XML_file
+from export import export_file
+from parallel import ParallelRunner
+from simulation import simulate
+
+
+@pytest.mark.parametrize("iterations", [0, -5])
+def test_runs_reject_iterations_below_one(iterations, tmp_path):
+    summary = read_XML_file("test.xml")
+    with pytest.raises(ValueError, match="must be positive"):
+        simulate(summary, iterations)
+    with ParallelRunner(2) as runner, pytest.raises(ValueError, match="must be positive"):
+        runner.run(summary, iterations)
+    with pytest.raises(ValueError, match="must be positive"):
+        export_file(summary, str(tmp_path / "cash_flow.csv"), iterations=iterations)
+
+
+def test_seeded_run_is_reproducible():
+    summary = read_XML_file("test.xml")
+    first = simulate(summary, 2000, seed=5)
+    second = simulate(summary, 2000, seed=5)
+    assert first.seed == second.seed == 5
+    assert first.statistics.as_dict() == second.statistics.as_dict()
@@ -0,0 +1,295 @@
+"""Module for validating scenarios before they are simulated
+
+`validate` walks a summary and lists every problem found, with the path of
+the entry it is in, e.g. "Group/Item/recurringCost.sigma". Nothing is
+sampled, so a scenario is checked in milliseconds:
+
+* errors: settings out of range, active intervals ending before they
+  start, negative std. deviations, probabilities out of [0, 1], Pareto
+  shapes giving an infinite mean, duplicate or empty names, empty sheets
+  and groups, currencies without an FX rate and invalid pipeline stages
+* warnings: Random Types never active within the years of the summary,
+  Pareto shapes giving an infinite variance and unused FX rates
+
+`check` raises a `ValidationError` listing the errors, and is run by the
+runners before any iteration, along with `check_iterations` for the number
+of iterations asked of them. `validate_files` loads and validates many
+scenario files on a process pool.
+
+Run as a script to validate scenarios, e.g.
+`python validation.py scenarios/*.xml --workers 4`.
+"""
+
+__version__ = "0.1"
+__author__ = "Vaibhav Gupta"
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, Iterable, List, NamedTuple, Optional
+import argparse
+import math
+import os
+import re
+import sys
+
+import pipeline
+import random_type
+from cash_flow import Summary
+
+SEVERITIES = ("error", "warning")
+
+_CURRENCY_CODE = re.compile("[A-Z]{3}")
+
+
+# ----- Problems ----- #
+class Problem(NamedTuple):
+    """
+    A problem found in a scenario
+
+    Attributes:
+        severity: One of `SEVERITIES`
+        path: Path of the entry, e.g. "Group/Item/recurringCost.sigma"
+        message: Description of the problem
+    """
+    severity: str
+    path: str
+    message: str
+
+    def __str__(self) -> str:
+        """Readable string representation of the instance"""
+        return f"{self.severity}: {self.path}: {self.message}"
+
+class ValidationError(ValueError):
+    """Raised when a scenario has errors, see `check`"""
+    problems: List[Problem]
+
+    def __init__(self, problems: List[Problem]) -> None:
+        """
+        Default initialization method for ValidationError class
+
+        Args:
+            problems: Errors of the scenario
+        """
+        self.problems = problems
+        super().__init__("Scenario is not valid:\n" + "\n".join(str(problem) for problem in problems))
+
+
+# ----- Internal Functions ----- #
+def _validate_parameters(value: random_type.RandomType, path: str) -> List[Problem]:
+    """Problems of the parameters of a Random Type, which are all finite"""
+    problems = []
+    if getattr(value, "sigma", 0) < 0:
+        problems.append(Problem("error", f"{path}.sigma", "must not be negative"))
+    if not 0 <= getattr(value, "probability", 0) <= 1:
+        problems.append(Problem("error", f"{path}.probability", "must be between 0 and 1"))
+    if getattr(value, "rate", 0) < 0:
+        problems.append(Problem("error", f"{path}.rate", "must not be negative"))
+    if isinstance(value, random_type.Pareto):
+        if value.alpha <= 1:
+            problems.append(Problem("error", f"{path}.alpha", "must be greater than 1, the mean is infinite"))
+        elif value.alpha <= 2:
+            problems.append(Problem("warning", f"{path}.alpha", "is at most 2, the variance is infinite"))
+    return problems
+
+def _validate_random_type(value: random_type.RandomType, years: int, path: str) -> List[Problem]:
+    """Problems of the parameters and active interval of a Random Type"""
+    problems = [Problem("error", f"{path}.{name}", "must be a finite number") for name in type(value).__slots__
+                if name not in ("start_year", "end_year") and not math.isfinite(getattr(value, name))]
+    if problems:
+        return problems
+    if math.isnan(value.start_year) or math.isnan(value.end_year):
+        return [Problem("error", path, "active interval must not be NaN")]
+    if value.end_year < value.start_year:
+        problems.append(Problem("error", path, f"ends in year {value.end_year:g} before it starts "
+                                               f"in year {value.start_year:g}"))
+    elif value.start_year > years or value.end_year < 0:
+        problems.append(Problem("warning", path, f"is never active within years 0 to {years}"))
+    return problems + _validate_parameters(value, path)
+
+def _validate_settings(summary: Summary) -> List[Problem]:
+    problems = []
+    if not (isinstance(summary.years, int) and summary.years >= 1):
+        problems.append(Problem("error", "years", "must be a positive integer"))
+    if not (isinstance(summary.iterations, int) and summary.iterations >= 1):
+        problems.append(Problem("error", "iterations", "must be a positive integer"))
+    if not (math.isfinite(summary.interest_rate) and summary.interest_rate > -1):
+        problems.append(Problem("error", "interestRate", "must be a finite number greater than -1"))
+    if summary.rng_algorithm not in random_type.RNG_ALGORITHMS:
+        problems.append(Problem("error", "rngAlgorithm", "must be one of " + ", ".join(random_type.RNG_ALGORITHMS)))
+    if not (isinstance(summary.currency, str) and _CURRENCY_CODE.fullmatch(summary.currency)):
+        problems.append(Problem("error", "currency", "must be a code of three capital letters"))
+    return problems
+
+def _validate_fx_rates(summary: Summary, years: int) -> List[Problem]:
+    problems = []
+    currencies = set()
+    used = {item.currency for group in summary.cash_flow_sheet.groups for item in group.items}
+    for fx_rate in summary.fx_rates:
+        path = f"fxRates/{fx_rate.currency}"
+        if fx_rate.currency in currencies:
+            problems.append(Problem("error", path, "is repeated"))
+        currencies.add(fx_rate.currency)
+        if not (isinstance(fx_rate.currency, str) and _CURRENCY_CODE.fullmatch(fx_rate.currency)):
+            problems.append(Problem("error", path, "currency must be a code of three capital letters"))
+        if len(fx_rate.rates) == 0:
+            problems.append(Problem("error", path, "has no rates"))
+        for (rate_no, rate) in enumerate(fx_rate.rates):
+            problems += _validate_random_type(rate, years, f"{path}/rates[{rate_no}]")
+        if fx_rate.currency not in used:
+            problems.append(Problem("warning", path, "is not used by any item"))
+    return problems
+
+def _validate_stage(stage: pipeline.Stage, path: str) -> List[Problem]:
+    if isinstance(stage, pipeline.Depreciation):
+        problems = []
+        if stage.method not in pipeline.DEPRECIATION_METHODS:
+            problems.append(Problem("error", f"{path}.method",
+                                    "must be one of " + ", ".join(pipeline.DEPRECIATION_METHODS)))
+        if not (isinstance(stage.life, int) and stage.life >= 1):
+            problems.append(Problem("error", f"{path}.life", "must be a positive integer"))
+        if stage.rate is not None and not 0 < stage.rate <= 1:
+            problems.append(Problem("error", f"{path}.rate", "must be greater than 0 and at most 1"))
+        return problems
+    elif isinstance(stage, pipeline.Tax):
+        if not 0 <= stage.rate <= 1:
+            return [Problem("error", f"{path}.rate", "must be between 0 and 1")]
+    elif isinstance(stage, pipeline.Inflation):
+        if not (math.isfinite(stage.rate) and stage.rate > -1):
+            return [Problem("error", f"{path}.rate", "must be a finite number greater than -1")]
+    else:
+        return [Problem("error", path, f"unknown stage {type(stage).__name__}")]
+    return []
+
+def _validate_sheet(summary: Summary, years: int) -> List[Problem]:
+    groups = summary.cash_flow_sheet.groups
+    if len(groups) == 0:
+        return [Problem("error", "cashFlowSheet", "has no groups")]
+    problems = []
+    group_names = set()
+    for group in groups:
+        if not group.name:
+            problems.append(Problem("error", "cashFlowSheet", "has a group without a name"))
+        elif group.name in group_names:
+            problems.append(Problem("error", group.name, "group name is repeated"))
+        group_names.add(group.name)
+        if len(group.items) == 0:
+            problems.append(Problem("error", group.name, "has no items"))
+        item_names = set()
+        for item in group.items:
+            path = f"{group.name}/{item.name}"
+            if not item.name:
+                problems.append(Problem("error", group.name, "has an item without a name"))
+            elif item.name in item_names:
+                problems.append(Problem("error", path, "item name is repeated"))
+            item_names.add(item.name)
+            if item.currency not in (None, summary.currency) \
+                    and all(fx_rate.currency != item.currency for fx_rate in summary.fx_rates):
+                problems.append(Problem("error", f"{path}.currency", f"has no FX rate to {summary.currency}"))
+            problems += _validate_random_type(item.upfront_cost, years, f"{path}/upfrontCost")
+            problems += _validate_random_type(item.recurring_cost, years, f"{path}/recurringCost")
+    return problems
+
+
+# ----- Module Methods ----- #
+def validate(summary: Summary) -> List[Problem]:
+    """
+    Find the problems of a summary
+
+    Args:
+        summary: Summary to be validated
+
+    Returns:
+        Problems of the settings, FX rates, pipeline and cash flow sheet, in that order
+    """
+    problems = _validate_settings(summary)
+    years = summary.years if isinstance(summary.years, int) else 0
+    problems += _validate_fx_rates(summary, years)
+    for (stage_no, stage) in enumerate(summary.pipeline):
+        problems += _validate_stage(stage, f"pipeline[{stage_no}]")
+    problems += _validate_sheet(summary, years)
+    return problems
+
+def check(summary: Summary) -> List[Problem]:
+    """
+    Ensure that a summary has no errors before simulating it
+
+    Args:
+        summary: Summary to be validated
+
+    Returns:
+        Warnings of the summary
+
+    Raises:
+        ValidationError: If the summary has errors
+    """
+    problems = validate(summary)
+    errors = [problem for problem in problems if problem.severity == "error"]
+    if errors:
+        raise ValidationError(errors)
+    return problems
+
+def check_iterations(iterations: int) -> int:
+    """
+    Ensure that a number of iterations to run, e.g. one overriding that of the summary, is positive
+
+    Args:
+        iterations: Number of iterations
+
+    Returns:
+        The number of iterations
+
+    Raises:
+        ValueError: If the number of iterations is less than 1
+    """
+    if iterations < 1:
+        raise ValueError(f"Number of iterations must be positive, not {iterations}")
+    return iterations
+
+def validate_file(file: str) -> List[Problem]:
+    """Load a scenario in any of the scenario formats and find its problems, including those of loading it"""
+    from scenario_format import read_file
+
+    try:
+        summary = read_file(file)
+    except Exception as error:
+        return [Problem("error", file, f"cannot be loaded: {error}")]
+    return validate(summary)
+
+def validate_files(files: Iterable[str], workers: Optional[int] = None) -> Dict[str, List[Problem]]:
+    """
+    Load and validate many scenario files on a process pool
+
+    Args:
+        files: Scenario files in any of the scenario formats
+        workers: Number of worker processes, number of CPUs if None, in this process if 1
+
+    Returns:
+        Problems by file, in the order of the files
+    """
+    files = list(files)
+    workers = os.cpu_count() if workers is None else workers
+    if workers == 1 or len(files) <= 1:
+        return {file: validate_file(file) for file in files}
+    with ProcessPoolExecutor(workers, mp_context=get_context("spawn")) as executor:
+        chunk_size = max(1, len(files) // (4 * workers))
+        return dict(zip(files, executor.map(validate_file, files, chunksize=chunk_size)))
+
+
+# ----- Command Line Interface ----- #
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validate scenarios before simulating them")
+    parser.add_argument("scenarios", nargs="+", help="Scenarios in any of the scenario formats")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--errors-only", action="store_true", help="Leave warnings out")
+    args = parser.parse_args()
+    failed = False
+    for (file, problems) in validate_files(args.scenarios, args.workers).items():
+        for problem in problems:
+            if problem.severity == "error" or not args.errors_only:
+                print(f"{file}: {problem}")
+        failed |= any(problem.severity == "error" for problem in problems)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -35,6 +35,15 @@ def _item_list_frame(item_list_tree):
     item_list_frame = [[sg.Frame("Items", layout=item_list_layout)]]
     return item_list_frame
 
+def run_or_popup(func, *args):
+    """Call the function, showing an error popup instead if it raises ValueError; return whether it succeeded"""
+    try:
+        func(*args)
+    except ValueError as error:
+        sg.PopupError(str(error))
+        return False
+    return True
+
 def _get_tree(item_list):
     item_list_tree = sg.TreeData()
     for item in item_list:
@@ -75,7 +84,7 @@ def window_cash_flow_group(current_cash_flow_group=CashFlowGroup()):
             window.Hide()
             new_item = window_cash_flow_item()
             if new_item is not None:
-                new_cash_flow_group.add_items(new_item)
+                run_or_popup(new_cash_flow_group.add_items, new_item)
                 window.FindElement(key="item_list").Update(values=_get_tree(new_cash_flow_group.items))
             window.UnHide()
         elif event in ("edit_item"):
@@ -83,8 +92,7 @@ def window_cash_flow_group(current_cash_flow_group=CashFlowGroup()):
             old_item = new_cash_flow_group.get_items(window_value["item_list"])
             new_item = window_cash_flow_item(old_item[0])
             if new_item is not None:
-                new_cash_flow_group.remove_items(window_value["item_list"])
-                new_cash_flow_group.add_items(new_item)
+                run_or_popup(new_cash_flow_group.replace_item, old_item[0].name, new_item)
                 window.FindElement(key="item_list").Update(values=_get_tree(new_cash_flow_group.items))
             window.UnHide()
         elif event in ("remove_item"):
@@ -14,6 +14,9 @@ def _get_value_dict(current_random_type):
     gaussian = random_type.Gaussian()
     constant = random_type.Constant()
     pareto = random_type.Pareto()
+    bernoulli = random_type.Bernoulli()
+    poisson = random_type.Poisson()
+    one_off_event = random_type.OneOffEvent()
 
     # Update current random type
     if isinstance(current_random_type, random_type.Gaussian):
@@ -22,6 +25,12 @@ def _get_value_dict(current_random_type):
         constant = current_random_type
     elif isinstance(current_random_type, random_type.Pareto):
         pareto = current_random_type
+    elif isinstance(current_random_type, random_type.Bernoulli):
+        bernoulli = current_random_type
+    elif isinstance(current_random_type, random_type.Poisson):
+        poisson = current_random_type
+    elif isinstance(current_random_type, random_type.OneOffEvent):
+        one_off_event = current_random_type
 
     # Load values
     value_dict = {
@@ -34,7 +43,20 @@ def _get_value_dict(current_random_type):
         "end_year_constant": _empty_or_string(constant.end_year, math.inf),
         "alpha_pareto": str(pareto.alpha),
         "start_year_pareto": _empty_or_string(pareto.start_year, 0),
-        "end_year_pareto": _empty_or_string(pareto.end_year, math.inf)
+        "end_year_pareto": _empty_or_string(pareto.end_year, math.inf),
+        "probability_bernoulli": str(bernoulli.probability),
+        "value_bernoulli": str(bernoulli.value),
+        "start_year_bernoulli": _empty_or_string(bernoulli.start_year, 0),
+        "end_year_bernoulli": _empty_or_string(bernoulli.end_year, math.inf),
+        "rate_poisson": str(poisson.rate),
+        "mu_poisson": str(poisson.mu),
+        "sigma_poisson": str(poisson.sigma),
+        "start_year_poisson": _empty_or_string(poisson.start_year, 0),
+        "end_year_poisson": _empty_or_string(poisson.end_year, math.inf),
+        "probability_one_off_event": str(one_off_event.probability),
+        "value_one_off_event": str(one_off_event.value),
+        "start_year_one_off_event": _empty_or_string(one_off_event.start_year, 0),
+        "end_year_one_off_event": str(one_off_event.end_year)
     }
 
     return value_dict
@@ -80,6 +102,53 @@ def _get_pareto_tab(value_dict):
     pareto_tab = sg.Tab("Pareto", layout=pareto_layout, key="pareto", visible=False)
     return pareto_tab
 
+def _get_bernoulli_tab(value_dict):
+    """Generate Bernoulli tab"""
+    bernoulli_layout = [
+        [sg.Text("Probability", size=(15, 1)),
+            sg.InputText(default_text=value_dict["probability_bernoulli"], key="probability_bernoulli")],
+        [sg.Text("value", size=(15, 1)),
+            sg.InputText(default_text=value_dict["value_bernoulli"], key="value_bernoulli")],
+        [sg.Text("Start Year", size=(15, 1)),
+            sg.InputText(default_text=value_dict["start_year_bernoulli"], key="start_year_bernoulli")],
+        [sg.Text("End Year", size=(15, 1)),
+            sg.InputText(default_text=value_dict["end_year_bernoulli"], key="end_year_bernoulli")]
+    ]
+    bernoulli_tab = sg.Tab("Yearly Event", layout=bernoulli_layout, key="bernoulli")
+    return bernoulli_tab
+
+def _get_poisson_tab(value_dict):
+    """Generate Poisson tab"""
+    poisson_layout = [
+        [sg.Text("Events per Year", size=(15, 1)),
+            sg.InputText(default_text=value_dict["rate_poisson"], key="rate_poisson")],
+        [sg.Text("mu (\u03BC)", size=(15, 1)),
+            sg.InputText(default_text=value_dict["mu_poisson"], key="mu_poisson")],
+        [sg.Text("sigma (\u03C3)", size=(15, 1)),
+            sg.InputText(default_text=value_dict["sigma_poisson"], key="sigma_poisson")],
+        [sg.Text("Start Year", size=(15, 1)),
+            sg.InputText(default_text=value_dict["start_year_poisson"], key="start_year_poisson")],
+        [sg.Text("End Year", size=(15, 1)),
+            sg.InputText(default_text=value_dict["end_year_poisson"], key="end_year_poisson")]
+    ]
+    poisson_tab = sg.Tab("Poisson Events", layout=poisson_layout, key="poisson")
+    return poisson_tab
+
+def _get_one_off_event_tab(value_dict):
+    """Generate One-off Event tab"""
+    one_off_event_layout = [
+        [sg.Text("Probability", size=(15, 1)),
+            sg.InputText(default_text=value_dict["probability_one_off_event"], key="probability_one_off_event")],
+        [sg.Text("value", size=(15, 1)),
+            sg.InputText(default_text=value_dict["value_one_off_event"], key="value_one_off_event")],
+        [sg.Text("Start Year", size=(15, 1)),
+            sg.InputText(default_text=value_dict["start_year_one_off_event"], key="start_year_one_off_event")],
+        [sg.Text("End Year", size=(15, 1)),
+            sg.InputText(default_text=value_dict["end_year_one_off_event"], key="end_year_one_off_event")]
+    ]
+    one_off_event_tab = sg.Tab("One-off Event", layout=one_off_event_layout, key="one_off_event")
+    return one_off_event_tab
+
 def _set_random_type(window_value):
     """Generate new Random Type"""
     def _default_or_int(string, default_value=0):
@@ -110,6 +179,32 @@ def _set_random_type(window_value):
         end_year = _default_or_int(window_value["end_year_pareto"], math.inf)
         return random_type.Pareto(alpha=alpha, start_year=start_year, end_year=end_year)
 
+    # Set Random Type to an event in each year
+    elif window_value["random_type"] in ("bernoulli"):
+        probability = float(window_value["probability_bernoulli"])
+        value = float(window_value["value_bernoulli"])
+        start_year = _default_or_int(window_value["start_year_bernoulli"], 0)
+        end_year = _default_or_int(window_value["end_year_bernoulli"], math.inf)
+        return random_type.Bernoulli(probability=probability, value=value, start_year=start_year, end_year=end_year)
+
+    # Set Random Type to Poisson events
+    elif window_value["random_type"] in ("poisson"):
+        rate = float(window_value["rate_poisson"])
+        mu = float(window_value["mu_poisson"])
+        sigma = float(window_value["sigma_poisson"])
+        start_year = _default_or_int(window_value["start_year_poisson"], 0)
+        end_year = _default_or_int(window_value["end_year_poisson"], math.inf)
+        return random_type.Poisson(rate=rate, mu=mu, sigma=sigma, start_year=start_year, end_year=end_year)
+
+    # Set Random Type to a one-off event
+    elif window_value["random_type"] in ("one_off_event"):
+        probability = float(window_value["probability_one_off_event"])
+        value = float(window_value["value_one_off_event"])
+        start_year = _default_or_int(window_value["start_year_one_off_event"], 0)
+        end_year = _default_or_int(window_value["end_year_one_off_event"], 0)
+        return random_type.OneOffEvent(probability=probability, value=value, start_year=start_year,
+                                       end_year=end_year)
+
 def window_random_type(current_random_type=random_type.Gaussian()):
     """Window for random type"""
     # Load default values
@@ -118,7 +213,8 @@ def window_random_type(current_random_type=random_type.Gaussian()):
     # Generate tab group for Random Type selection
     random_type_layout = [
         [sg.TabGroup(
-            layout=[[_get_gaussian_tab(value_dict), _get_constant_tab(value_dict), _get_pareto_tab(value_dict)]],
+            layout=[[_get_gaussian_tab(value_dict), _get_constant_tab(value_dict), _get_pareto_tab(value_dict),
+                     _get_bernoulli_tab(value_dict), _get_poisson_tab(value_dict), _get_one_off_event_tab(value_dict)]],
             key="random_type")]
     ]
 
@@ -1,32 +1,141 @@
+import math
+import queue
+import threading
 import PySimpleGUI as sg
 import numpy as np
 from cash_flow import Summary
+from convergence import Convergence
+from simulation import METRICS, simulate
 
-def window_result(summary: Summary):
-    iterations = summary.iterations
-    list_IRR = np.zeros((iterations, ))
-    list_NPV = np.zeros((iterations, ))
-    list_payback_period = np.zeros((iterations, ))
-    for i in range(iterations):
-        summary.sample_cash_flow()
-        list_IRR[i] = summary.get_IRR()
-        list_NPV[i] = summary.get_NPV()
-        list_payback_period[i] = summary.get_payback_period()
-        stop_check = sg.OneLineProgressMeter('Iterations', i+1, iterations, 'key', "Monte Carlo Sampling...")
-        if not stop_check and i+1 != iterations:
-            return False
-
-    window_layout = [
-        [sg.Text("Internal Return of Investment")],
-        [sg.Text("".join(["Mean is ", str(np.mean(list_IRR)), " with std. deviation of ", str(np.std(list_IRR))]))],
-        [sg.Text("Net Present Value")],
-        [sg.Text("".join(["Mean is ", str(np.mean(list_NPV)), " with std. deviation of ", str(np.std(list_NPV))]))],
-        [sg.Text("Payback Period [years]")],
-        [sg.Text("".join([
-            "Mean is ", str(np.mean(list_payback_period)),
-            " with std. deviation of ", str(np.std(list_payback_period))
-        ]))]
+CHUNK_SIZE = 10000
+REFRESH_MS = 250        # Window is redrawn at most this often
+BINS = 40
+GRAPH_SIZE = (400, 120)
+METRIC_TITLES = {
+    "IRR": "Internal Return of Investment",
+    "NPV": "Net Present Value",
+    "payback_period": "Payback Period [years]"
+}
+
+def _run_chunks(summary: Summary, results: queue.Queue, stop: threading.Event):
+    """Run the iterations chunk by chunk in the background, till done or stopped"""
+    def put_chunk(completed, values):
+        results.put((len(values["NPV"]), values))
+        return not stop.is_set()
+
+    simulate(summary, chunk_size=CHUNK_SIZE, callback=put_chunk)
+    results.put(None)
+
+def _get_edges(values):
+    """Histogram bin edges covering all but the extreme values of the first chunk"""
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return None
+    (low, high) = np.quantile(finite, [0.005, 0.995])
+    if high - low < 1e-12:
+        (low, high) = (low - 0.5, high + 0.5)
+    return np.linspace(low, high, BINS + 1)
+
+def _add_to_histogram(histogram, values):
+    """Add values to the histogram, counting the ones out of range in the end bins"""
+    if histogram["edges"] is None:
+        histogram["edges"] = _get_edges(values)
+        if histogram["edges"] is None:
+            return
+    finite = values[np.isfinite(values)]
+    edges = histogram["edges"]
+    histogram["counts"] += np.histogram(np.clip(finite, edges[0], edges[-1]), edges)[0]
+
+def _draw_histogram(graph: sg.Graph, histogram):
+    graph.erase()
+    counts = histogram["counts"]
+    if counts.max() == 0:
+        return
+    for (bin_no, count) in enumerate(counts / counts.max()):
+        graph.draw_rectangle((bin_no, count), (bin_no + 1, 0), fill_color="steel blue", line_color="white")
+
+def _statistics_text(statistics: Convergence, metric):
+    diagnostics = statistics.get(metric)
+    if diagnostics.count == 0:
+        return "No values yet"
+    half_width = diagnostics.get_half_width()
+    if math.isnan(half_width):
+        half_width = 1.96 * diagnostics.standard_error
+    return "".join(["Mean is ", f"{diagnostics.mean:.6g}", " ± ", f"{half_width:.3g}",
+                    f" ({diagnostics.confidence:.0%} CI) with std. deviation of ", f"{diagnostics.std:.6g}",
+                    f", {diagnostics.count} values ({diagnostics.failed} undefined)"])
+
+def _range_text(histogram):
+    if histogram["edges"] is None:
+        return ""
+    return f"{histogram['edges'][0]:.4g} to {histogram['edges'][-1]:.4g}"
+
+def _metric_frame(metric):
+    """Generate histogram and statistics frame layout of a metric"""
+    metric_layout = [
+        [sg.Graph(GRAPH_SIZE, (0, 0), (BINS, 1.05), key=f"{metric}_graph", background_color="white")],
+        [sg.Text("", size=(60, 1), key=f"{metric}_range")],
+        [sg.Text("No values yet", size=(60, 1), key=f"{metric}_statistics")]
+    ]
+    return [sg.Frame(METRIC_TITLES[metric], layout=metric_layout)]
+
+def _get_window_layout(summary: Summary):
+    window_layout = [_metric_frame(metric) for metric in METRICS] + [
+        [sg.ProgressBar(summary.iterations, orientation="h", size=(35, 15), key="progress"),
+            sg.Text("Running...", size=(22, 1), key="status")],
+        [sg.Button("Stop", key="stop"), sg.Button("Close", key="close")]
     ]
+    return window_layout
+
+def _update_window(window: sg.Window, statistics: Convergence, histograms, completed):
+    for metric in METRICS:
+        _draw_histogram(window[f"{metric}_graph"], histograms[metric])
+        window[f"{metric}_range"].update(_range_text(histograms[metric]))
+        window[f"{metric}_statistics"].update(_statistics_text(statistics, metric))
+    window["progress"].update_bar(completed)
+
+def window_result(summary: Summary):
+    """Show live histograms and statistics of the metrics while the iterations run in the background"""
+    statistics = Convergence()
+    histograms = {metric: {"edges": None, "counts": np.zeros(BINS, dtype=int)} for metric in METRICS}
+    results = queue.Queue()
+    stop = threading.Event()
+    worker = threading.Thread(target=_run_chunks, args=(summary, results, stop), daemon=True)
+
+    window = sg.Window("Result", layout=_get_window_layout(summary), finalize=True)
+    worker.start()
+    (completed, running) = (0, True)
+    while True:
+        event, window_value = window.Read(timeout=REFRESH_MS if running else None)
+        if event in (None, "close"):
+            stop.set()
+            break
+        if event == "stop":
+            stop.set()
+            window["stop"].update(disabled=True)
+            window["status"].update("Stopping...")
+
+        # Merge every chunk completed since the last redraw, then redraw once
+        updated = False
+        while running:
+            try:
+                result = results.get_nowait()
+            except queue.Empty:
+                break
+            if result is None:
+                running = False
+                window["stop"].update(disabled=True)
+                status = "Done" if completed >= summary.iterations else f"Stopped after {completed} iterations"
+                window["status"].update(status)
+                break
+            (size, values) = result
+            statistics.update(values)
+            for metric in METRICS:
+                _add_to_histogram(histograms[metric], values[metric])
+            completed += size
+            updated = True
+        if updated:
+            _update_window(window, statistics, histograms, completed)
 
-    window = sg.Window("Result", layout=window_layout)
-    event, window_value = window.Read()
+    window.Close()
+    return statistics
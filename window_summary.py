@@ -1,8 +1,9 @@
 import PySimpleGUI as sg
-from window_cash_flow_group import window_cash_flow_group
+from window_cash_flow_group import run_or_popup, window_cash_flow_group
 import math
 from cash_flow import Summary, CashFlowSheet, generate_XML_file, read_XML_file
 from window_result import window_result
+from validation import check
 
 def _default_or_float(string, default_value=0.0):
     if string in (""):
@@ -74,6 +75,19 @@ def _get_window_layout(summary: Summary):
 
     return window_layout
 
+def _open_summary(window: sg.Window, summary: Summary):
+    """Open a summary from a file chosen by the user, keeping the current one if none is chosen"""
+    file_name = sg.PopupGetFile("Select xml file to open...",
+                                file_types=(("XML Files", "*.xml"), ))
+    if file_name is None:
+        return summary
+    summary = read_XML_file(file_name)
+    window.FindElement("interest_rate").Update(summary.interest_rate)
+    window.FindElement("years").Update(summary.years)
+    window.FindElement("iterations").Update(summary.iterations)
+    window.FindElement(key="group_list").Update(values=_get_tree(summary.cash_flow_sheet.groups))
+    return summary
+
 def window_summary(summary: Summary = None):
     if summary is None:
         summary = Summary(CashFlowSheet())
@@ -91,13 +105,14 @@ def window_summary(summary: Summary = None):
             summary.interest_rate = _default_or_float(window_value["interest_rate"], 0)
             summary.years = _default_or_int(window_value["years"], 0)
             summary.iterations = _default_or_int(window_value["iterations"], 0)
-            window_result(summary)
-            break
+            if run_or_popup(check, summary):
+                window_result(summary)
+                break
         elif event in ("add_group"):
             window.Hide()
             new_group = window_cash_flow_group()
             if new_group is not None:
-                summary.cash_flow_sheet.add_groups(new_group)
+                run_or_popup(summary.cash_flow_sheet.add_groups, new_group)
             window.FindElement(key="group_list").Update(values=_get_tree(summary.cash_flow_sheet.groups))
             window.UnHide()
         elif event in ("edit_group"):
@@ -105,8 +120,7 @@ def window_summary(summary: Summary = None):
             old_group = summary.cash_flow_sheet.get_groups(window_value["group_list"])
             new_group = window_cash_flow_group(old_group[0])
             if new_group is not None:
-                summary.cash_flow_sheet.remove_groups(window_value["group_list"])
-                summary.cash_flow_sheet.add_groups(new_group)
+                run_or_popup(summary.cash_flow_sheet.replace_group, old_group[0].name, new_group)
             window.FindElement(key="group_list").Update(values=_get_tree(summary.cash_flow_sheet.groups))
             window.UnHide()
         elif event in ("remove_group"):
@@ -122,17 +136,15 @@ def window_summary(summary: Summary = None):
             window.UnHide()
         elif event in ("Open"):
             window.Hide()
-            file_name = sg.PopupGetFile("Select xml file to open...",
-                                        file_types=(("XML Files", "*.xml"), ))
-            if file_name is not None:
-                summary = read_XML_file(file_name)
-                window.FindElement("interest_rate").Update(summary.interest_rate)
-                window.FindElement("years").Update(summary.years)
-                window.FindElement("iterations").Update(summary.iterations)
-                window.FindElement(key="group_list").Update(values=_get_tree(summary.cash_flow_sheet.groups))
+            summary = _open_summary(window, summary)
             window.UnHide()
 
     window.Close()
 
 
-window_summary()
+def main():
+    window_summary()
+
+
+if __name__ == "__main__":
+    main()